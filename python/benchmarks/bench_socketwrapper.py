@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# bench_socketwrapper.py: Benchmarks SocketWrapper against a local TCP server.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+"""
+Measures the throughput of `SocketWrapper` against a local TCP server that
+stands in for an Ethernet-attached instrument. Each query sent to the server is
+answered with a fixed-length ASCII response, so that both the number of
+queries per second and the number of response bytes per second can be
+reported.
+
+The current implementation is compared against the previous
+one-``recv``-per-byte reader, reproduced here as `LegacySocketWrapper`.
+
+Run from the ``python`` directory as::
+
+    $ python benchmarks/bench_socketwrapper.py
+"""
+
+## IMPORTS ####################################################################
+
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from instruments.abstract_instruments.socketwrapper import SocketWrapper
+
+## CONSTANTS ##################################################################
+
+RESPONSE_SIZES = [16, 256, 4096, 65536]
+DURATION = 1.0 # Seconds spent on each measurement.
+
+## CLASSES ####################################################################
+
+class LegacySocketWrapper(SocketWrapper):
+    """
+    `SocketWrapper` with the original unbuffered, byte-at-a-time reader.
+    """
+    def read(self, size):
+        if (size >= 0):
+            return self._conn.recv(size)
+        result = bytearray()
+        c = 0
+        while c != self._terminator:
+            c = self._conn.recv(1)
+            result += c
+        return bytes(result)
+
+## FUNCTIONS ##################################################################
+
+def serve(listener, response_size):
+    """
+    Accepts a single connection, and answers each terminated line received
+    on it with ``response_size - 1`` bytes of payload and a newline.
+    """
+    conn, _ = listener.accept()
+    response = 'x' * (response_size - 1) + '\n'
+    pending = ''
+    try:
+        while True:
+            data = conn.recv(4096)
+            if not data:
+                break
+            pending += data
+            n_queries = pending.count('\n')
+            pending = pending[pending.rfind('\n') + 1:]
+            if n_queries:
+                conn.sendall(response * n_queries)
+    finally:
+        conn.close()
+
+def measure(wrapper_cls, response_size):
+    """
+    Runs queries against a fresh echo server for `DURATION` seconds, and
+    returns the achieved rates as a tuple ``(queries/s, bytes/s)``.
+    """
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    server = threading.Thread(target=serve, args=(listener, response_size))
+    server.daemon = True
+    server.start()
+
+    conn = socket.create_connection(listener.getsockname())
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    wrapper = wrapper_cls(conn)
+
+    n_queries = 0
+    n_bytes = 0
+    start = time.time()
+    while time.time() - start < DURATION:
+        n_bytes += len(wrapper.query('MEAS?'))
+        n_queries += 1
+    elapsed = time.time() - start
+
+    conn.close()
+    listener.close()
+    server.join()
+    return n_queries / elapsed, n_bytes / elapsed
+
+def main():
+    print("{:>10} {:>24} {:>24} {:>8}".format(
+        "resp. size", "before (q/s, MB/s)", "after (q/s, MB/s)", "speedup"
+    ))
+    for response_size in RESPONSE_SIZES:
+        before = measure(LegacySocketWrapper, response_size)
+        after = measure(SocketWrapper, response_size)
+        print("{:>10} {:>12.0f} {:>11.3f} {:>12.0f} {:>11.3f} {:>7.1f}x".format(
+            response_size,
+            before[0], before[1] / 1e6,
+            after[0], after[1] / 1e6,
+            after[0] / before[0]
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# bench_units.py: Benchmarks unit conversion of values sent to instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+"""
+Measures the cost of converting values to the magnitudes sent to an
+instrument, as done by the setters of `unitful_property` and of
+`NewportESP301Axis`.
+
+The cached-scale-factor path, `convert_magnitude`, is compared against the
+previous ``assume_units(value, units).rescale(units).magnitude`` path, for
+plain floats, scalar quantities and arrays of quantities.
+
+Run from the ``python`` directory as::
+
+    $ python benchmarks/bench_units.py
+"""
+
+## IMPORTS ####################################################################
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+import numpy as np
+import quantities as pq
+
+from instruments.util_fns import assume_units, convert_magnitude
+
+## CONSTANTS ##################################################################
+
+VALUES = [
+    ("float", 1.5, pq.mm),
+    ("scalar, same units", pq.Quantity(1.5, 'mm'), pq.mm),
+    ("scalar, rescaled", pq.Quantity(1.5, 'um'), pq.mm),
+    ("compound units", pq.Quantity(1.5, 'mm/s'), pq.m / pq.s),
+    ("1000-point array", pq.Quantity(np.arange(1000.0), 'um'), pq.mm),
+]
+N_CALLS = 20000
+
+## FUNCTIONS ##################################################################
+
+def legacy_path(value, units):
+    return assume_units(value, units).rescale(units).magnitude
+
+def measure(fcn, value, units):
+    """
+    Returns the average time taken by ``fcn(value, units)``, in seconds.
+    """
+    timer = timeit.Timer(lambda: fcn(value, units))
+    return min(timer.repeat(3, N_CALLS)) / N_CALLS
+
+def main():
+    print("{:>20} {:>14} {:>14} {:>8}".format(
+        "value", "before (us)", "after (us)", "speedup"
+    ))
+    for label, value, units in VALUES:
+        before = measure(legacy_path, value, units)
+        after = measure(convert_magnitude, value, units)
+        print("{:>20} {:>14.2f} {:>14.2f} {:>7.1f}x".format(
+            label, before * 1e6, after * 1e6, before / after
+        ))
+
+if __name__ == "__main__":
+    main()
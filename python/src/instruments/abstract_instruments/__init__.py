@@ -7,6 +7,7 @@ from instruments.abstract_instruments.oscilloscope import (
     OscilloscopeChannel,
     OscilloscopeDataSource,
     Oscilloscope,
+    Waveform,
 )
 from instruments.abstract_instruments.power_supply import (
     PowerSupplyChannel,
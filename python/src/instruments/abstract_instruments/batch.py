@@ -0,0 +1,234 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# batch.py: Batches of queries sent to an instrument in one exchange.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+## FEATURES ####################################################################
+
+from __future__ import division
+
+## CLASSES #####################################################################
+
+class QueryFuture(object):
+    '''
+    Placeholder for the result of a query added to a `QueryBatch`. The result
+    becomes available once the batch has been executed.
+    
+    .. warning:: This class should NOT be manually created by the user. It is
+        returned by `QueryBatch.query`.
+    '''
+    
+    def __init__(self, cmd, parser=None):
+        self._cmd = cmd
+        self._parser = parser
+        self._done = False
+        self._result = None
+        
+    def __repr__(self):
+        return "<QueryFuture {} ({})>".format(
+            repr(self._cmd),
+            "done" if self._done else "pending"
+        )
+        
+    @property
+    def cmd(self):
+        '''
+        Gets the query command whose result this future represents.
+        
+        :type: `str`
+        '''
+        return self._cmd
+        
+    def done(self):
+        '''
+        Returns `True` if the batch containing this query has been executed.
+        
+        :rtype: `bool`
+        '''
+        return self._done
+        
+    def result(self):
+        '''
+        Returns the response to this query, passed through the parser given
+        when the query was added to the batch, if any.
+        
+        :raises RuntimeError: If the batch has not yet been executed.
+        '''
+        if not self._done:
+            raise RuntimeError("Query {} has not been executed yet; results "
+                               "are available after the batch "
+                               "is executed.".format(repr(self._cmd)))
+        return self._result
+        
+    def _set_response(self, response):
+        response = response.strip()
+        self._result = (
+            response if self._parser is None else self._parser(response)
+        )
+        self._done = True
+
+class QueryBatch(object):
+    '''
+    Collects several queries to an instrument so that they can be sent in a
+    single exchange, replacing one round trip per query with one round trip
+    for the whole batch.
+    
+    If a separator is given, as is done by
+    `~instruments.generic_scpi.SCPIInstrument.batch`, the queries are joined
+    into one message and the single response is split back apart by the
+    same separator. Otherwise, all queries are written back-to-back before
+    any response is read, unless the connection does not support this (see
+    `~instruments.abstract_instruments.WrapperABC.supports_pipelining`), in
+    which case they are sent one at a time.
+    
+    As SCPI resolves each header following a ``;`` relative to the previous
+    one, a header prefix of ``:`` can be given to make every header after
+    the first absolute, such that ``WFMP:CH1:YOF?`` and ``WFMP:CH1:YMU?``
+    are sent as ``WFMP:CH1:YOF?;:WFMP:CH1:YMU?``. Common commands, starting
+    with ``*``, and headers already starting with the prefix are left as
+    they are.
+    
+    Batches are normally created by `~instruments.Instrument.batch` and used
+    as context managers, executing when the block is exited::
+    
+        >>> with inst.batch() as batch: # doctest: +SKIP
+        ...     yoffs = batch.query('WFMP:CH1:YOF?', float)
+        ...     ymult = batch.query('WFMP:CH1:YMU?', float)
+        >>> yoffs.result(), ymult.result() # doctest: +SKIP
+    
+    :param inst: Instrument to which the queries are sent.
+    :type inst: `~instruments.Instrument`
+    :param str separator: String used to join queries into a single message
+        and to split the response, or `None` to write each query separately.
+    :param str header_prefix: String prepended to each query after the first
+        when joining them, or `None` to join them as they are.
+    '''
+    
+    def __init__(self, inst, separator=None, header_prefix=None):
+        self._inst = inst
+        self._separator = separator
+        self._header_prefix = header_prefix
+        self._futures = []
+        
+        #: `False` if reading a response failed when the batch was last
+        #: executed, such that the response may still arrive later and
+        #: the connection can no longer be trusted to be in step with the
+        #: queries sent.
+        self.in_step = True
+        
+    def __len__(self):
+        return len(self._futures)
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, type, value, traceback):
+        # Don't send anything if the block raised; the futures are left
+        # pending.
+        if type is None:
+            self.execute()
+            
+    def query(self, cmd, parser=None):
+        '''
+        Adds a query to the batch.
+        
+        :param str cmd: Query to be sent to the instrument.
+        :param callable parser: Function called on the stripped response to
+            produce the result of the query, or `None` to return the
+            response as a `str`.
+        :rtype: `QueryFuture`
+        '''
+        future = QueryFuture(cmd, parser)
+        self._futures.append(future)
+        return future
+        
+    def _join(self, cmds):
+        '''
+        Joins queries into a single message, prefixing the header of each
+        query after the first if needed.
+        '''
+        prefix = self._header_prefix
+        if prefix is not None:
+            cmds = cmds[:1] + [
+                cmd if cmd.startswith(('*', prefix)) else prefix + cmd
+                for cmd in cmds[1:]
+            ]
+        return self._separator.join(cmds)
+        
+    def execute(self):
+        '''
+        Sends all pending queries in the batch to the instrument, and sets the
+        results of their futures.
+        
+        :return: The results of the queries, in the order that they were
+            added.
+        :rtype: `list`
+        '''
+        futures, self._futures = self._futures, []
+        if not futures:
+            return []
+        
+        self.in_step = True
+        try:
+            if len(futures) == 1:
+                responses = [self._inst.query(futures[0].cmd)]
+            elif self._separator is not None:
+                response = self._inst.query(
+                    self._join([future.cmd for future in futures])
+                )
+                responses = response.strip().split(self._separator)
+            elif not self._inst._file.supports_pipelining:
+                responses = [
+                    self._inst.query(future.cmd) for future in futures
+                ]
+            else:
+                for future in futures:
+                    self._inst.sendcmd(future.cmd)
+                # Attempt to read a response for every query, even after one
+                # of the reads has failed, so that as few responses to the
+                # batch as possible are left to be read as responses to later
+                # queries.
+                responses = []
+                error = None
+                for future in futures:
+                    try:
+                        responses.append(self._inst._file.read(-1))
+                    except IOError as ex:
+                        if error is None:
+                            error = ex
+                if error is not None:
+                    raise error
+        except IOError:
+            # A response that was not read in time may still arrive, and be
+            # taken as the response to whatever is queried next.
+            self.in_step = False
+            raise
+            
+        if self._separator is not None and len(responses) != len(futures):
+            raise IOError("Expected {} responses to batched query, but "
+                          "got {}: {}".format(
+                            len(futures), len(responses), repr(response)
+                          ))
+            
+        for future, response in zip(futures, responses):
+            future._set_response(response)
+        return [future.result() for future in futures]
@@ -30,6 +30,7 @@ import errno
 import io
 import time
 from instruments.abstract_instruments import WrapperABC
+from instruments.abstract_instruments.wrapperabc import byte_view
 import os
 
 ## CLASSES #####################################################################
@@ -113,6 +114,29 @@ class FileCommunicator(io.IOBase, WrapperABC):
             print " -> {} ".format(repr(msg))
         return msg
         
+    def readinto(self, buf):
+        '''
+        Fills ``buf`` with data from the wrapped file, using the file's own
+        ``readinto`` method if it has one. Fewer bytes are read only if the
+        end of the file is reached.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        if not hasattr(self._filelike, 'readinto'):
+            return super(FileCommunicator, self).readinto(buf)
+        view = byte_view(buf)
+        size = len(view)
+        n_read = 0
+        while n_read < size:
+            n_chunk = self._filelike.readinto(view[n_read:])
+            if not n_chunk:
+                break
+            n_read += n_chunk
+        return n_read
+        
     def write(self, msg):
         if self._debug:
             print " <- {} ".format(repr(msg))
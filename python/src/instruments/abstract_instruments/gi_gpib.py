@@ -25,16 +25,193 @@
 
 ## IMPORTS #####################################################################
 
+import contextlib
 import io
+import threading
 import time
+import weakref
 
 import numpy as np
 
 import serialManager
 from instruments.abstract_instruments import WrapperABC
 
+## CONSTANTS ###################################################################
+
+# Default time, in seconds, given to the adapter to process a configuration
+# command before anything else is written to it.
+_DEFAULT_PACING = 0.01
+
+## GLOBALS #####################################################################
+
+# Buses, keyed by the connection to their adapter. GPIBWrapper instances that
+# share a connection (see serialManager) thus share a single bus.
+_buses = weakref.WeakKeyDictionary()
+_buses_lock = threading.Lock()
+
 ## CLASSES #####################################################################
 
+class _Transaction(object):
+    '''
+    A request by one thread for exclusive use of a bus.
+    '''
+    def __init__(self, address):
+        self.address = address
+        self.thread = threading.current_thread()
+        self.depth = 0
+        self.queued_time = time.time()
+
+class GPIBBus(object):
+    '''
+    Schedules transactions on a single Galvant Industries GPIB adapter, and
+    records the configuration last sent to that adapter.
+
+    Every `GPIBWrapper` that talks through the same adapter connection shares
+    one bus, obtained with `GPIBBus.for_adapter`. A transaction, such as an
+    address switch followed by a command and the read of its response, holds
+    the bus exclusively, so that several threads can safely poll instruments
+    on the same adapter. While the bus is busy, waiting transactions are
+    queued and served by address: those for the address that the adapter is
+    already set to go first, up to ``max_burst`` in a row, followed by those
+    for the address of the longest-waiting transaction. This minimizes the
+    number of ``+a`` switches without starving any instrument.
+
+    Transactions may be nested within a single thread, so that, for example,
+    a binary block read can be kept in the same transaction as the query
+    that started it, as is done by `~instruments.Instrument.exclusive`::
+
+        >>> with inst.exclusive(): # doctest: +SKIP
+        ...     inst.sendcmd("CURV?")
+        ...     data = inst.binblockread(2)
+    '''
+    def __init__(self):
+        self.settings = {}
+        self.last_config_time = 0
+        self.max_burst = 16
+
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = []
+        self._active = None
+        self._burst = 0
+        self._stats = {}
+
+    @classmethod
+    def for_adapter(cls, filelike):
+        '''
+        Returns the bus for the adapter connected by ``filelike``, creating
+        one if needed.
+
+        :rtype: `GPIBBus`
+        '''
+        with _buses_lock:
+            bus = _buses.get(filelike)
+            if bus is None:
+                bus = _buses[filelike] = cls()
+            return bus
+
+    def _next_transaction(self):
+        '''
+        Returns the queued transaction that should be given the bus next.
+        '''
+        current_address = self.settings.get('a')
+        if self._burst < self.max_burst:
+            for trans in self._pending:
+                if trans.address == current_address:
+                    return trans
+        # The oldest transaction picks the next address. Since the pending
+        # list is in order of arrival, this is just its head.
+        return self._pending[0]
+
+    def _address_stats(self, address):
+        if address not in self._stats:
+            self._stats[address] = {
+                'queue_depth': 0,
+                'count': 0,
+                'total_wait': 0.0,
+                'total_latency': 0.0,
+                'max_latency': 0.0,
+            }
+        return self._stats[address]
+
+    @contextlib.contextmanager
+    def transaction(self, address):
+        '''
+        Context manager that holds the bus exclusively for the instrument at
+        ``address`` for the duration of the block.
+
+        :param int address: GPIB address of the instrument being talked to.
+        '''
+        active = self._active
+        if active is not None and active.thread is threading.current_thread():
+            # Nested transaction within the thread that already holds the bus.
+            active.depth += 1
+            try:
+                yield
+            finally:
+                active.depth -= 1
+            return
+
+        trans = _Transaction(address)
+        with self._cond:
+            stats = self._address_stats(address)
+            stats['queue_depth'] += 1
+            self._pending.append(trans)
+            while self._active is not None or self._next_transaction() is not trans:
+                self._cond.wait()
+            self._pending.remove(trans)
+            stats['queue_depth'] -= 1
+            if address == self.settings.get('a'):
+                self._burst += 1
+            else:
+                self._burst = 1
+            self._active = trans
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            with self._cond:
+                end_time = time.time()
+                stats['count'] += 1
+                stats['total_wait'] += start_time - trans.queued_time
+                latency = end_time - trans.queued_time
+                stats['total_latency'] += latency
+                stats['max_latency'] = max(stats['max_latency'], latency)
+                self._active = None
+                self._cond.notify_all()
+
+    def statistics(self):
+        '''
+        Returns the current queue depth and latency statistics of each
+        address that has used this bus. Times are given in seconds, with the
+        latency of a transaction measured from when it was queued until it
+        released the bus.
+
+        :return: Dictionary mapping GPIB addresses to dictionaries with keys
+            ``queue_depth``, ``count``, ``mean_wait``, ``mean_latency`` and
+            ``max_latency``.
+        :rtype: `dict`
+        '''
+        with self._cond:
+            result = {}
+            for address, stats in self._stats.iteritems():
+                count = stats['count']
+                result[address] = {
+                    'queue_depth': stats['queue_depth'],
+                    'count': count,
+                    'mean_wait': stats['total_wait'] / count if count else 0.0,
+                    'mean_latency':
+                        stats['total_latency'] / count if count else 0.0,
+                    'max_latency': stats['max_latency'],
+                }
+            return result
+
+    def reset_state(self):
+        '''
+        Forgets the configuration last sent to the adapter, such that all
+        settings are sent again with the next command.
+        '''
+        self.settings = {}
+
 class GPIBWrapper(io.IOBase, WrapperABC):
     '''
     Wraps a SocketWrapper or PySerial.Serial connection for use with
@@ -50,6 +227,12 @@ class GPIBWrapper(io.IOBase, WrapperABC):
         self._eoi = 1
         self._file.terminator = '\r'
         self._strip = 0
+        self._pacing = _DEFAULT_PACING
+        self._bus = GPIBBus.for_adapter(filelike)
+    
+    # Responses must be prompted with +read, depending on the query sent, and
+    # the adapter must stay addressed to the instrument until then.
+    supports_pipelining = False
     
     def __repr__(self):
         return "<GPIBWrapper object at 0x{:X} "\
@@ -92,8 +275,10 @@ class GPIBWrapper(io.IOBase, WrapperABC):
     @timeout.setter
     def timeout(self, newval):
         newval = int(newval)
-        self._file.sendcmd('+t:{}'.format(newval))
-        self._file.timeout = newval
+        with self._bus.transaction(self._gpib_address):
+            self._paced_sendcmd('+t:{}'.format(newval))
+            self._bus.last_config_time = time.time()
+            self._file.timeout = newval
     
     @property
     def terminator(self):
@@ -136,6 +321,34 @@ class GPIBWrapper(io.IOBase, WrapperABC):
         if newval < 0:
             raise ValueError("Cannot strip negative numbers of characters.")
         self._strip = newval
+
+    @property
+    def bus(self):
+        """
+        Gets the bus scheduler shared by all instruments connected through
+        the same adapter as this one.
+
+        :type: `GPIBBus`
+        """
+        return self._bus
+
+    @property
+    def pacing(self):
+        """
+        Gets/sets the time, in seconds, that the adapter is given to process
+        a ``+`` configuration command before the next write to it. Writes are
+        only delayed if they follow a configuration command, and then only by
+        the part of this interval that has not already elapsed.
+
+        :type: `float`
+        """
+        return self._pacing
+    @pacing.setter
+    def pacing(self, newval):
+        newval = float(newval)
+        if newval < 0:
+            raise ValueError("Pacing interval cannot be negative.")
+        self._pacing = newval
     
     
     ## FILE-LIKE METHODS ##
@@ -154,7 +367,8 @@ class GPIBWrapper(io.IOBase, WrapperABC):
         GI GPIB adapters always terminate serial connections with a CR.
         Function will read until a CR is found.
         '''
-        msg = self._file.read(size)
+        with self._bus.transaction(self._gpib_address):
+            msg = self._file.read(size)
 
         # Check for extra terminators added by the GI-GPIB adapter.
         #if msg[-1] == "\r":
@@ -162,6 +376,27 @@ class GPIBWrapper(io.IOBase, WrapperABC):
 
         return msg
     
+    def readinto(self, buf):
+        '''
+        Reads from the wrapped class directly into ``buf``.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        with self._bus.transaction(self._gpib_address):
+            return self._file.readinto(buf)
+    
+    def exclusive(self):
+        '''
+        Returns a context manager that holds the bus for this instrument for
+        the duration of its block.
+        
+        .. seealso:: `GPIBBus.transaction`
+        '''
+        return self._bus.transaction(self._gpib_address)
+    
     def write(self, msg):
         '''
         Write data string to GPIB connected instrument.
@@ -179,30 +414,65 @@ class GPIBWrapper(io.IOBase, WrapperABC):
         
     ## METHODS ##
     
+    def _adapter_settings(self):
+        '''
+        Returns the adapter settings required by this instrument, as a list of
+        ``(command, value)`` pairs.
+        '''
+        settings = [
+            ('a', self._gpib_address),
+            ('eoi', self._eoi),
+            ('strip', self._strip),
+        ]
+        if self._eoi is 0:
+            settings.append(('eos', self._terminator))
+        return settings
+
+    def _paced_sendcmd(self, msg):
+        '''
+        Sends a message to the adapter, first waiting out whatever remains of
+        the pacing interval following the last configuration command.
+        '''
+        remaining = self._bus.last_config_time + self._pacing - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        self._file.sendcmd(msg)
+
+    def reset_adapter_state(self):
+        '''
+        Forgets the configuration last sent to the adapter, such that all
+        settings are sent again with the next command. This should be called
+        if the adapter has been reset or power cycled.
+        '''
+        self._bus.reset_state()
+
     def sendcmd(self, msg):
         '''
+        Sends a command to the instrument. The adapter is first sent any of
+        the ``+a``, ``+eoi``, ``+strip`` and ``+eos`` commands whose values
+        differ from those last sent to it.
         '''
         if msg == '':
             return
-        self._file.sendcmd('+a:' + str(self._gpib_address))
-        time.sleep(0.01)
-        self._file.sendcmd('+eoi:{}'.format(self._eoi))
-        time.sleep(0.01)
-        self._file.sendcmd('+strip:{}'.format(self._strip))
-        time.sleep(0.01)
-        if self._eoi is 0:
-            self._file.sendcmd('+eos:{}'.format(self._terminator))
-            time.sleep(0.01)
-        self._file.sendcmd(msg)
-        time.sleep(0.01)
+        bus = self._bus
+        with bus.transaction(self._gpib_address):
+            for cmd, value in self._adapter_settings():
+                if bus.settings.get(cmd) != value:
+                    self._paced_sendcmd('+{}:{}'.format(cmd, value))
+                    bus.settings[cmd] = value
+                    bus.last_config_time = time.time()
+            self._paced_sendcmd(msg)
         
     def query(self, msg, size=-1):
         '''
+        Sends a query to the instrument and reads its response, holding the
+        bus for the whole exchange.
         '''
-        self.sendcmd(msg)
-        if '?' not in msg:
-            self._file.sendcmd('+read')
-        return self._file.read(size).strip()
+        with self._bus.transaction(self._gpib_address):
+            self.sendcmd(msg)
+            if '?' not in msg:
+                self._file.sendcmd('+read')
+            return self._file.read(size).strip()
         
         
     
@@ -29,7 +29,9 @@ import serial
 import time
 import struct
 import socket
+import threading
 import urlparse
+import Queue
 
 import serialManager as sm
 import socketwrapper as sw
@@ -38,7 +40,9 @@ import visawrapper as vw
 import file_communicator as fc
 import loopback_wrapper as lw
 import gi_gpib
+from batch import QueryBatch
 from instruments.abstract_instruments import WrapperABC
+from instruments.util_fns import ShadowCache, property_registry
 import os
 
 try:
@@ -67,11 +71,64 @@ _DEFAULT_FORMATS = collections.defaultdict(lambda: '>b')
 _DEFAULT_FORMATS.update({
     1: '>b',
     2: '>h',
-    4: '>i'
+    4: '>i',
+    8: '>q'
 })
 
+# Size in bytes of the chunks in which binary blocks are streamed, and the
+# number of such chunks in flight between the reader and writer.
+_STREAM_CHUNK_SIZE = 2**20
+_STREAM_N_BUFFERS = 3
+
+# Largest number of properties read by a single batch in snapshot().
+_SNAPSHOT_BATCH_SIZE = 8
+
 ## CLASSES #####################################################################
 
+class _ChunkWriter(threading.Thread):
+    '''
+    Background thread that stores the chunks of a streamed binary block into
+    their destination, while the next chunks are read from the instrument.
+    
+    Chunk buffers cycle between the ``free`` queue, from which the reader
+    takes a buffer to fill, and the ``full`` queue, from which this thread
+    takes buffers to store. Putting `None` onto ``full`` stops the thread.
+    '''
+    
+    def __init__(self, dest, transform, chunk_points, fmt):
+        super(_ChunkWriter, self).__init__()
+        self.daemon = True
+        self.error = None
+        self._dest = dest
+        self._transform = transform
+        self.free = Queue.Queue()
+        self.full = Queue.Queue()
+        for _ in xrange(_STREAM_N_BUFFERS):
+            self.free.put(np.empty(chunk_points, dtype=fmt))
+            
+    def run(self):
+        offset = 0
+        while True:
+            item = self.full.get()
+            if item is None:
+                break
+            buf, n_points = item
+            # After an error, keep cycling buffers so that the reader is
+            # never left waiting on the free queue.
+            if self.error is None:
+                try:
+                    data = buf[:n_points]
+                    if self._transform is not None:
+                        data = self._transform(data)
+                    if isinstance(self._dest, np.ndarray):
+                        self._dest[offset:offset + n_points] = data
+                    else:
+                        self._dest.write(data.tostring())
+                    offset += n_points
+                except Exception as ex:
+                    self.error = ex
+            self.free.put(buf)
+
 class Instrument(object):
 
     # Set a default terminator.
@@ -86,6 +143,7 @@ class Instrument(object):
         else:
             raise TypeError('Instrument must be initialized with a filelike '
                               'object that is a subclass of WrapperABC.')
+        self._shadow_cache = None
     
     ## COMMAND-HANDLING METHODS ##
     
@@ -96,7 +154,9 @@ class Instrument(object):
         :param str cmd: String containing the command to
             be sent.
         """
-        self._file.sendcmd(str(cmd))
+        cmd = str(cmd)
+        self._check_state_change(cmd)
+        self._file.sendcmd(cmd)
         
     def query(self, cmd, size=-1):
         """
@@ -110,8 +170,195 @@ class Instrument(object):
             connected instrument.
         :rtype: `str`
         """
+        cmd = str(cmd)
+        self._check_state_change(cmd)
         return self._file.query(cmd, size)
         
+    ## SHADOW CACHE ##
+    
+    def enable_shadow_cache(self, ttl=None):
+        """
+        Enables caching of the values of properties generated by the
+        factories in `instruments.util_fns`. Once enabled, such properties
+        are only queried if their value has not been written or read within
+        the last ``ttl`` seconds, and writes of the value they already have
+        are skipped. Properties declared as volatile are never cached.
+        
+        The cache is invalidated when a message containing ``*RST`` or
+        ``*RCL`` is sent through `~Instrument.sendcmd` or
+        `~Instrument.query`, and can be invalidated explicitly by
+        `~Instrument.invalidate`, such as after changing settings from the
+        front panel or writing to the connection directly.
+        
+        Values written are cached as sent, so that if the instrument rounds
+        or rejects a value, the cache differs from the instrument until it is
+        invalidated. Properties for which this matters should be declared as
+        volatile.
+        
+        :param float ttl: Time in seconds for which values are kept, or
+            `None` to keep them until invalidated.
+        """
+        self._shadow_cache = ShadowCache(ttl)
+        
+    def _check_state_change(self, cmd):
+        """
+        Invalidates the shadow cache if ``cmd`` resets or recalls the state
+        of the instrument, which changes the values of its properties behind
+        the back of the cache. Such commands may appear anywhere in a
+        compound message. Messages are only scanned if the shadow cache is
+        enabled.
+        """
+        if getattr(self, '_shadow_cache', None) is None:
+            return
+        cmd = cmd.upper()
+        if '*RST' in cmd or '*RCL' in cmd:
+            self.invalidate()
+        
+    def disable_shadow_cache(self):
+        """
+        Disables caching of property values, as enabled by
+        `~Instrument.enable_shadow_cache`.
+        """
+        self._shadow_cache = None
+        
+    def invalidate(self, name=None):
+        """
+        Forgets the cached value of the property with the given command, or of
+        all properties if ``name`` is `None`. Does nothing if the shadow cache
+        is not enabled.
+        
+        :param str name: Command of the property to invalidate.
+        """
+        cache = getattr(self, '_shadow_cache', None)
+        if cache is not None:
+            cache.invalidate(name)
+        
+    ## PROPERTY REGISTRY ##
+    
+    @classmethod
+    def properties(cls):
+        """
+        Returns a description of each property of this class generated by the
+        property factories in `instruments.util_fns`.
+        
+        :return: Mapping from attribute names to their descriptions.
+        :rtype: `dict` of `~instruments.util_fns.PropertyInfo`
+        """
+        return dict(
+            (name, prop.info)
+            for name, prop in property_registry(cls).iteritems()
+        )
+        
+    def snapshot(self):
+        """
+        Reads the values of all settable properties of this instrument that
+        are listed by `~Instrument.properties`, using batches of queries. If
+        the responses to a batch cannot be parsed, or do not match its
+        queries, as happens when the instrument does not support one of
+        them, its properties are read one at a time instead, and those whose
+        responses cannot be parsed are left out of the snapshot. If the
+        shadow cache is enabled, it is refreshed with the values read.
+        
+        If a read times out, the snapshot is abandoned by raising an
+        `IOError`, as the late response could otherwise be taken as the
+        value of another property.
+        
+        :return: Mapping from attribute names to values, which can be passed
+            to `~Instrument.restore`.
+        :rtype: `dict`
+        """
+        registry = property_registry(type(self))
+        names = sorted(
+            name for name, prop in registry.iteritems()
+            if not prop.info.readonly
+        )
+        snapshot = {}
+        for idx in xrange(0, len(names), _SNAPSHOT_BATCH_SIZE):
+            chunk = names[idx:idx + _SNAPSHOT_BATCH_SIZE]
+            batch = self.batch()
+            try:
+                with batch:
+                    futures = [
+                        batch.query(
+                            "{}?".format(registry[name].info.command),
+                            registry[name].parse
+                        )
+                        for name in chunk
+                    ]
+                snapshot.update(
+                    (name, future.result())
+                    for name, future in zip(chunk, futures)
+                )
+            except (IOError, ValueError):
+                if not batch.in_step:
+                    # A late response to the batch would be taken as the
+                    # response to the queries below, giving wrong values.
+                    raise
+                # Reads that fail here are not caught, for the same reason.
+                for name in chunk:
+                    prop = registry[name]
+                    try:
+                        snapshot[name] = prop.parse(
+                            self.query("{}?".format(prop.info.command))
+                        )
+                    except ValueError:
+                        pass
+        
+        cache = getattr(self, '_shadow_cache', None)
+        if cache is not None:
+            for name, value in snapshot.iteritems():
+                cache[registry[name].info.command] = value
+        return snapshot
+        
+    def restore(self, snapshot):
+        """
+        Restores the properties of this instrument to the values in a
+        snapshot taken by `~Instrument.snapshot`. The current values are read
+        first, such that only those properties whose values differ are
+        written.
+        
+        :param dict snapshot: Mapping from attribute names to values.
+        """
+        current = self.snapshot()
+        for name in sorted(snapshot):
+            value = snapshot[name]
+            if name in current and bool(current[name] == value):
+                continue
+            setattr(self, name, value)
+        
+    def batch(self):
+        """
+        Returns a batch that collects queries to this instrument, and sends
+        them together when executed. For generic instruments, the queries
+        are written back-to-back before any of the responses are read. Used
+        as a context manager, the batch is executed at the end of the block.
+        
+        >>> with inst.batch() as batch: # doctest: +SKIP
+        ...     volts = batch.query('VOLT?', float)
+        ...     amps = batch.query('CURR?', float)
+        >>> print volts.result(), amps.result() # doctest: +SKIP
+        
+        :rtype: `~instruments.abstract_instruments.batch.QueryBatch`
+        """
+        return QueryBatch(self)
+
+    def exclusive(self):
+        """
+        Returns a context manager that keeps other instruments sharing the
+        same connection, such as several instruments on one GPIB adapter,
+        from using it within its block. This keeps exchanges made of several
+        reads and writes, such as a query followed by the read of a binary
+        block, from being interleaved with those of other threads. For
+        connections used by a single instrument, this does nothing.
+
+        >>> with inst.exclusive(): # doctest: +SKIP
+        ...     inst.sendcmd('CURV?')
+        ...     data = inst.binblockread(2)
+
+        Blocks may be nested within a single thread.
+        """
+        return self._file.exclusive()
+
     ## PROPERTIES ##
     
     @property
@@ -171,7 +418,7 @@ class Instrument(object):
         '''
         self._file.write(msg)        
         
-    def binblockread(self, data_width, fmt=None):
+    def binblockread(self, data_width, fmt=None, out=None):
         '''
         Read a binary data block from attached instrument.
         This requires that the instrument respond in a particular manner
@@ -179,36 +426,239 @@ class Instrument(object):
         
         The format is as follows:
         #{number of following digits:1-9}{num of bytes to be read}{data bytes}
+        
+        The indefinite-length form, ``#0{data bytes}``, followed by the
+        terminator, is also supported. As the terminator character may also
+        occur within the data, it is best to pass ``out`` when reading
+        indefinite-length blocks, such that exactly the expected number of
+        bytes is read.
+        
+        The data bytes are read directly into a NumPy array, without first
+        being collected into a `str`. If ``out`` is given, they are instead
+        read into that buffer, so that the same memory can be reused for
+        many blocks.
+        
+        The block is read within `~Instrument.exclusive`. To keep the query
+        that requests the block in the same exchange, send it within an
+        enclosing `~Instrument.exclusive` block.
 
         :param int data_width: Specify the number of bytes wide each data
-            point is. One of [1,2].
+            point is. One of [1,2,4,8].
         
         :param str fmt: Format string as specified by the :mod:`struct` module,
             or `None` to choose a format automatically based on the data
-            width.        
+            width. Ignored if ``out`` is a `numpy.ndarray`, in which case the
+            data type of ``out`` is used.
+            
+        :param out: Preallocated buffer into which the data is read. It must
+            be at least as large as the block.
+        :type out: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        
+        :return: Array of the data points in the block. If ``out`` is given,
+            this is a view onto ``out``.
+        :rtype: `numpy.ndarray`
+        '''
+        with self.exclusive():
+            if data_width not in [1, 2, 4, 8]:
+                raise ValueError('Data width must be 1, 2, 4 or 8.')
+            num_of_bytes = self._read_binblock_header()
+        
+            # Make or use the required format string.
+            if fmt is None:
+                fmt = _DEFAULT_FORMATS[data_width]
+            
+            if out is not None:
+                if isinstance(out, np.ndarray):
+                    if not out.flags.c_contiguous:
+                        raise ValueError('Output array must be contiguous.')
+                    out = out.reshape(-1)
+                    if out.dtype.itemsize != data_width:
+                        raise ValueError('Output array has items of {} bytes, '
+                                         'but the data width is {}.'.format(
+                                            out.dtype.itemsize, data_width
+                                         ))
+                else:
+                    out = np.frombuffer(out, dtype=fmt)
+                
+            if num_of_bytes is None:
+                # Indefinite-length block, running up to the terminator.
+                if out is None:
+                    return np.frombuffer(self._read_terminated(), dtype=fmt)
+                self._readinto_exactly(out)
+                # Discard the terminator following the block.
+                self._read_terminated()
+                return out
+            
+            n_points = num_of_bytes // data_width
+            if out is None:
+                out = np.empty(n_points, dtype=fmt)
+            elif len(out) < n_points:
+                raise ValueError('Output buffer holds {} points, but the block '
+                                 'contains {}.'.format(len(out), n_points))
+            else:
+                out = out[:n_points]
+            self._readinto_exactly(out)
+            return out
+            
+    def binblockread_to(self, dest, data_width, fmt=None, transform=None,
+                        chunk_size=_STREAM_CHUNK_SIZE):
+        '''
+        Reads a binary data block, in the same format as for
+        `~Instrument.binblockread`, but streams it to ``dest`` in chunks of
+        at most ``chunk_size`` bytes rather than reading the whole block into
+        memory. Memory use thus stays constant regardless of the length of
+        the block.
+        
+        If ``dest`` is a file or the name of a file, each chunk is written to
+        it by a background thread while the next chunk is being read. If
+        ``dest`` is an array, such as a `numpy.memmap`, the data is read
+        directly into it, or, if ``transform`` is given, stored into it by
+        the background thread.
+        
+        >>> inst.sendcmd('CURV?') # doctest: +SKIP
+        >>> data = np.memmap('record.dat', dtype='>i2', mode='w+',
+        ...                  shape=(10**7,)) # doctest: +SKIP
+        >>> n_points = inst.binblockread_to(data, 2) # doctest: +SKIP
+        
+        :param dest: Destination for the data points.
+        :type dest: `str` giving a file name, `file`, or `numpy.ndarray`
+        :param int data_width: Specify the number of bytes wide each data
+            point is. One of [1,2,4,8].
+        :param str fmt: Format string as specified by the :mod:`struct`
+            module, or `None` to choose a format automatically based on the
+            data width. Ignored if ``dest`` is an array and ``transform``
+            is `None`, in which case the data type of ``dest`` is used.
+        :param callable transform: Function applied to the array of raw
+            data points in each chunk, such as to scale them, returning the
+            array to be stored. If `None`, the raw data is stored.
+        :param int chunk_size: Size in bytes of the chunks in which data is
+            read.
+        
+        If storing a chunk fails, the rest of the block and its terminator
+        are read and discarded before the error is raised, such that the
+        connection can still be used. As for `~Instrument.binblockread`, the
+        block is read within `~Instrument.exclusive`.
+        
+        :return: Number of data points read.
+        :rtype: `int`
+        '''
+        with self.exclusive():
+            if data_width not in [1, 2, 4, 8]:
+                raise ValueError('Data width must be 1, 2, 4 or 8.')
+            if fmt is None:
+                fmt = _DEFAULT_FORMATS[data_width]
+            num_of_bytes = self._read_binblock_header()
+        
+            is_array = isinstance(dest, np.ndarray)
+            if is_array:
+                if not dest.flags.c_contiguous:
+                    raise ValueError('Destination array must be contiguous.')
+                dest = dest.reshape(-1)
+            if num_of_bytes is not None:
+                n_points = num_of_bytes // data_width
+            elif is_array:
+                n_points = len(dest)
+            else:
+                raise IOError('Indefinite-length blocks can only be streamed '
+                              'into arrays, whose size sets the length of the '
+                              'block.')
+            if is_array and len(dest) < n_points:
+                raise ValueError('Destination array holds {} points, but the '
+                                 'block contains {}.'.format(
+                                    len(dest), n_points
+                                 ))
+            chunk_points = max(1, chunk_size // data_width)
+        
+            if is_array and transform is None:
+                if dest.dtype.itemsize != data_width:
+                    raise ValueError('Destination array has items of {} '
+                                     'bytes, but the data width is {}.'.format(
+                                        dest.dtype.itemsize, data_width
+                                     ))
+                for start in xrange(0, n_points, chunk_points):
+                    self._readinto_exactly(dest[start:start + chunk_points])
+            else:
+                close_dest = isinstance(dest, basestring)
+                if close_dest:
+                    dest = open(dest, 'wb')
+                writer = _ChunkWriter(dest, transform, chunk_points, fmt)
+                writer.start()
+                n_read = 0
+                try:
+                    for start in xrange(0, n_points, chunk_points):
+                        n_chunk = min(chunk_points, n_points - start)
+                        buf = writer.free.get()
+                        self._readinto_exactly(buf[:n_chunk])
+                        n_read += n_chunk
+                        writer.full.put((buf, n_chunk))
+                        if writer.error is not None:
+                            break
+                finally:
+                    writer.full.put(None)
+                    writer.join()
+                    if close_dest:
+                        dest.close()
+                if writer.error is not None:
+                    # Discard the rest of the block and its terminator, so that
+                    # they are not mistaken for the response to the next query.
+                    n_left = (n_points - n_read) * data_width
+                    while n_left > 0:
+                        discarded = self._file.read(min(n_left, chunk_size))
+                        if not discarded:
+                            break
+                        n_left -= len(discarded)
+                    self._read_terminated()
+                    raise writer.error
+                
+            if num_of_bytes is None:
+                # Discard the terminator following the block.
+                self._read_terminated()
+            return n_points
+            
+    def _read_binblock_header(self):
+        '''
+        Reads the header of a binary data block.
+        
+        :return: Number of bytes in the block, or `None` for an
+            indefinite-length block.
         '''
-        if(data_width not in [1,2]):
-            print 'Error: Data width must be 1 or 2.'
-            return 0
         # This needs to be a # symbol for valid binary block
         symbol = self._file.read(1)
         if(symbol != '#'): # Check to make sure block is valid
             raise IOError('Not a valid binary block start. Binary blocks '
                                 'require the first character to be #.')
-        else:
-            # Read in the num of digits for next part
-            digits = int(self._file.read(1))
+        
+        # Read in the num of digits for next part
+        digits = int(self._file.read(1))
+        if digits == 0:
+            return None
+        
+        # Read in the num of bytes to be read
+        return int(self._file.read(digits))
             
-            # Read in the num of bytes to be read
-            num_of_bytes = int(self._file.read(digits))
+    def _read_terminated(self):
+        '''
+        Reads up to the next terminator, returning the data without the
+        terminator, regardless of whether the wrapper keeps it.
+        '''
+        raw = self._file.read(-1)
+        terminator = self.terminator
+        if self._file.keeps_terminator and terminator and \
+                raw.endswith(terminator):
+            raw = raw[:-len(terminator)]
+        return raw
             
-            # Make or use the required format string.
-            if fmt is None:
-                fmt = _DEFAULT_FORMATS[data_width]
-                
-            # Read in the data bytes, and pass them to numpy using the specified
-            # data type (format).
-            return np.frombuffer(self._file.read(num_of_bytes), dtype=fmt)
+    def _readinto_exactly(self, out):
+        '''
+        Fills ``out`` from the connection, raising an `IOError` if the read
+        comes up short.
+        '''
+        n_bytes = out.nbytes
+        n_read = self._file.readinto(out)
+        if n_read != n_bytes:
+            raise IOError('Binary block ended after {} of {} bytes.'.format(
+                n_read, n_bytes
+            ))
             
     ## CLASS METHODS ##
 
@@ -36,6 +36,8 @@ class LoopbackWrapper(io.IOBase, WrapperABC):
     Used for testing various controllers
     """
     
+    supports_raw_reads = True
+    
     def __init__(self, stdin=None, stdout=None):
         self._terminator = '\n'
         self._stdout = stdout
@@ -101,11 +103,24 @@ class LoopbackWrapper(io.IOBase, WrapperABC):
         :rtype: `str`
         """
         if self._stdin is not None:
-            input_var = self._stdin.read(size)
+            if size == -1:
+                # Read a single response, up to and not including the
+                # terminator, so that several queries can be answered from
+                # the same input.
+                input_var = ""
+                c = self._stdin.read(1)
+                while c and c != self._terminator:
+                    input_var += c
+                    c = self._stdin.read(1)
+            else:
+                input_var = self._stdin.read(size)
         else:
             input_var = raw_input("Desired Response: ")
         return input_var
         
+    def read_raw(self, size):
+        return self.read(size)
+        
     def write(self, msg):
         if self._stdout is not None:
             self._stdout.write(msg)
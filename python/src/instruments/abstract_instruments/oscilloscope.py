@@ -31,10 +31,161 @@ from __future__ import division
 
 import abc
 
+import numpy as np
+import quantities as pq
+
 from instruments.abstract_instruments import Instrument
 
 ## CLASSES #####################################################################
 
+class Waveform(object):
+    '''
+    Waveform read from an oscilloscope, stored compactly as the raw samples
+    returned by the instrument along with the metadata needed to scale them.
+    Scaled values are only computed when asked for, so that many waveforms
+    can be held in memory at the cost of their raw data alone.
+    
+    The y values are given by ``(raw - yoffs) * ymult + yzero``, and the x
+    values by ``xzero + xincr * np.arange(n_points)``.
+    
+    Scaled values are computed anew on each access of `x` and `y`, and are
+    not kept by the waveform, so hold on to the returned arrays rather than
+    accessing these properties repeatedly.
+    
+    Slicing a waveform returns a new `Waveform` viewing the same raw data,
+    without copying it. For compatibility with the ``(x, y)`` tuples
+    previously returned by ``read_waveform``, a waveform can also be
+    unpacked into its x and y arrays, or indexed by ``0`` and ``1`` to get
+    them. Such indexing is deprecated in favor of `x` and `y`.
+    
+    >>> wf = Waveform(np.arange(4, dtype=np.int8), ymult=0.5, xincr=1e-3)
+    >>> np.allclose(wf[1:3].y, [0.5, 1])
+    True
+    >>> x, y = wf
+    
+    :param raw: Raw samples, as returned by the oscilloscope.
+    :type raw: `numpy.ndarray`
+    :param float yoffs: Offset of the raw samples, in digitizer levels.
+    :param float ymult: Scale factor from digitizer levels to y units.
+    :param float yzero: Offset of the scaled y values, in y units.
+    :param float xincr: Spacing between samples, in x units.
+    :param float xzero: x value of the first sample.
+    :param y_units: If not `None`, the units in which the y values are
+        returned as a `~quantities.Quantity`.
+    '''
+    
+    def __init__(self, raw, yoffs=0.0, ymult=1.0, yzero=0.0,
+                 xincr=1.0, xzero=0.0, y_units=None):
+        self._raw = np.asarray(raw)
+        self.yoffs = float(yoffs)
+        self.ymult = float(ymult)
+        self.yzero = float(yzero)
+        self.xincr = float(xincr)
+        self.xzero = float(xzero)
+        self.y_units = y_units
+        
+    def __repr__(self):
+        return "<Waveform of {} points at 0x{:X}>".format(
+            self.n_points, id(self)
+        )
+        
+    def __iter__(self):
+        # Allows unpacking as x, y = waveform.
+        yield self.x
+        yield self.y
+        
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, long)):
+            # Deprecated, as for the x, y tuples formerly returned.
+            if idx in (0, -2):
+                return self.x
+            elif idx in (1, -1):
+                return self.y
+            raise IndexError("Waveform index out of range.")
+        if not isinstance(idx, slice):
+            raise TypeError("Waveforms can only be indexed by integers or "
+                            "slices.")
+        start, _, step = idx.indices(self.n_points)
+        return Waveform(
+            self._raw[idx],
+            yoffs=self.yoffs, ymult=self.ymult, yzero=self.yzero,
+            xincr=self.xincr * step, xzero=self.xzero + self.xincr * start,
+            y_units=self.y_units
+        )
+        
+    ## PROPERTIES ##
+    
+    @property
+    def raw(self):
+        '''
+        Gets the raw samples of this waveform.
+        
+        :type: `numpy.ndarray`
+        '''
+        return self._raw
+        
+    @property
+    def n_points(self):
+        '''
+        Gets the number of points in this waveform.
+        
+        :type: `int`
+        '''
+        return len(self._raw)
+        
+    @property
+    def x(self):
+        '''
+        Gets the x values of this waveform as double-precision floats. These
+        are computed on each access.
+        
+        :type: `numpy.ndarray`
+        '''
+        return self.get_x()
+        
+    @property
+    def y(self):
+        '''
+        Gets the y values of this waveform as double-precision floats, or as
+        a `~quantities.Quantity` if the waveform has y units. These are
+        computed on each access.
+        
+        :type: `numpy.ndarray` or `~quantities.Quantity`
+        '''
+        y = self.get_y()
+        if self.y_units is not None:
+            y = pq.Quantity(y, self.y_units, copy=False)
+        return y
+        
+    ## METHODS ##
+    
+    def get_x(self, dtype=np.float64):
+        '''
+        Computes the x values of this waveform.
+        
+        :param dtype: Floating point type of the returned values, such as
+            `numpy.float32` to halve their memory use.
+        :rtype: `numpy.ndarray`
+        '''
+        x = np.arange(self.n_points, dtype=dtype)
+        x *= self.xincr
+        x += self.xzero
+        return x
+        
+    def get_y(self, dtype=np.float64):
+        '''
+        Computes the scaled y values of this waveform.
+        
+        :param dtype: Floating point type of the returned values, such as
+            `numpy.float32` to halve their memory use.
+        :rtype: `numpy.ndarray`
+        '''
+        y = self._raw.astype(dtype)
+        y -= self.yoffs
+        y *= self.ymult
+        y += self.yzero
+        return y
+
 class OscilloscopeDataSource(object):
     __metaclass__ = abc.ABCMeta
     
@@ -48,6 +199,11 @@ class OscilloscopeDataSource(object):
     
     @abc.abstractmethod
     def read_waveform(self, bin_format=True):
+        '''
+        Reads a waveform from this data source.
+        
+        :rtype: `Waveform`
+        '''
         raise NotImplementedError
 
 class OscilloscopeChannel(object):
@@ -31,6 +31,7 @@ import serial
 import numpy as np
 
 from instruments.abstract_instruments import WrapperABC
+from instruments.abstract_instruments.wrapperabc import byte_view
 
 ## CLASSES #####################################################################
 
@@ -48,6 +49,12 @@ class SerialWrapper(io.IOBase, WrapperABC):
             self._capture = False
         else:
             raise TypeError('SerialWrapper must wrap a serial.Serial object.')
+
+        # Read-ahead buffer holding bytes that have been read from the serial
+        # port, but not yet returned by read. Each read drains everything
+        # that is waiting on the port, so surplus bytes carry over to the
+        # next read or query.
+        self._buf = bytearray()
     
     def __repr__(self):
         return "<SerialWrapper object at 0x{:X} "\
@@ -83,7 +90,10 @@ class SerialWrapper(io.IOBase, WrapperABC):
         return self._conn.timeout
     @timeout.setter
     def timeout(self, newval):
-        newval = int(newval)
+        # pySerial takes fractional timeouts in seconds, and None to block
+        # without limit.
+        if newval is not None:
+            newval = float(newval)
         self._conn.timeout = newval
 
     @property
@@ -117,24 +127,87 @@ class SerialWrapper(io.IOBase, WrapperABC):
         finally:
             self._conn.close()
         
+    def _fill_buffer(self, size=1):
+        '''
+        Reads at least ``size`` bytes, or everything waiting in the serial
+        port's input buffer if that is more, into the read-ahead buffer.
+        Blocks until the bytes arrive or the port times out.
+
+        :return: Number of bytes that were read.
+        :rtype: `int`
+        '''
+        chunk = self._conn.read(max(size, self._conn.inWaiting()))
+        self._buf += chunk
+        return len(chunk)
+
+    def _take(self, size):
+        '''
+        Removes and returns the first ``size`` bytes of the read-ahead buffer.
+        '''
+        result = bytes(self._buf[:size])
+        del self._buf[:size]
+        return result
+
     def read(self, size):
+        '''
+        Reads from the serial port. If ``size`` is non-negative, up to
+        ``size`` bytes are returned, fewer only if the port times out. If
+        ``size`` is -1, data is returned up to, but not including, the next
+        terminator character. If no terminator is set, data is instead read
+        until the port times out.
+
+        :param int size: Number of bytes to read, or -1 to read until the
+            terminator.
+        :rtype: `str`
+        '''
         if (size >= 0):
-            resp = self._conn.read(size)
-            if self._debug:
-                print " -> {} ".format(repr(resp))
-            return resp
+            while len(self._buf) < size:
+                if not self._fill_buffer(size - len(self._buf)):
+                    break
+            resp = self._take(size)
         elif (size == -1):
-            result = bytearray()
-            c = 0
-            while c != self._terminator:
-                c = self._conn.read(1)
-                if c != self._terminator:
-                    result += c
-            if self._debug:
-                print " -> {} ".format(repr(result))
-            return bytes(result)
+            if not self._terminator:
+                while self._fill_buffer():
+                    pass
+                resp = self._take(len(self._buf))
+            else:
+                # Only search the bytes that arrived on each pass, rather than
+                # the whole buffer.
+                idx = self._buf.find(self._terminator)
+                while idx == -1:
+                    start = len(self._buf)
+                    self._fill_buffer()
+                    idx = self._buf.find(self._terminator, start)
+                resp = self._take(idx)
+                del self._buf[:len(self._terminator)]
         else:
             raise ValueError('Must read a positive value of characters.')
+        if self._debug:
+            print " -> {} ".format(repr(resp))
+        return resp
+        
+    def readinto(self, buf):
+        '''
+        Fills ``buf`` with data from the serial port, starting with any bytes
+        left in the read-ahead buffer. Fewer bytes are read only if the port
+        times out.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        view = byte_view(buf)
+        size = len(view)
+        n_read = min(size, len(self._buf))
+        view[:n_read] = self._take(n_read)
+        while n_read < size:
+            chunk = self._conn.read(size - n_read)
+            if not chunk:
+                break
+            view[n_read:n_read + len(chunk)] = chunk
+            n_read += len(chunk)
+        return n_read
         
     def write(self, msg):
         if self._debug:
@@ -154,8 +227,10 @@ class SerialWrapper(io.IOBase, WrapperABC):
         Instruct the wrapper to flush the input buffer, discarding the entirety
         of its contents.
         
-        Calls the pyserial flushInput() method.
+        Calls the pyserial flushInput() method, and also discards anything
+        held in the read-ahead buffer.
         '''
+        self._buf = bytearray()
         self._conn.flushInput()
         
     ## METHODS ##
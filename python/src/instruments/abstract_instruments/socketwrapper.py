@@ -32,6 +32,14 @@ import socket
 import numpy as np
 
 from instruments.abstract_instruments import WrapperABC
+from instruments.abstract_instruments.wrapperabc import byte_view
+
+## CONSTANTS ###################################################################
+
+# Number of bytes requested from the socket with each call to recv. This is
+# large enough that ASCII responses typically arrive in a single system call,
+# while binary block transfers are still broken into reasonably-sized pieces.
+_RECV_CHUNK_SIZE = 4096
 
 ## CLASSES #####################################################################
 
@@ -50,6 +58,15 @@ class SocketWrapper(io.IOBase, WrapperABC):
             self._debug = False
         else:
             raise TypeError('SocketWrapper must wrap a socket.socket object.')
+
+        # Bytes that have been received from the socket, but not yet returned
+        # by read. This lets us pull data off the socket in large chunks,
+        # rather than issuing a recv call for every byte of a response.
+        self._buf = bytearray()
+        self._chunk_size = _RECV_CHUNK_SIZE
+        
+    # Reads up to the terminator include it, see read.
+    keeps_terminator = True
         
     def __repr__(self):
         return "<SocketWrapper object at 0x{:X} "\
@@ -95,19 +112,85 @@ class SocketWrapper(io.IOBase, WrapperABC):
         finally:
             self._conn.close()
         
+    def _fill_buffer(self):
+        '''
+        Receives the next chunk of data from the socket and appends it to the
+        internal receive buffer.
+        '''
+        chunk = self._conn.recv(self._chunk_size)
+        if not chunk:
+            raise IOError('Connection closed by {} while reading.'.format(
+                self._conn.getpeername()
+            ))
+        self._buf += chunk
+
+    def _take(self, size):
+        '''
+        Removes and returns the first ``size`` bytes of the receive buffer.
+        '''
+        result = bytes(self._buf[:size])
+        del self._buf[:size]
+        return result
+
     def read(self, size):
+        '''
+        Reads from the socket. If ``size`` is non-negative, exactly ``size``
+        bytes are returned, blocking until they have all arrived. If ``size``
+        is -1, data is returned up to and including the next terminator
+        character, or, if no terminator is set, whatever data is currently
+        available.
+
+        Any bytes received past the requested amount are kept in an internal
+        buffer and returned by subsequent reads.
+
+        :param int size: Number of bytes to read, or -1 to read until the
+            terminator.
+        :rtype: `str`
+        '''
         if (size >= 0):
-            return self._conn.recv(size)
+            while len(self._buf) < size:
+                self._fill_buffer()
+            return self._take(size)
         elif (size == -1):
-            result = bytearray()
-            c = 0
-            while c != self._terminator:
-                c = self._conn.recv(1)
-                result += c
-            return bytes(result)
+            if not self._terminator:
+                if not self._buf:
+                    self._fill_buffer()
+                return self._take(len(self._buf))
+            # Only scan the newly received part of the buffer on each pass,
+            # so that long responses are not searched repeatedly.
+            idx = self._buf.find(self._terminator)
+            while idx == -1:
+                start = len(self._buf)
+                self._fill_buffer()
+                idx = self._buf.find(self._terminator, start)
+            return self._take(idx + 1)
         else:
             raise ValueError('Must read a positive value of characters.')
         
+    def readinto(self, buf):
+        '''
+        Fills ``buf`` with data from the socket, starting with any bytes left
+        in the receive buffer by previous reads, and then receiving directly
+        into ``buf``.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        view = byte_view(buf)
+        size = len(view)
+        n_read = min(size, len(self._buf))
+        view[:n_read] = self._take(n_read)
+        while n_read < size:
+            n_recv = self._conn.recv_into(view[n_read:], size - n_read)
+            if not n_recv:
+                raise IOError('Connection closed by {} while reading.'.format(
+                    self._conn.getpeername()
+                ))
+            n_read += n_recv
+        return n_read
+        
     def write(self, string):
         self._conn.sendall(string)
         
@@ -122,7 +205,17 @@ class SocketWrapper(io.IOBase, WrapperABC):
         Instruct the wrapper to flush the input buffer, discarding the entirety
         of its contents.
         '''
-        _ = self.read(-1) # Read in everything in the buffer and trash it
+        self._buf = bytearray()
+        # Drain anything already waiting on the socket without blocking.
+        timeout = self._conn.gettimeout()
+        self._conn.settimeout(0)
+        try:
+            while self._conn.recv(self._chunk_size):
+                pass
+        except socket.error:
+            pass
+        finally:
+            self._conn.settimeout(timeout)
         
     ## METHODS ##
     
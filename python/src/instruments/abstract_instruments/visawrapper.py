@@ -37,10 +37,17 @@ try:
     import visa
 except (ImportError, WindowsError, OSError):
     visa = None
+# Raw reads use the low-level VPP-4.3 interface, which is specific to older
+# versions of PyVISA.
+try:
+    from pyvisa import vpp43
+except (ImportError, WindowsError, OSError):
+    vpp43 = None
 
 import numpy as np
 
 from instruments.abstract_instruments import WrapperABC
+from instruments.abstract_instruments.wrapperabc import byte_view
 
 ## CLASSES #####################################################################
 
@@ -49,6 +56,8 @@ class VisaWrapper(io.IOBase, WrapperABC):
     Wraps a connection exposed by the VISA library.
     """
     
+    supports_raw_reads = vpp43 is not None
+    
     def __init__(self, conn):
         if visa is None:
             raise ImportError("PyVISA required for accessing VISA instruments.")
@@ -139,6 +148,60 @@ class VisaWrapper(io.IOBase, WrapperABC):
             
         return msg
         
+    def readinto(self, buf):
+        '''
+        Fills ``buf`` with data from the VISA connection, starting with any
+        bytes left over from previous reads. Each chunk returned by VISA is
+        copied straight into ``buf``, and only the remainder of the last
+        chunk is kept for later reads.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        view = byte_view(buf)
+        size = len(view)
+        n_read = min(size, len(self._buf))
+        view[:n_read] = bytes(self._buf[:n_read])
+        del self._buf[:n_read]
+        while n_read < size:
+            chunk = self._conn.read()
+            n_chunk = min(size - n_read, len(chunk))
+            view[n_read:n_read + n_chunk] = chunk[:n_chunk]
+            self._buf += chunk[n_chunk:]
+            n_read += n_chunk
+        return n_read
+        
+    def read_raw(self, size):
+        '''
+        Reads up to ``size`` bytes from the VISA connection, starting with
+        any bytes left over from previous reads. Bytes are read straight
+        from the instrument, without waiting for a terminator or END.
+        
+        As VISA discards the bytes received by a read that times out, the
+        timeout should allow for ``size`` bytes to arrive.
+        
+        :param int size: Maximum number of bytes to read.
+        :rtype: `str`
+        '''
+        if self._buf:
+            msg = bytes(self._buf[:size])
+            del self._buf[:size]
+            return msg
+        if vpp43 is None:
+            raise NotImplementedError("Raw reads require the VPP-4.3 "
+                                      "interface of PyVISA.")
+        try:
+            msg = vpp43.read(self._conn.vi, size)
+        except visa.VisaIOError as e:
+            raise IOError(str(e))
+            
+        if self._debug:
+            print " -> {} ".format(repr(msg))
+            
+        return msg
+        
     def write(self, msg):
         if self._debug:
             print " <- {} ".format(repr(msg))
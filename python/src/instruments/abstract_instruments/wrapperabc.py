@@ -30,10 +30,51 @@ from __future__ import division
 ## IMPORTS #####################################################################
 
 import abc
+import contextlib
+
+import numpy as np
+
+## FUNCTIONS ###################################################################
+
+def byte_view(buf):
+    '''
+    Returns a writable, one-dimensional `memoryview` of the bytes making up
+    ``buf``, without copying them.
+    
+    :param buf: Buffer to be viewed.
+    :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+    :rtype: `memoryview`
+    '''
+    if isinstance(buf, np.ndarray):
+        if not buf.flags.c_contiguous:
+            raise ValueError("Buffers must be contiguous to be read into.")
+        buf = buf.reshape(-1).view(np.uint8)
+    view = memoryview(buf)
+    if view.readonly:
+        raise TypeError("Buffers must be writable to be read into.")
+    if view.itemsize != 1 or view.ndim != 1:
+        raise TypeError("Buffer must be a one-dimensional array of bytes.")
+    return view
+
+## CLASSES #####################################################################
 
 class WrapperABC(object):
     __metaclass__ = abc.ABCMeta
     
+    #: Whether several queries can be written back-to-back before their
+    #: responses are read. Wrappers whose reads must be prompted, depending
+    #: on the query that was sent, should set this to `False`.
+    supports_pipelining = True
+    
+    #: Whether reads of size -1 return the terminator at the end of the data,
+    #: rather than discarding it.
+    keeps_terminator = False
+    
+    #: Whether `read_raw` can read data that the instrument sends unprompted
+    #: and without terminators, such as the samples of a continuous data
+    #: transfer.
+    supports_raw_reads = False
+    
     ## PROPERTIES ##
     
     def getaddress(self):
@@ -100,6 +141,55 @@ class WrapperABC(object):
         '''
         raise NotImplementedError
         
+    def readinto(self, buf):
+        '''
+        Reads from the wrapped connection directly into ``buf``, until either
+        it has been filled or the connection times out.
+        
+        Wrappers should override this method to avoid intermediate copies of
+        the data. This default implementation reads a `str` and copies it
+        into ``buf``.
+        
+        :param buf: Buffer to be filled.
+        :type buf: `bytearray`, `memoryview` or contiguous `numpy.ndarray`
+        :return: Number of bytes read into ``buf``.
+        :rtype: `int`
+        '''
+        view = byte_view(buf)
+        data = self.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+        
+    def read_raw(self, size):
+        '''
+        Reads up to ``size`` bytes that the instrument sends unprompted,
+        without waiting for a terminator. Fewer bytes may be returned, such
+        as when the instrument ends its message, but an empty string is
+        only returned once no more data can arrive.
+        
+        This is only supported by wrappers whose `supports_raw_reads` is
+        `True`.
+        
+        :param int size: Maximum number of bytes to read.
+        :rtype: `str`
+        '''
+        raise NotImplementedError
+        
+    @contextlib.contextmanager
+    def exclusive(self):
+        '''
+        Context manager that keeps other threads from using the underlying
+        connection within its block, such that an exchange made of several
+        reads and writes is not interleaved with those of other instruments
+        sharing that connection. Nested blocks are allowed within a single
+        thread.
+        
+        This default implementation does nothing, as the connection belongs
+        to a single instrument. Wrappers for shared connections should
+        override it.
+        '''
+        yield
+        
     @abc.abstractmethod
     def flush_input(self):
         '''
@@ -90,8 +90,9 @@ class Agilent34410a(SCPIMultimeter):
             msg = 'R? ' + str(count)
         
         self.sendcmd('FORM:DATA REAL,32')
-        self.sendcmd(msg)
-        return self.binblockread(4)
+        with self.exclusive():
+            self.sendcmd(msg)
+            return self.binblockread(4)
      
     def configure(self, mode=None, device_range=None, resolution=None):
         '''
@@ -29,6 +29,7 @@ from __future__ import division
 ## IMPORTS #####################################################################
 
 from instruments.abstract_instruments import Instrument
+from instruments.abstract_instruments.batch import QueryBatch
 from instruments.util_fns import assume_units
 
 from flufl.enum import IntEnum
@@ -55,6 +56,20 @@ class SCPIInstrument(Instrument):
     def __init__(self, filelike):
         super(SCPIInstrument, self).__init__(filelike)
     
+    ## COMMAND-HANDLING METHODS ##
+    
+    def batch(self):
+        """
+        Returns a batch that collects queries to this instrument, and sends
+        them as a single ``;``-joined SCPI message when executed. Each header
+        after the first is made absolute with a leading ``:``, so that it is
+        not resolved relative to the previous one. The single response is
+        then split back into the results of the individual queries.
+        
+        :rtype: `~instruments.abstract_instruments.batch.QueryBatch`
+        """
+        return QueryBatch(self, separator=';', header_prefix=':')
+    
     ## PROPERTIES ##
     
     @property
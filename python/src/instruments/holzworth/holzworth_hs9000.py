@@ -41,6 +41,7 @@ from instruments.units import dBm
 
 import quantities as pq
 import re
+from time import sleep
 
 ## FUNCTIONS ###################################################################
 
@@ -71,22 +72,38 @@ def _bounded_property(base_name, allowed_units, default_units, doc=""):
             default_units
         ))
     
+    def bounds(self):
+        # The bounds are kept by the synthesizer, as channel objects are
+        # created anew on each access.
+        key = (self._ch_name, base_name)
+        if key not in self._hs._bounds_cache:
+            self._hs._bounds_cache[key] = (
+                pq.Quantity(*split_unit_str(self._query("{}:MIN?".format(base_name)))),
+                pq.Quantity(*split_unit_str(self._query("{}:MAX?".format(base_name))))
+            )
+        return self._hs._bounds_cache[key]
+    
     def min_getter(self):
-        return pq.Quantity(*split_unit_str(self._query("{}:MIN?".format(base_name))))
+        return bounds(self)[0]
     
     def max_getter(self):
-        return pq.Quantity(*split_unit_str(self._query("{}:MAX?".format(base_name))))
+        return bounds(self)[1]
     
     def setter(self, newval):
         newval = assume_units(newval, default_units)
         
-        if newval > max_getter(self) or newval < min_getter(self):
+        min_val, max_val = bounds(self)
+        if newval > max_val or newval < min_val:
             raise ValueError("Value outside allowed bounds for this channel.")
         
         if newval.units not in allowed_units:
             newval = newval.rescale(default_units)
             
-        self._sendcmd("{}:{}".format(base_name, newval))
+        # Send the units explicitly, as formatting a Quantity gives only its
+        # magnitude in some versions of quantities.
+        self._sendcmd("{}:{} {}".format(
+            base_name, float(newval.magnitude), newval.dimensionality.string
+        ))
         
     return property(getter, setter, doc=doc), property(min_getter), property(max_getter)
     
@@ -101,6 +118,16 @@ class HolzworthHS9000(SignalGenerator):
     .. _Holzworth HS-9000 series: http://www.holzworth.com/synthesizers-multi.htm
     """
     
+    def __init__(self, filelike):
+        super(HolzworthHS9000, self).__init__(filelike)
+        # Indices of the attached channels, queried as needed and then kept
+        # until invalidated by refresh_channels().
+        self._channel_idxs_cache = None
+        # Bounds of the frequency, power and phase of each channel, keyed by
+        # channel name and command, kept until the channel is reset or its
+        # state is recalled.
+        self._bounds_cache = {}
+    
     ## INNER CLASSES ##
     
     class Channel(SGChannel):
@@ -133,9 +160,11 @@ class HolzworthHS9000(SignalGenerator):
             
         def reset(self):
             self._sendcmd("*RST")
+            self.refresh_bounds()
             
         def recall_state(self):
             self._sendcmd("*RCL")
+            self.refresh_bounds()
             
         def save_state(self):
             self._sendcmd("*SAV")
@@ -164,6 +193,53 @@ class HolzworthHS9000(SignalGenerator):
         @output.setter
         def output(self, newval):
             self._sendcmd("PWR:RF:{}".format("ON" if newval else "OFF"))
+            
+        ## METHODS ##
+        
+        def refresh_bounds(self):
+            """
+            Discards the cached bounds of the frequency, power and phase of
+            this channel, so that they are queried again when next needed.
+            This is done automatically by `reset` and `recall_state`.
+            """
+            for key in list(self._hs._bounds_cache):
+                if key[0] == self._ch_name:
+                    del self._hs._bounds_cache[key]
+                    
+        def sweep(self, freq=None, power=None, dwell=None):
+            """
+            Steps this channel through a list of frequencies and/or powers,
+            writing each point as soon as the previous one has been sent.
+            Points are checked against the cached bounds of the channel
+            before being written, so that no queries are made during the
+            sweep.
+            
+            :param freq: Frequencies to step through.
+            :type freq: `list` of `~quantities.Quantity` or `float` (GHz)
+            :param power: Powers to step through, at the same points as
+                ``freq`` if both are given.
+            :type power: `list` of `~quantities.Quantity` or `float` (dBm)
+            :param dwell: Time to wait at each point, or `None` to write
+                points back-to-back.
+            :type dwell: `~quantities.Quantity` or `float` (seconds)
+            """
+            if freq is None and power is None:
+                raise ValueError("Either frequencies or powers must be given.")
+            if freq is not None and power is not None and \
+                    len(freq) != len(power):
+                raise ValueError("Frequencies and powers must be given for "
+                                 "the same number of points.")
+            if dwell is not None:
+                dwell = float(assume_units(dwell, pq.s).rescale(pq.s).magnitude)
+                
+            n_points = len(freq) if freq is not None else len(power)
+            for idx in xrange(n_points):
+                if freq is not None:
+                    self.freq = freq[idx]
+                if power is not None:
+                    self.power = power[idx]
+                if dwell:
+                    sleep(dwell)
                 
     ## PROXY LIST ##
     
@@ -172,15 +248,26 @@ class HolzworthHS9000(SignalGenerator):
         # indicate what channels are attached to the internal USB bus.
         # We convert what channel names we can to integers, and leave the
         # rest as strings.
-        return [
-            (
-                int(ch_name.replace("CH", "")) - 1
-                if ch_name.startswith('CH') else
-                ch_name.strip()
-            )
-            for ch_name in self.query(":ATTACH?").split(":")
-            if ch_name
-        ]
+        if self._channel_idxs_cache is None:
+            self._channel_idxs_cache = [
+                (
+                    int(ch_name.replace("CH", "")) - 1
+                    if ch_name.startswith('CH') else
+                    ch_name.strip()
+                )
+                for ch_name in self.query(":ATTACH?").split(":")
+                if ch_name
+            ]
+        return self._channel_idxs_cache
+        
+    def refresh_channels(self):
+        """
+        Discards the cached list of attached channels and their bounds, so
+        that they are queried again when next needed. Call this after
+        attaching or detaching channels.
+        """
+        self._channel_idxs_cache = None
+        self._bounds_cache = {}
         
     @property
     def channel(self):
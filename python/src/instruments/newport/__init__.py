@@ -1,4 +1,5 @@
 from instruments.newport.errors import NewportError
 from instruments.newport.newportesp301 import (
-    NewportESP301, NewportESP301Axis, NewportESP301HomeSearchMode
+    NewportESP301, NewportESP301Axis, NewportESP301HomeSearchMode,
+    NewportESP301ErrorCheck, NewportESP301WaitMode, NewportESP301Scan
 )
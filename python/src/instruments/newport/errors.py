@@ -120,7 +120,8 @@ class NewportError(IOError):
         'x32' : "INVALID TRAJECTORY MODE FOR MOVING"
     }
     
-    def __init__(self, errcode=None,timestamp=None):
+    def __init__(self, errcode=None,timestamp=None,command=None):
+        self._command = command
 
         if timestamp is None:
             self._timestamp = datetime.datetime.now() - NewportError.start_time
@@ -134,12 +135,16 @@ class NewportError(IOError):
             self._axis = errcode // 100 
             if self._axis == 0: 
                 self._axis = None
-                error_message = self.getMessage(str(errcode))
+                error_message = self.__getMessage(str(errcode))
                 error = "Newport Error: {0}. Error Message: {1}. At time : {2}".format(str(errcode),error_message,self._timestamp)
+                if command is not None:
+                    error += ". Command: {0}".format(command)
                 super(NewportError, self).__init__(error)
             else:                
-                error_message = self.getMessage('x{0}'.format(self._errcode))
+                error_message = self.__getMessage('x{0}'.format(self._errcode))
                 error = "Newport Error: {0}. Axis: {1}. Error Message: {2}. At time : {3}".format(str(self._errcode),self._axis,error_message,self._timestamp)
+                if command is not None:
+                    error += ". Command: {0}".format(command)
                 super(NewportError, self).__init__(error)
 
         else:
@@ -174,6 +179,16 @@ class NewportError(IOError):
         """
         return self._errcode
 
+    @property
+    def command(self):
+        """
+        Gets the command which caused this error, or `None` if it is not
+        known.
+
+        :type: `str`
+        """
+        return self._command
+
     @property
     def axis(self):
         """
@@ -40,7 +40,7 @@ import quantities as pq
 
 from instruments.abstract_instruments import Instrument
 from instruments.newport.errors import NewportError
-from instruments.util_fns import assume_units
+from instruments.util_fns import assume_units, convert_magnitude
 
 ## ENUMS #######################################################################
 
@@ -81,6 +81,33 @@ class NewportESP301Units(IntEnum):
     milliradian = 10
     microradian = 11
 
+class NewportESP301ErrorCheck(IntEnum):
+    """
+    Enum for the policies by which commands are checked for errors.
+    """
+    #: Query the error buffer after every command.
+    immediate = 0
+    #: Query the error buffer only when `NewportESP301.check_errors` is
+    #: called, such as at the end of a
+    #: `NewportESP301.deferred_error_check` block.
+    deferred = 1
+    #: Query the error buffer with the first command sent after each
+    #: `NewportESP301.error_check_interval` has elapsed.
+    periodic = 2
+
+class NewportESP301WaitMode(IntEnum):
+    """
+    Enum for the ways in which `NewportESP301.move_axes` waits for motion
+    to finish.
+    """
+    #: Poll the controller for the completion of motion.
+    poll = 0
+    #: Have the controller wait for motion to stop ("WS") before replying.
+    stop = 1
+    #: Have the controller wait for each axis to reach its target position
+    #: ("WP") before replying. Only supported for absolute moves.
+    position = 2
+
 class NewportESP301MotorType(IntEnum):
     """
     Enum for different motor types. 
@@ -91,6 +118,65 @@ class NewportESP301MotorType(IntEnum):
     commutated_stepper_motor = 3 
     commutated_brushless_servo = 4 
 
+## CONSTANTS #################################################################
+
+# Bounds on the interval between polls of the controller while waiting for
+# motion to finish, in seconds, when adapted to the remaining motion.
+_MIN_POLL_INTERVAL = 0.01
+_MAX_POLL_INTERVAL = 0.5
+
+# Longest command line accepted by the controller, in characters.
+_MAX_LINE_LENGTH = 80
+
+# Default maximum number of commands stored in each program of a scan.
+_MAX_PROGRAM_COMMANDS = 100
+
+## FUNCTIONS ###################################################################
+
+def _command_target(raw_cmd):
+    """
+    Returns the axis or other target of a raw command, given by its leading
+    digits, or `None` if it has no target.
+    """
+    digits = len(raw_cmd) - len(raw_cmd.lstrip("0123456789"))
+    return int(raw_cmd[:digits]) if digits else None
+
+def _format_cmd(cmd, params=[], target=None):
+    """
+    Formats a raw command for a given target, such as an axis or program ID.
+    """
+    if isinstance(target, NewportESP301Axis):
+        target = target._axis_id
+    return "{target}{cmd}{params}".format(
+        target=target if target is not None else "",
+        cmd=cmd.upper(),
+        params=",".join(map(str, params))
+    )
+
+def _join_lines(cmds):
+    """
+    Joins raw commands into as few command lines as allowed by the
+    controller.
+    """
+    lines = []
+    for cmd in cmds:
+        if lines and len(lines[-1]) + len(cmd) + 3 <= _MAX_LINE_LENGTH:
+            lines[-1] += " ; " + cmd
+        else:
+            lines.append(cmd)
+    return lines
+
+def _quantity_parser(time_power=0):
+    """
+    Returns a function parsing a query response into a quantity in the units
+    of an axis, divided by seconds to the given power.
+    """
+    def parse(resp, units):
+        if time_power:
+            units = units / (pq.s ** time_power)
+        return assume_units(float(resp), units)
+    return parse
+
 ## CLASSES #####################################################################
 
 class _AxisList(object):
@@ -109,9 +195,9 @@ class _AxisList(object):
             raise IndexError("Negative axis indices are not allowed.")
         # Change one-based indices to zero-based for easier
         # Python programming.
-        axis = self._axisDict.get(idx+1,NewportESP301Axis(self._controller, idx + 1))
-        self._axisDict[idx+1] = axis
-        return axis
+        if idx + 1 not in self._axisDict:
+            self._axisDict[idx+1] = NewportESP301Axis(self._controller, idx + 1)
+        return self._axisDict[idx+1]
 
 
 class NewportESP301(Instrument):
@@ -127,7 +213,15 @@ class NewportESP301(Instrument):
         super(NewportESP301, self).__init__(filelike)
         self._execute_immediately = True
         self._command_list = []
+        self._error_check = NewportESP301ErrorCheck.immediate
+        self._unchecked_cmds = []
+        self._last_error_check = time()
         self.terminator = "\r"
+        self._axis_list = _AxisList(self)
+        
+        #: Time between error checks under the ``periodic`` error check
+        #: policy, in seconds.
+        self.error_check_interval = 1.0
 
     ## PROPERTIES ##
 
@@ -148,7 +242,32 @@ class NewportESP301(Instrument):
         :type: :class:`NewportESP301Axis`
         """
         
-        return _AxisList(self)
+        return self._axis_list
+
+    @property
+    def error_check(self):
+        """
+        Gets/sets the policy by which commands are checked for errors.
+        
+        By default, each command is followed by a query of the error buffer,
+        doubling the number of round trips to the controller. Under the
+        ``deferred`` and ``periodic`` policies, the error buffer is instead
+        read for many commands at once by `~NewportESP301.check_errors`.
+        Errors found this way are attributed to the earliest unchecked
+        command consistent with them, that is, the first targeting the
+        axis reported by the error, if any, and not preceding the command
+        blamed for the previous error.
+        
+        :type: `NewportESP301ErrorCheck`
+        """
+        return self._error_check
+    @error_check.setter
+    def error_check(self, newval):
+        newval = NewportESP301ErrorCheck[newval]
+        if newval == NewportESP301ErrorCheck.immediate:
+            # Don't let unchecked commands pass unnoticed.
+            self.check_errors()
+        self._error_check = newval
 
     ## LOW-LEVEL COMMAND METHODS ##
 
@@ -169,14 +288,7 @@ class NewportESP301(Instrument):
             during ``PGM`` mode.
         """
         query_resp = None
-        if isinstance(target, NewportESP301Axis):
-            target = axis._axis_id
-            
-        raw_cmd = "{target}{cmd}{params}".format(
-            target=target if target is not None else "",
-            cmd=cmd.upper(),
-            params=",".join(map(str, params))
-        )
+        raw_cmd = _format_cmd(cmd, params, target)
         
         if self._execute_immediately: 
             query_resp = self._execute_cmd(raw_cmd,errcheck)
@@ -207,14 +319,94 @@ class NewportESP301(Instrument):
             self.sendcmd(raw_cmd)
             
         if errcheck:
-            err_resp = self.query('TB?')
-            
-            code, timestamp, msg = err_resp.split(",")
-            code = int(code)
-            if code != 0:
-                raise NewportError(code)
+            if self._error_check == NewportESP301ErrorCheck.immediate:
+                error = self._read_error()
+                if error is not None:
+                    raise NewportError(error[0], error[1], raw_cmd)
+            else:
+                self._unchecked_cmds.append(raw_cmd)
+                if self._error_check == NewportESP301ErrorCheck.periodic and \
+                        time() - self._last_error_check >= \
+                        self.error_check_interval:
+                    self.check_errors()
 
         return query_resp
+        
+    def _read_error(self):
+        """
+        Reads the oldest error from the error buffer of the controller.
+        
+        :return: The error code and timestamp, or `None` if the buffer is
+            empty.
+        :rtype: `tuple` of two `int`
+        """
+        code, timestamp, msg = self.query('TB?').split(",", 2)
+        code = int(code)
+        if code == 0:
+            return None
+        return code, int(timestamp)
+        
+    def check_errors(self):
+        """
+        Reads all errors from the error buffer of the controller, and raises
+        the first as an exception, attributed to the command that caused
+        it. See `~NewportESP301.error_check` for how commands are matched
+        to errors. Any further errors are given by the ``other_errors``
+        attribute of the exception.
+        
+        Does nothing if no command has been sent since the last check.
+        """
+        if not self._unchecked_cmds:
+            return
+        commands, self._unchecked_cmds = self._unchecked_cmds, []
+        self._last_error_check = time()
+        
+        errors = []
+        # The error buffer holds at most 10 errors.
+        for _ in xrange(10):
+            error = self._read_error()
+            if error is None:
+                break
+            errors.append(error)
+        if not errors:
+            return
+        
+        # Errors are buffered in the order in which they occured, so match
+        # each to a command after that blamed for the previous error.
+        idx_cmd = 0
+        for idx_err, (code, timestamp) in enumerate(errors):
+            axis = code // 100
+            for idx in xrange(idx_cmd, len(commands)):
+                if not axis or _command_target(commands[idx]) == axis:
+                    break
+            else:
+                idx = idx_cmd
+            command = commands[idx] if idx < len(commands) else None
+            errors[idx_err] = NewportError(code, timestamp, command)
+            idx_cmd = idx + 1
+        errors[0].other_errors = errors[1:]
+        raise errors[0]
+        
+    @contextmanager
+    def deferred_error_check(self):
+        """
+        Context manager that defers error checking for the commands sent
+        within its ``with`` block to a single query of the error buffer at
+        the end of the block.
+        
+        Example::
+        
+            with controller.deferred_error_check():
+                controller.axis[0].velocity = 2
+                controller.axis[0].acceleration = 10
+        """
+        old_policy = self._error_check
+        self._error_check = NewportESP301ErrorCheck.deferred
+        try:
+            yield
+        finally:
+            self._error_check = old_policy
+        self.check_errors()
 
     ## SPECIFIC COMMANDS ##
 
@@ -280,17 +472,278 @@ class NewportESP301(Instrument):
         """
         Context manager do execute multiple of commands in a single communication with device
 
+        Commands too long for a single line are split over as few lines as
+        the controller allows, and the responses to their queries are joined
+        as if they had been returned on a single line.
+
         Example::
 
             with self.execute_bulk_command():
                 execute commands as normal...
         """
         self._execute_immediately = False
-        yield
-        command_string = reduce(lambda x ,y : x + ' ; '+ y +' ; ',self._command_list)        
-        self._bulk_query_resp = self._execute_cmd(command_string,errcheck)
-        self._command_list = []
-        self._execute_immediately = True
+        try:
+            yield
+            lines = _join_lines(self._command_list)
+        finally:
+            self._command_list = []
+            self._execute_immediately = True
+        # Each line that includes queries is answered by a line of its own.
+        resps = [self._execute_cmd(line, errcheck) for line in lines]
+        resps = [resp for resp in resps if resp is not None]
+        self._bulk_query_resp = ",".join(resps) if resps else None
+
+    def _query_axes(self, axes, queries):
+        """
+        Queries the units and each of a sequence of values for every axis
+        given, in as few compound commands as the controller allows.
+
+        :param axes: Axes to query.
+        :type axes: `list` of `NewportESP301Axis`
+        :param queries: Key, query command and parser of each value, where
+            the parser is called with the response and the units of the axis.
+        :type queries: `tuple` of `tuple`
+
+        :return: Dictionary of the values for each axis, including its
+            ``'units'``.
+        :rtype: `list` of `dict`
+        """
+        with self.execute_bulk_command():
+            for axis in axes:
+                self._newport_cmd("SN?", target=axis)
+                for _, cmd, _ in queries:
+                    self._newport_cmd(cmd, target=axis)
+
+        # The responses to a compound query are returned separated by commas.
+        resp = [value.strip() for value in self._bulk_query_resp.split(",")]
+        if len(resp) != len(axes) * (len(queries) + 1):
+            raise IOError("Expected {} values from the controller, got "
+                "{}.".format(len(axes) * (len(queries) + 1), len(resp)))
+
+        results = []
+        for axis in axes:
+            axis._units = axis.get_pq_unit(int(resp.pop(0)))
+            result = {'units': axis._units}
+            for key, _, parse in queries:
+                result[key] = parse(resp.pop(0), axis._units)
+            results.append(result)
+        return results
+
+    def read_setup(self, axes):
+        """
+        Reads the setup of several axes with as few compound queries as the
+        controller allows.
+
+        :param axes: Axes to read the setup of.
+        :type axes: `list` of `NewportESP301Axis`
+
+        :return: Setup of each axis, as returned by
+            `NewportESP301Axis.read_setup`.
+        :rtype: `list` of `dict`
+        """
+        return self._query_axes(axes, NewportESP301Axis._setup_queries)
+
+    def get_status(self, axes):
+        """
+        Reads the status of several axes with as few compound queries as the
+        controller allows.
+
+        :param axes: Axes to read the status of.
+        :type axes: `list` of `NewportESP301Axis`
+
+        :return: Status of each axis, as returned by
+            `NewportESP301Axis.get_status`.
+        :rtype: `list` of `dict`
+        """
+        return self._query_axes(axes, NewportESP301Axis._status_queries)
+
+    ## MOTION ##
+
+    @contextmanager
+    def _reply_timeout(self, max_wait):
+        """
+        Context manager that sets the communication timeout to ``max_wait``
+        within its block, for commands to which the controller withholds its
+        reply until motion is finished. If ``max_wait`` is `None`, the
+        timeout is removed, so that the reply is waited for without limit. If
+        ``max_wait`` is `False`, the timeout is left alone.
+        """
+        if max_wait is False:
+            yield
+            return
+        old_timeout = self.timeout
+        self.timeout = max_wait
+        try:
+            yield
+        finally:
+            self.timeout = old_timeout
+
+    def _poll_motion(self, axes, positions=False):
+        """
+        Queries whether motion is done along each axis given, and optionally
+        its position, in as few compound commands as the controller allows.
+        The error buffer is not checked, so as not to double the number of
+        round trips per poll.
+
+        :rtype: `list` of `bool`, or of `tuple` of `bool` and `float` if
+            ``positions`` is `True`.
+        """
+        with self.execute_bulk_command(errcheck=False):
+            for axis in axes:
+                self._newport_cmd("MD?", target=axis)
+                if positions:
+                    self._newport_cmd("TP?", target=axis)
+        resp = self._bulk_query_resp.split(",")
+        if not positions:
+            return [bool(int(done)) for done in resp]
+        return [
+            (bool(int(resp[2 * idx])), float(resp[2 * idx + 1]))
+            for idx in xrange(len(axes))
+        ]
+
+    def _wait_for_motion(self, axes, targets=None, velocities=None,
+            poll_interval=None, max_wait=None):
+        """
+        Blocks until all movement along the given axes is complete, polling
+        those still moving at once.
+
+        :param targets: Target position of each axis, in its current units.
+            If given along with ``velocities``, and ``poll_interval`` is
+            `None`, the interval between polls is adapted to the time
+            remaining until the slowest axis reaches its target.
+        :type targets: `dict` of `float`
+        :param velocities: Velocity of each axis, in its current units per
+            second.
+        :type velocities: `dict` of `float`
+        :param float poll_interval: Fixed time to sleep between polls, in
+            seconds.
+        :param float max_wait: Maximum amount of time to wait before
+            raising a `IOError`. If `None`, waits indefinitely.
+        """
+        adaptive = poll_interval is None and targets is not None and \
+            velocities is not None
+        tic = time()
+        pending = list(axes)
+        while True:
+            status = self._poll_motion(pending, positions=adaptive)
+            if not adaptive:
+                status = [(done, None) for done in status]
+
+            remaining = 0
+            moving = []
+            for axis, (done, position) in zip(pending, status):
+                if done:
+                    continue
+                moving.append(axis)
+                if adaptive and velocities[axis] > 0:
+                    remaining = max(remaining,
+                        abs(targets[axis] - position) / velocities[axis])
+            if not moving:
+                return
+            pending = moving
+
+            elapsed = time() - tic
+            if max_wait is not None and elapsed >= max_wait:
+                raise IOError("Timed out waiting for motion to finish.")
+            if adaptive:
+                # Poll more often as the axes approach their targets.
+                interval = min(max(remaining / 2, _MIN_POLL_INTERVAL),
+                    _MAX_POLL_INTERVAL)
+            else:
+                interval = poll_interval
+            if max_wait is not None:
+                interval = min(interval, max_wait - elapsed)
+            sleep(interval)
+
+    def move_axes(self, positions, absolute=True, block=True,
+            wait_mode=NewportESP301WaitMode.poll, poll_interval=None,
+            max_wait=None):
+        """
+        Moves several axes at once, sending all moves in as few compound
+        commands as the controller allows.
+
+        For instance:
+
+        >>> controller = NewportESP301.open_serial("COM3")
+        >>> controller.move_axes({
+        ...     controller.axis[0]: 1 * pq.mm,
+        ...     controller.axis[1]: 2 * pq.mm
+        ... })
+
+        :param positions: Position to move each axis to, or by if
+            ``absolute`` is `False`. Axes may also be given by their
+            zero-based indices, as for `~NewportESP301.axis`.
+        :type positions: `dict` of `float` or :class:`~quantities.Quantity`
+        :param bool absolute: If `True`, positions are relative to the
+            zero-point of the encoder of each axis; otherwise to its
+            current position.
+        :param bool block: If `True`, blocks until all motion is finished.
+        :param NewportESP301WaitMode wait_mode: How to wait for motion to
+            finish if ``block`` is `True`. Under ``poll``, all moving axes
+            are polled with a single query per cycle. The ``stop`` and
+            ``position`` modes instead have the controller hold its reply
+            until motion is finished, avoiding polling altogether.
+        :param float poll_interval: Fixed time to sleep between polls, in
+            seconds. If `None`, the interval adapts to the distance left
+            to travel and the velocity of each axis.
+        :param float max_wait: Maximum amount of time to wait before
+            raising a `IOError`. If `None`, waits indefinitely.
+        """
+        wait_mode = NewportESP301WaitMode[wait_mode]
+        if wait_mode == NewportESP301WaitMode.position and not absolute:
+            raise ValueError("Waiting for position is only supported for "
+                "absolute moves.")
+        if poll_interval is not None:
+            poll_interval = float(convert_magnitude(poll_interval, pq.s))
+        if max_wait is not None:
+            max_wait = float(convert_magnitude(max_wait, pq.s))
+
+        moves = []
+        for axis, position in positions.iteritems():
+            if not isinstance(axis, NewportESP301Axis):
+                axis = self.axis[axis]
+            position = float(convert_magnitude(position, axis._units))
+            moves.append((axis, position))
+        moves.sort(key=lambda move: move[0].axis_id)
+
+        adaptive = block and wait_mode == NewportESP301WaitMode.poll and \
+            poll_interval is None
+        on_controller = block and wait_mode != NewportESP301WaitMode.poll
+
+        with self._reply_timeout(max_wait if on_controller else False), \
+                self.execute_bulk_command():
+            for axis, position in moves:
+                if adaptive:
+                    self._newport_cmd("TP?", target=axis)
+                    self._newport_cmd("VA?", target=axis)
+                self._newport_cmd("PA" if absolute else "PR",
+                    target=axis, params=[position])
+            if on_controller:
+                for axis, position in moves:
+                    if wait_mode == NewportESP301WaitMode.stop:
+                        self._newport_cmd("WS", target=axis)
+                    else:
+                        self._newport_cmd("WP", target=axis,
+                            params=[position])
+                # Commands are executed in order, so this query is only
+                # answered once all of the above waits are over.
+                self._newport_cmd("MD?", target=moves[-1][0])
+
+        if on_controller:
+            if not self._bulk_query_resp:
+                raise IOError("Timed out waiting for motion to finish.")
+        elif adaptive:
+            resp = map(float, self._bulk_query_resp.split(","))
+            targets, velocities = {}, {}
+            for idx, (axis, position) in enumerate(moves):
+                targets[axis] = position if absolute else \
+                    resp[2 * idx] + position
+                velocities[axis] = resp[2 * idx + 1]
+            self._wait_for_motion([axis for axis, _ in moves],
+                targets, velocities, max_wait=max_wait)
+        elif block:
+            self._wait_for_motion([axis for axis, _ in moves],
+                poll_interval=poll_interval, max_wait=max_wait)
 
     def run_program(self, program_id):
         """
@@ -299,6 +752,33 @@ class NewportESP301(Instrument):
         if program_id not in xrange(1, 101):
             raise ValueError("Invalid program ID. Must be an integer from 1 to 100 (inclusive).")
         self._newport_cmd("EX", target=program_id)
+
+    def define_scan(self, axes, positions, **kwargs):
+        """
+        Compiles a scan over a sequence of positions into user programs,
+        and uploads them to the controller.
+
+        For instance, to raster two axes over a grid, triggering at each
+        point:
+
+        >>> controller = NewportESP301.open_serial("COM3")
+        >>> axes = [controller.axis[0], controller.axis[1]]
+        >>> scan = controller.define_scan(axes,
+        ...     NewportESP301Scan.grid([0, 1, 2], [0, 0.5]),
+        ...     dwell=10 * pq.ms, trigger=0x01)
+        >>> status = scan.run()
+
+        :param axes: Axes to scan.
+        :param positions: Sequence of points to visit, each giving the
+            absolute position of every axis.
+
+        Any other keyword arguments are passed to `NewportESP301Scan`.
+
+        :rtype: `NewportESP301Scan`
+        """
+        scan = NewportESP301Scan(self, axes, positions, **kwargs)
+        scan.upload()
+        return scan
     
         
 class NewportESP301Axis(object):
@@ -331,6 +811,48 @@ class NewportESP301Axis(object):
                 11   :  pq.urad,
                 } 
 
+    # Key, query command and parser of each value read by read_setup and
+    # get_status, following the corresponding properties.
+    _setup_queries = (
+        ('motor_type', "QM?",
+            lambda resp, units: NewportESP301MotorType(int(resp))),
+        ('feedback_configuration', "ZB?",
+            lambda resp, units: int(resp[:-2], 16)),
+        ('full_step_resolution', "FR?", _quantity_parser()),
+        ('position_display_resolution', "FP?",
+            lambda resp, units: int(resp)),
+        ('current', "QI?", lambda resp, units: assume_units(float(resp), pq.A)),
+        ('max_velocity', "VU?", _quantity_parser(1)),
+        ('encoder_resolution', "SU?", _quantity_parser()),
+        ('acceleration', "AC?", _quantity_parser(2)),
+        ('deceleration', "AG?", _quantity_parser(2)),
+        ('velocity', "VA?", _quantity_parser(1)),
+        ('max_acceleration', "AU?", _quantity_parser(2)),
+        ('homing_velocity', "OH?", _quantity_parser(1)),
+        ('jog_high_velocity', "JH?", _quantity_parser(1)),
+        ('jog_low_velocity', "JW?", _quantity_parser(1)),
+        ('estop_deceleration', "AE?", _quantity_parser(2)),
+        ('jerk', "JK?", _quantity_parser(3)),
+        ('proportional_gain', "KP?", lambda resp, units: float(resp[:-1])),
+        ('derivative_gain', "KD?", lambda resp, units: float(resp)),
+        ('integral_gain', "KI?", lambda resp, units: float(resp)),
+        ('integral_saturation_gain', "KS?",
+            lambda resp, units: float(resp)),
+        ('home', "DH?", _quantity_parser()),
+        ('microstep_factor', "QS?", lambda resp, units: int(resp)),
+        ('acceleration_feed_forward', "AF?",
+            lambda resp, units: float(resp)),
+        ('trajectory', "TJ?", lambda resp, units: int(resp)),
+        ('hardware_limit_configuration', "ZH?",
+            lambda resp, units: int(resp[:-2])),
+    )
+    _status_queries = (
+        ('position', "TP?", _quantity_parser()),
+        ('desired_position', "DP?", _quantity_parser()),
+        ('desired_velocity', "DV?", _quantity_parser(1)),
+        ('is_motion_done', "MD?", lambda resp, units: bool(int(resp))),
+    )
+
 
     def __init__(self, controller, axis_id):
         if not isinstance(controller, NewportESP301):
@@ -367,7 +889,7 @@ class NewportESP301Axis(object):
             NewportESP301Units
         """
         return NewportESP301Units(
-            self._controller._newport_cmd("SN?", target=self.axis_id)
+            int(self._controller._newport_cmd("SN?", target=self.axis_id))
         )
         
     def _set_units(self, new_units):
@@ -415,8 +937,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s**2))    
     @acceleration.setter
     def acceleration(self,accel):
-        accel = float(assume_units(accel,self._units/(pq.s**2)).rescale(
-                self._units/(pq.s**2)).magnitude)
+        accel = float(convert_magnitude(accel, self._units/(pq.s**2)))
         return self._controller._newport_cmd("AC",target=self.axis_id,params=[accel])
    
     @property
@@ -433,8 +954,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s**2))
     @deceleration.setter
     def deceleration(self,decel):
-        decel = float(assume_units(decel,self._units/(pq.s**2)).rescale(
-                self._units/(pq.s**2)).magnitude)
+        decel = float(convert_magnitude(decel, self._units/(pq.s**2)))
         return self._controller._newport_cmd("AG",target=self.axis_id,params=[decel])
     
     @property
@@ -451,8 +971,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s**2))
     @estop_deceleration.setter
     def estop_deceleration(self,decel):
-        decel = float(assume_units(decel,self._units/(pq.s**2)).rescale(
-                self._units/(pq.s**2)).magnitude)
+        decel = float(convert_magnitude(decel, self._units/(pq.s**2)))
         return self._controller._newport_cmd("AE",target=self.axis_id,params=[decel])
    
     @property
@@ -471,8 +990,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s**3))    
     @jerk.setter
     def jerk(self,jerk):
-        jerk = float(assume_units(jerk,self._units/(pq.s**3)).rescale(
-                self._units/(pq.s**3)).magnitude)
+        jerk = float(convert_magnitude(jerk, self._units/(pq.s**3)))
         return self._controller._newport_cmd("JK",target=self.axis_id,params=[jerk])
 
     @property
@@ -489,8 +1007,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s))
     @velocity.setter
     def velocity(self,velocity):
-        velocity = float(assume_units(velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        velocity = float(convert_magnitude(velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("VA",target=self.axis_id,params=[velocity])
 
     @property
@@ -507,8 +1024,7 @@ class NewportESP301Axis(object):
                 self._units/pq.s)
     @max_velocity.setter
     def max_velocity(self,velocity):
-        velocity = float(assume_units(velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        velocity = float(convert_magnitude(velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("VU", target=self.axis_id,params=[velocity])
     
     @property
@@ -525,8 +1041,7 @@ class NewportESP301Axis(object):
                 self._units/pq.s)
     @max_base_velocity.setter
     def max_base_velocity(self,velocity):
-        velocity = float(assume_units(velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        velocity = float(convert_magnitude(velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("VB", target=self.axis_id,params=[velocity])
     
     @property
@@ -543,8 +1058,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s))
     @jog_high_velocity.setter
     def jog_high_velocity(self,jog_high_velocity):
-        jog_high_velocity = float(assume_units(jog_high_velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        jog_high_velocity = float(convert_magnitude(jog_high_velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("JH",target=self.axis_id,params=[jog_high_velocity])
 
     @property
@@ -561,8 +1075,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s))
     @jog_low_velocity.setter
     def jog_low_velocity(self,jog_low_velocity):
-        jog_low_velocity = float(assume_units(jog_low_velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        jog_low_velocity = float(convert_magnitude(jog_low_velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("JW",target=self.axis_id,params=[jog_low_velocity])
 
     @property
@@ -579,8 +1092,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s))
     @homing_velocity.setter
     def homing_velocity(self,homing_velocity):
-        homing_velocity = float(assume_units(homing_velocity,self._units/(pq.s)).rescale(
-                self._units/(pq.s)).magnitude)
+        homing_velocity = float(convert_magnitude(homing_velocity, self._units/(pq.s)))
         return self._controller._newport_cmd("OH",target=self.axis_id,params=[homing_velocity])
 
     @property
@@ -598,8 +1110,7 @@ class NewportESP301Axis(object):
                 self._units/(pq.s**2))
     @max_acceleration.setter
     def max_acceleration(self,accel):
-        accel = float(assume_units(accel,self._units/(pq.s**2)).rescale(
-                self._units/(pq.s**2)).magnitude)
+        accel = float(convert_magnitude(accel, self._units/(pq.s**2)))
         return self._controller._newport_cmd("AU",target=self.axis_id,params=[accel])
 
     # Max deacceleration is always the same as accelleration 
@@ -616,8 +1127,7 @@ class NewportESP301Axis(object):
         return self.max_acceleration
     @max_deceleration.setter
     def max_deacceleration(self,decel):        
-        decel = float(assume_units(decel,self._units/(pq.s**2)).rescale(
-                self._units/(pq.s**2)).magnitude)
+        decel = float(convert_magnitude(decel, self._units/(pq.s**2)))
         return self.max_acceleration(decel)
     
     @property
@@ -651,7 +1161,7 @@ class NewportESP301Axis(object):
             of current newport unit/s
         :type: `~quantities.Quantity` or `float`
         """
-        return assume_units(float(self._controller._newport_cmd("DP?", target=self.axis_id)),
+        return assume_units(float(self._controller._newport_cmd("DV?", target=self.axis_id)),
                 self._units/pq.s)
     
     @property
@@ -669,8 +1179,7 @@ class NewportESP301Axis(object):
     #default should be 0 as that sets current position as home
     @home.setter
     def home(self, home=0):
-        home = float(assume_units(home,self._units).rescale(
-                self._units).magnitude)
+        home = float(convert_magnitude(home, self._units))
         return self._controller._newport_cmd("DH", target=self.axis_id, params=[home])
     
     @property
@@ -715,8 +1224,7 @@ class NewportESP301Axis(object):
     @encoder_resolution.setter
     def encoder_resolution(self, resolution):
         
-        resolution = float(assume_units(resolution,self._units).rescale(
-                self._units).magnitude)
+        resolution = float(convert_magnitude(resolution, self._units))
         return self._controller._newport_cmd("SU",target=self.axis_id,params=[resolution])
 
     @property
@@ -735,8 +1243,7 @@ class NewportESP301Axis(object):
     @full_step_resolution.setter
     def full_step_resolution(self, full_step_resolution):
         
-        full_step_resolution = float(assume_units(full_step_resolution,self._units).rescale(
-                self._units).magnitude)
+        full_step_resolution = float(convert_magnitude(full_step_resolution, self._units))
         return self._controller._newport_cmd("FR",target=self.axis_id,params=[full_step_resolution])
     
     @property
@@ -752,8 +1259,7 @@ class NewportESP301Axis(object):
                 self._units)
     @left_limit.setter
     def left_limit(self, limit):
-        limit = float(assume_units(limit,self._units).rescale(
-                self._units).magnitude)
+        limit = float(convert_magnitude(limit, self._units))
         return self._controller._newport_cmd("SL",target=self.axis_id,params=[limit])    
 
     @property
@@ -769,8 +1275,7 @@ class NewportESP301Axis(object):
                 self._units)
     @right_limit.setter
     def right_limit(self, limit):
-        limit = float(assume_units(limit,self._units).rescale(
-            self._units).magnitude)
+        limit = float(convert_magnitude(limit, self._units))
         return self._controller._newport_cmd("SR",target=self.axis_id,params=[limit])
     
     @property
@@ -786,8 +1291,7 @@ class NewportESP301Axis(object):
                 self._units)
     @error_threshold.setter
     def error_threshold(self, error_threshold):
-        error_threshold = float(assume_units(error_threshold,self._units).rescale(
-            self._units).magnitude)
+        error_threshold = float(convert_magnitude(error_threshold, self._units))
         return self._controller._newport_cmd("FE",target=self.axis_id,params=[error_threshold])
 
     @property
@@ -803,8 +1307,7 @@ class NewportESP301Axis(object):
                 pq.A)
     @current.setter
     def current(self, current):
-        current = float(assume_units(current,pq.A).rescale(
-            pq.A).magnitude)
+        current = float(convert_magnitude(current, pq.A))
         return self._controller._newport_cmd("QI",target=self.axis_id,params=[current])
 
     @property
@@ -820,8 +1323,7 @@ class NewportESP301Axis(object):
                 self.V)
     @voltage.setter
     def voltage(self, voltage):
-        voltage = float(assume_units(voltage,pq.V).rescale(
-            pq.V).magnitude)
+        voltage = float(convert_magnitude(voltage, pq.V))
         return self._controller._newport_cmd("QV",target=self.axis_id,params=[voltage])
    
     @property    
@@ -997,9 +1499,12 @@ class NewportESP301Axis(object):
             commands until movement is finished
         :param bool block: If True, will block code until movement is finished
         """
-        position = float(assume_units(position,self._units).rescale(
-            self._units).magnitude)
+        position = float(convert_magnitude(position, self._units))
         # TODO: handle unit conversions here.
+        if block and not wait:
+            self._controller.move_axes({self: position}, absolute=absolute)
+            return
+
         if absolute:
             self._controller._newport_cmd("PA", params=[position], target=self.axis_id)
         else:
@@ -1007,11 +1512,8 @@ class NewportESP301Axis(object):
         
         if wait:
             self.wait_for_position(position)
-            if block:
-                sleep(0.003)
-                mot = self.is_motion_done
-                while not mot:                    
-                    mot = self.is_motion_done
+        if block:
+            self.wait_for_motion()
 
 
     def move_to_hardware_limit(self):
@@ -1055,8 +1557,7 @@ class NewportESP301Axis(object):
 
         :type position: float or :class:`~quantities.Quantity`
         """
-        position = float(assume_units(position,self._units).rescale(
-            self._units).magnitude)
+        position = float(convert_magnitude(position, self._units))
         self._controller._newport_cmd("WP",target=self.axis_id,params=[position])
     
     def wait_for_motion(self, poll_interval=0.01, max_wait=None):
@@ -1075,19 +1576,11 @@ class NewportESP301Axis(object):
         #        In programming mode, the "WS" command should be
         #        sent instead, and the two parameters to this method should
         #        be ignored.
-        poll_interval = float(assume_units(position,pq.s).rescale(
-            pq.s).magnitude)
-        max_wait = float(assume_units(position,pq.s).rescale(
-            pq.s).magnitude)
-        tic = time()
-        while True:
-            if self.is_motion_done:
-                return
-            else:
-                if max_wait is None or (time() - tic) < max_wait:
-                    sleep(poll_interval)
-                else:
-                    raise IOError("Timed out waiting for motion to finish.")
+        poll_interval = float(convert_magnitude(poll_interval, pq.s))
+        if max_wait is not None:
+            max_wait = float(convert_magnitude(max_wait, pq.s))
+        self._controller._wait_for_motion([self],
+            poll_interval=poll_interval, max_wait=max_wait)
                     
     def enable(self):
         """
@@ -1216,13 +1709,11 @@ class NewportESP301Axis(object):
             self.hardware_limit_configuration = kwargs['hardware_limit_configuration']            
         if 'reduce_motor_torque_time' in kwargs and 'reduce_motor_torque_percentage' in kwargs:
             time = kwargs['reduce_motor_torque_time']
-            time= int(assume_units(time,pq.ms).rescale(
-            pq.ms).magnitude)
+            time= int(convert_magnitude(time, pq.ms))
             if not (time >=0 and time <=60000):
                 raise ValueError("Time must be between 0 and 60000 ms")
             percentage = kwargs['reduce_motor_torque_percentage']
-            percentage = int(assume_units(percentage,pq.percent).rescale(
-                pq.percent).magnitude)
+            percentage = int(convert_magnitude(percentage, pq.percent))
             if not (percentage >=0 and percentage <=100):
                 raise ValueError("Time must be between 0 and 60000 ms")
             self._controller._newport_cmd("QR",target=self._axis_id,params=[time,percentage])
@@ -1266,38 +1757,11 @@ class NewportESP301Axis(object):
             'trajectory'
             'hardware_limit_configuration'
 
+        All values are read with a single compound query.
+
         :rtype: dict of `quantities.Quantity`, float and int
         """
-        
-        config = {}        
-        config['units'] = self.units
-        config['motor_type'] = self.motor_type
-        config['feedback_configuration'] = self.feedback_configuration
-        config['full_step_resolution'] = self.full_step_resolution
-        config['position_display_resolution'] = self.position_display_resolution
-        config['current'] = self.current
-        config['max_velocity'] = self.max_velocity
-        config['encoder_resolution'] = self.encoder_resolution
-        config['acceleration'] = self.acceleration
-        config['deceleration'] = self.deceleration
-        config['velocity'] = self.velocity
-        config['max_acceleration'] = self.max_acceleration            
-        config['homing_velocity'] = self.homing_velocity
-        config['jog_high_velocity'] = self.jog_high_velocity
-        config['jog_low_velocity'] = self.jog_low_velocity
-        config['estop_deceleration'] = self.estop_deceleration
-        config['jerk'] = self.jerk
-        #config['error_threshold'] = self.error_threshold
-        config['proportional_gain'] = self.proportional_gain
-        config['derivative_gain'] = self.derivative_gain
-        config['integral_gain'] = self.integral_gain
-        config['integral_saturation_gain'] = self.integral_saturation_gain
-        config['home'] = self.home
-        config['microstep_factor'] = self.microstep_factor
-        config['acceleration_feed_forward'] = self.acceleration_feed_forward
-        config['trajectory'] = self.trajectory
-        config['hardware_limit_configuration'] = self.hardware_limit_configuration
-        return config
+        return self._controller.read_setup([self])[0]
 
     def get_status(self):
         """
@@ -1308,16 +1772,11 @@ class NewportESP301Axis(object):
             'desired_velocity'
             'is_motion_done'
 
+        All values are read with a single compound query.
+
         :rtype: dict
         """
-        status = {}
-        status['units'] = self.units 
-        status['position'] = self.position 
-        status['desired_position'] = self.desired_position
-        status['desired_velocity'] = self.desired_velocity
-        status['is_motion_done'] = self.is_motion_done
-
-        return status
+        return self._controller.get_status([self])[0]
         
     # FIXME: make these two methods private.
         
@@ -1345,3 +1804,181 @@ class NewportESP301Axis(object):
                 
         raise KeyError("{0} is not a valid unit for Newport Axis".format(quantity))
 
+
+class NewportESP301Scan(object):
+    """
+    Scan over a sequence of positions, compiled into user programs that
+    the controller executes on its own, rather than being sent one move at
+    a time. The scan is split across consecutive program IDs, which are
+    uploaded by `~NewportESP301Scan.upload` and run one after another by
+    `~NewportESP301Scan.run`.
+
+    At each point, the axes whose positions change are moved together and
+    waited on ("WS"), after which the controller optionally dwells ("WT")
+    and pulses its digital outputs ("SB").
+
+    :param NewportESP301 controller: Controller to run the scan.
+    :param axes: Axes to scan, either as `NewportESP301Axis` or by their
+        zero-based indices.
+    :param positions: Sequence of points to visit, each giving the absolute
+        position of every axis, in the same order as ``axes``.
+    :param dwell: Time to wait at each point.
+    :type dwell: `~quantities.Quantity` or `float` (milliseconds)
+    :param int trigger: Bit mask of the digital outputs to pulse at each
+        point, or `None` to not pulse any.
+    :param trigger_width: Duration of each trigger pulse.
+    :type trigger_width: `~quantities.Quantity` or `float` (milliseconds)
+    :param int first_program: ID of the first program to store the scan in.
+    :param int max_commands: Maximum number of commands to store in each
+        program.
+    """
+
+    def __init__(self, controller, axes, positions, dwell=None, trigger=None,
+            trigger_width=1, first_program=1,
+            max_commands=_MAX_PROGRAM_COMMANDS):
+        self._controller = controller
+        self._axes = [
+            axis if isinstance(axis, NewportESP301Axis) else controller.axis[axis]
+            for axis in axes
+        ]
+        self._positions = [
+            tuple(
+                float(convert_magnitude(position, axis._units))
+                for axis, position in zip(self._axes, point)
+            )
+            for point in positions
+        ]
+        if any(len(point) != len(self._axes) for point in self._positions):
+            raise ValueError("Each point must give a position for every axis.")
+
+        self._dwell = None if dwell is None else int(convert_magnitude(dwell, pq.ms))
+        self._trigger = trigger
+        self._trigger_width = int(convert_magnitude(trigger_width, pq.ms))
+        self._max_commands = max_commands
+
+        self._programs = [
+            (first_program + idx, program)
+            for idx, program in enumerate(self._compile())
+        ]
+        if self._programs[-1][0] not in xrange(1, 101):
+            raise ValueError("Scan does not fit in the available program IDs.")
+
+    ## STATIC METHODS ##
+
+    @staticmethod
+    def grid(*axis_positions, **kwargs):
+        """
+        Returns the points of a raster scan over a grid, varying the
+        position of the last axis fastest.
+
+        :param axis_positions: Positions of each axis.
+        :param bool serpentine: If `True` (the default), every other line is
+            scanned in reverse, so as not to retrace it.
+
+        :rtype: `list` of `tuple`
+        """
+        serpentine = kwargs.pop('serpentine', True)
+        if kwargs:
+            raise TypeError("Unexpected keyword arguments: {}".format(
+                ", ".join(kwargs)))
+        points = [()]
+        for positions in axis_positions:
+            positions = list(positions)
+            new_points = []
+            for idx, point in enumerate(points):
+                line = positions[::-1] if serpentine and idx % 2 else positions
+                new_points.extend(point + (position,) for position in line)
+            points = new_points
+        return points
+
+    ## PRIVATE METHODS ##
+
+    def _compile_point(self, point, previous):
+        """
+        Returns the commands visiting a single point of the scan.
+        """
+        moved = [
+            (axis, position)
+            for idx, (axis, position) in enumerate(zip(self._axes, point))
+            if previous is None or previous[idx] != position
+        ]
+        cmds = [_format_cmd("PA", [position], axis) for axis, position in moved]
+        cmds.extend(_format_cmd("WS", target=axis) for axis, _ in moved)
+        if self._dwell:
+            cmds.append(_format_cmd("WT", [self._dwell]))
+        if self._trigger is not None:
+            cmds.append(_format_cmd("SB", ["{:X}H".format(self._trigger)]))
+            cmds.append(_format_cmd("WT", [self._trigger_width]))
+            cmds.append(_format_cmd("SB", ["0H"]))
+        return cmds
+
+    def _compile(self):
+        """
+        Compiles the scan into the commands of each of its programs.
+        """
+        programs = [[]]
+        previous = None
+        for point in self._positions:
+            cmds = self._compile_point(point, previous)
+            if len(cmds) > self._max_commands:
+                raise ValueError("A single point takes more than {} "
+                    "commands.".format(self._max_commands))
+            if len(programs[-1]) + len(cmds) > self._max_commands:
+                programs.append([])
+            programs[-1].extend(cmds)
+            previous = point
+        return programs
+
+    ## PROPERTIES ##
+
+    @property
+    def programs(self):
+        """
+        Gets the ID and commands of each program the scan is compiled into.
+
+        :type: `list` of `tuple` of `int` and `list` of `str`
+        """
+        return self._programs
+
+    ## METHODS ##
+
+    def upload(self):
+        """
+        Stores the programs of the scan on the controller, replacing any
+        existing programs with the same IDs. The commands of each program
+        are sent in as few command lines as possible.
+        """
+        controller = self._controller
+        for program_id, cmds in self._programs:
+            controller._newport_cmd("XX", target=program_id)
+            # Error checking is unsupported while programming.
+            controller._newport_cmd("EP", target=program_id, errcheck=False)
+            for line in _join_lines(cmds):
+                controller._execute_cmd(line, errcheck=False)
+            controller._newport_cmd("QP")
+
+    def run(self, max_wait=None):
+        """
+        Runs the scan, blocking until it is complete.
+
+        :param max_wait: Maximum amount of time to wait before raising a
+            `IOError`. If `None`, waits indefinitely.
+        :type max_wait: `~quantities.Quantity` or `float` (seconds)
+
+        :return: Status of each axis at the end of the scan, as returned by
+            `NewportESP301Axis.get_status`.
+        :rtype: `list` of `dict`
+        """
+        if max_wait is not None:
+            max_wait = float(convert_magnitude(max_wait, pq.s))
+        controller = self._controller
+        with controller._reply_timeout(max_wait), \
+                controller.execute_bulk_command():
+            for program_id, _ in self._programs:
+                controller._newport_cmd("EX", target=program_id)
+            # Programs run in turn, so this query is only answered once the
+            # last one is over.
+            controller._newport_cmd("MD?", target=self._axes[-1])
+        if not controller._bulk_query_resp:
+            raise IOError("Timed out waiting for scan to finish.")
+        return controller.get_status(self._axes)
@@ -33,8 +33,10 @@ import abc
 
 from flufl.enum import Enum
 
+import quantities as pq
+
 from instruments.abstract_instruments import (
-    Oscilloscope, OscilloscopeChannel, OscilloscopeDataSource
+    Oscilloscope, OscilloscopeChannel, OscilloscopeDataSource, Waveform
 )
 from instruments.generic_scpi import SCPIInstrument
 from instruments.util_fns import assume_units, ProxyList, bool_property, enum_property
@@ -73,9 +75,29 @@ class RigolDS1000Series(SCPIInstrument, Oscilloscope):
             # TODO: add DIG, FFT.
             if self.name not in ["CHAN1", "CHAN2", "DIG", "MATH", "FFT"]:
                 raise NotImplementedError("Rigol DS1000 series does not support reading waveforms from {}.".format(self.name))
-            self._parent.sendcmd(":WAV:DATA? {}".format(self.name))
-            data = self._parent.binblockread(2) # TODO: check width
-            return data
+            time_scale = float(self._parent.query(":TIM:SCAL?"))
+            time_offset = float(self._parent.query(":TIM:OFFS?"))
+            if self.name.startswith("CHAN"):
+                scale = float(self._parent.query(":{}:SCAL?".format(self.name)))
+                offset = float(self._parent.query(":{}:OFFS?".format(self.name)))
+            
+            with self._parent.exclusive():
+                self._parent.sendcmd(":WAV:DATA? {}".format(self.name))
+                # Each point is returned as a single unsigned byte.
+                data = self._parent.binblockread(1, fmt='>B')
+                self._parent._file.flush_input()
+            
+            # The points span the 12 horizontal divisions of the screen,
+            # centered on the time offset.
+            xincr = 12 * time_scale / len(data)
+            xzero = time_offset - 6 * time_scale
+            if not self.name.startswith("CHAN"):
+                return Waveform(data, xincr=xincr, xzero=xzero)
+            
+            # Channel data counts down from 125 at the center of the screen,
+            # in steps of 1/25 of a vertical division.
+            return Waveform(data, yoffs=125, ymult=-scale / 25, yzero=-offset,
+                xincr=xincr, xzero=xzero, y_units=pq.V)
     
 
     class Channel(DataSource, OscilloscopeChannel):
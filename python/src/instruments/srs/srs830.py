@@ -30,6 +30,9 @@ from __future__ import division
 
 import math
 import time
+import threading
+import Queue
+from collections import namedtuple
 
 import numpy as np
 
@@ -41,12 +44,42 @@ import quantities as pq
 from instruments.generic_scpi import SCPIInstrument
 from instruments.abstract_instruments import gi_gpib as gw
 from instruments.abstract_instruments import serialwrapper as sw
+from instruments.abstract_instruments.wrapperabc import byte_view
 from instruments.util_fns import assume_units
 
 ## CONSTANTS ###################################################################
 
 VALID_SAMPLE_RATES = [2.0**n for n in xrange(-4, 10)]
 
+# Maximum number of points held by each channel's data buffer.
+BUFFER_SIZE = 16383
+
+# Layout of one point of the data buffer, as sent in response to TRCL?. The
+# value of each point is mant * 2**(exp - 124).
+_TRCL_DTYPE = np.dtype([('mant', '<i2'), ('exp', 'u1'), ('pad', 'u1')])
+
+# In FAST2 mode, X and Y are sent as pairs of int16 values, with +/-30000
+# corresponding to +/-full scale.
+_FAST_DTYPE = np.dtype('<i2')
+_FAST_FULL_SCALE = 30000.0
+
+# Delay between sending STRD and the first point being taken, in seconds.
+_STRD_DELAY = 0.5
+
+# Number of points to let accumulate between polls of the data buffer, and
+# the shortest time to wait between polls, in seconds.
+_POLL_CHUNK = 256
+_MIN_POLL_INTERVAL = 0.05
+
+# Number of consecutive polls finding no new points after which sampling is
+# considered to have stopped.
+_MAX_STALLED_POLLS = 5
+
+# Interval at which blocked stream threads check whether they have been
+# asked to stop, in seconds. Reads of a stream are sized to take about
+# this long as well.
+_STREAM_POLL_INTERVAL = 0.1
+
 ## CLASSES #####################################################################
 
 class SRS830(SCPIInstrument):
@@ -121,6 +154,14 @@ class SRS830(SCPIInstrument):
         ch1 = 'ch1'
         ch2 = 'ch2'
         none = 'none'        
+        
+    class BufferFormat(Enum):
+        '''
+        Enum for the formats in which the data buffer can be transferred.
+        '''
+        ascii = 'TRCA'
+        ieee = 'TRCB'
+        compact = 'TRCL'
 
     ## CONSTANTS ##
         
@@ -375,28 +416,46 @@ class SRS830(SCPIInstrument):
         self.data_transfer = True
         self.start_scan()
     
-    def take_measurement(self, sample_rate, num_samples):
+    def take_measurement(self, sample_rate, num_samples,
+                         buffer_format=BufferFormat.ieee, incremental=True):
         '''
         Wrapper function that allows you to easily take measurements with a
         specified sample rate and number of desired samples.
         
-        Function will call time.sleep() for the required amount of time it will
-        take the instrument to complete this sampling operation.
+        By default, the number of points stored is polled while sampling,
+        and new points are downloaded from both channels as they become
+        available, such that the measurement returns as soon as the last
+        point has been taken. Polls are spaced according to the sample rate,
+        to download a few hundred points at a time. If ``incremental`` is
+        `False`, function will instead call time.sleep() for the required
+        amount of time it will take the instrument to complete this sampling
+        operation, then download the data buffers.
         
-        Returns a list containing two items, each of which are lists containing
-        the channel data. The order is [[Ch1 data], [Ch2 data]].
+        Returns an array containing two items, each of which are arrays
+        containing the channel data. The order is [[Ch1 data], [Ch2 data]].
         
         :param `int` sample_rate: Set the desired sample rate of the 
             measurement. See `~SRS830.sample_rate` for more information.
         
         :param `int` num_samples: Number of samples to take.
         
-        :rtype: `list`
+        :param buffer_format: Format in which the data buffer is transferred.
+            See `~SRS830.read_data_buffer` for more information.
+        :type buffer_format: `SRS830.BufferFormat` or `str`
+        
+        :param bool incremental: If `True`, download points while sampling.
+        
+        :rtype: `numpy.ndarray`
         '''
         numSamples = float(num_samples)
-        if numSamples > 16383:
+        if numSamples > BUFFER_SIZE:
             raise ValueError('Number of samples cannot exceed 16383.')
         
+        if incremental:
+            return self._take_measurement_incremental(
+                sample_rate, num_samples, buffer_format
+            )
+        
         sample_time = math.ceil( num_samples/sample_rate )
         
         self.init(sample_rate, SRS830.BufferMode['one_shot'])
@@ -416,10 +475,125 @@ class SRS830(SCPIInstrument):
         except:
             pass
         
-        ch1 = self.read_data_buffer('ch1')
-        ch2 = self.read_data_buffer('ch2')
+        # Both channels hold the same number of points, so only ask once.
+        count = self.num_data_points
+        ch1 = self.read_data_buffer('ch1', count=count, fmt=buffer_format)
+        ch2 = self.read_data_buffer('ch2', count=count, fmt=buffer_format)
         
         return np.array([ch1, ch2])
+        
+    def _take_measurement_incremental(self, sample_rate, num_samples,
+                                      buffer_format):
+        data = np.empty((2, num_samples))
+        
+        self.init(sample_rate, SRS830.BufferMode['one_shot'])
+        # FAST2 would have the instrument send its data unprompted, so leave
+        # it off to be able to poll.
+        self.data_transfer = False
+        self.start_scan()
+        
+        n_read = 0
+        n_stalled = 0
+        n_wait = min(num_samples, _POLL_CHUNK)
+        time.sleep(_STRD_DELAY + n_wait / sample_rate)
+        while True:
+            n_stored = min(self.num_data_points, num_samples)
+            if n_stored == num_samples:
+                self.pause()
+            
+            # Each poll is timed for new points to have been taken, so give
+            # up if several in a row find none, as when the scan has been
+            # paused or is waiting for triggers.
+            if n_stored > n_read:
+                n_stalled = 0
+            else:
+                n_stalled += 1
+                if n_stalled >= _MAX_STALLED_POLLS:
+                    self.pause()
+                    raise IOError('The lock-in stopped taking points after '
+                                  '{} of {} samples.'.format(
+                                    n_stored, num_samples
+                                  ))
+            
+            if n_stored > n_read:
+                # Read both channels for the same points before polling again.
+                count = n_stored - n_read
+                for idx, channel in enumerate(('ch1', 'ch2')):
+                    data[idx, n_read:n_stored] = self.read_data_buffer(
+                        channel, start=n_read, count=count, fmt=buffer_format
+                    )
+                n_read = n_stored
+            if n_read == num_samples:
+                return data
+            
+            # Poll again once the next chunk of points, or the last point,
+            # should have been taken.
+            n_wait = min(num_samples - n_read, _POLL_CHUNK)
+            time.sleep(max(n_wait / sample_rate, _MIN_POLL_INTERVAL))
+    
+    def stream_data(self, sample_rate=None, chunk_size=256, max_chunks=64,
+                    full_scale=1, block=True, max_samples=None):
+        '''
+        Streams X and Y from the lock-in as they are measured, using the FAST2
+        data transfer mode. Unlike `~SRS830.take_measurement`, streaming is
+        not limited by the size of the data buffer, and can run indefinitely
+        at up to 512 Hz.
+        
+        The stream is read by a background thread, which decodes the samples
+        into chunks and queues them for the caller. Each chunk is a
+        ``Chunk(index, t, x, y)`` tuple, giving the index of its first sample
+        and arrays of the time of each sample, as from `time.time`, and of X
+        and Y.
+        
+        If the caller falls behind and the queue fills up, the background
+        thread stops reading from the instrument until the queue has room,
+        such that no samples are lost on the host. If the lock-in falls too
+        far behind in turn, it aborts the transfer, which is reported by an
+        `IOError` when the stream is stopped. With ``block=False``, the
+        oldest queued chunks are instead discarded, and counted by the
+        ``overruns`` attribute of the stream.
+        
+        FAST2 transfers are only supported by the SRS830 over GPIB. As the
+        samples are sent unprompted and without terminators, they must be
+        read through a connection supporting raw reads, such as a VISA GPIB
+        interface. The Galvant Industries GPIB adapters only read from the
+        instrument when prompted and up to a terminator, and so cannot be
+        used. The connection timeout must be longer than both the interval
+        between samples and the delay before the first, and the lock-in
+        should not be used in any other way until the stream is stopped.
+        
+        Example usage:
+        
+        >>> import instruments as ik
+        >>> srs = ik.srs.SRS830.open_visa('GPIB0::8::INSTR')
+        >>> srs.clear_data_buffer()
+        >>> with srs.stream_data(512) as stream:
+        ...     for chunk in stream:
+        ...         print chunk.t[-1], chunk.x.mean(), chunk.y.mean()
+        
+        :param sample_rate: If not `None`, the sample rate to set before
+            streaming. See `~SRS830.sample_rate` for more information.
+        :param int chunk_size: Number of samples in each chunk.
+        :param int max_chunks: Maximum number of chunks to queue.
+        :param full_scale: Value corresponding to a full scale reading,
+            such as the sensitivity of the lock-in. By default, X and Y are
+            given as fractions of full scale.
+        :type full_scale: `float` or `~quantities.Quantity`
+        :param bool block: If `False`, discard the oldest chunks when the
+            queue is full rather than waiting for it to be emptied.
+        :param int max_samples: If not `None`, the stream ends once this many
+            samples have been read.
+        
+        :rtype: `_SRS830FastStream`
+        '''
+        if not self._file.supports_raw_reads:
+            raise TypeError('FAST2 data transfers can only be read through '
+                            'connections supporting raw reads, such as VISA.')
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        rate = float(self.sample_rate.rescale(pq.Hz).magnitude)
+        return _SRS830FastStream(self, rate, chunk_size, max_chunks,
+                                 full_scale, block, max_samples)
     
     ## OTHER METHODS ##
     
@@ -521,37 +695,81 @@ class SRS830(SCPIInstrument):
         return map(float, result.split(','))
     
     _valid_read_data_buffer = {Mode.ch1:1, Mode.ch2:2}
-    def read_data_buffer(self, channel):
+    def read_data_buffer(self, channel, start=0, count=None,
+                         fmt=BufferFormat.ascii):
         '''
-        Reads the entire data buffer for a specific channel.
-        Transfer is done in ASCII mode. Although binary would be faster,
-        this is not currently implemented.
+        Reads the data buffer for a specific channel, starting from the point
+        at index ``start``. By reading from the end of the previous read, the
+        buffer can be drained in chunks while the instrument is still filling
+        it.
+        
+        The buffer can be transferred as ASCII, or in one of two binary
+        formats, which are decoded directly into an array. Both binary
+        formats take 4 bytes per point, and are several times faster than
+        ASCII. The ``compact`` format is the quickest for the instrument to
+        produce.
         
-        Returns a list of floats containing instrument's measurements.
+        Returns an array of floats containing the instrument's measurements.
         
         :param channel: Channel data buffer to read from. Valid channels are
             given by {CH1|CH2}.
         :type channel: `SRS830.Mode` or `str`
         
-        :rtype: `list`
+        :param int start: Index of the first point to read.
+        :param int count: Number of points to read. If `None`, all points
+            stored from ``start`` onwards are read.
+        
+        :param fmt: Format in which to transfer the data buffer.
+        :type fmt: `SRS830.BufferFormat` or `str`
+        
+        :rtype: `numpy.ndarray`
         '''
         if isinstance(channel, str):
             channel = channel.lower()
             channel = SRS830.Mode[channel]
+        if isinstance(fmt, str):
+            fmt = SRS830.BufferFormat[fmt.lower()]
         
         if channel not in self._valid_read_data_buffer:
             raise ValueError('Specified mode not valid for this function.')
         
         channel = self._valid_read_data_buffer[channel]
-    
-        N = self.num_data_points # Retrieve number of data points stored
-        
-        # Query device for entire buffer, returning in ASCII, then
-        # converting to a list of floats before returning to the
-        # calling method
-        return np.fromstring(self.query('TRCA?{},0,{}'.format(channel,N))
-                                        .strip(), sep=','
-                                        )
+        
+        if count is None:
+            # Retrieve number of data points stored
+            count = self.num_data_points - start
+        if start < 0 or count < 0 or start + count > BUFFER_SIZE:
+            raise ValueError('Points {} to {} are outside of the data '
+                             'buffer.'.format(start, start + count))
+        if count == 0:
+            return np.empty(0)
+        
+        cmd = '{}?{},{},{}'.format(fmt.value, channel, start, count)
+        
+        if fmt is SRS830.BufferFormat.ascii:
+            # Query device for the buffer, returning in ASCII, then
+            # converting to an array of floats before returning to the
+            # calling method
+            return np.fromstring(self.query(cmd).strip(), sep=',')
+        
+        # The binary formats are sent as exactly 4 bytes per point, with no
+        # header or terminator.
+        if fmt is SRS830.BufferFormat.ieee:
+            data = np.empty(count, dtype='<f4')
+        else:
+            data = np.empty(count, dtype=_TRCL_DTYPE)
+        with self.exclusive():
+            self.sendcmd(cmd)
+            self._readinto_exactly(data)
+            if isinstance(self._file, gw.GPIBWrapper):
+                # The GI GPIB adapter ends every response with a CR, which
+                # would otherwise be read as the response to the next query.
+                self._read_terminated()
+        
+        if fmt is SRS830.BufferFormat.ieee:
+            return data.astype(float)
+        return np.ldexp(data['mant'].astype(float),
+                        data['exp'].astype(int) - 124)
     
     def clear_data_buffer(self):
         '''
@@ -620,3 +838,183 @@ class SRS830(SCPIInstrument):
             
             
             
+
+class _SRS830FastStream(object):
+    '''
+    Stream of samples from an SRS830 in the FAST2 data transfer mode, read
+    by a background thread. Streams are obtained from `SRS830.stream_data`,
+    and are started and stopped by using them in a ``with`` block.
+    '''
+    
+    Chunk = namedtuple('Chunk', ['index', 't', 'x', 'y'])
+    
+    def __init__(self, lia, sample_rate, chunk_size, max_chunks, full_scale,
+                 block, max_samples):
+        self._lia = lia
+        self._rate = sample_rate
+        self._chunk_size = chunk_size
+        self._scale = full_scale / _FAST_FULL_SCALE
+        self._block = block
+        self._max_samples = max_samples
+        self._queue = Queue.Queue(max_chunks)
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+        self.t0 = None
+        self.n_samples = 0
+        self.overruns = 0
+        self.aborted = False
+        
+    def __enter__(self):
+        self.start()
+        return self
+        
+    def __exit__(self, type, value, traceback):
+        self.stop()
+        if self.aborted and type is None:
+            raise IOError('The lock-in aborted the data transfer after {} '
+                          'samples, as they were not read quickly enough.'
+                          .format(self.n_samples))
+        
+    def __iter__(self):
+        while True:
+            chunk = self.get()
+            if chunk is None:
+                return
+            yield chunk
+            
+    ## PROPERTIES ##
+    
+    @property
+    def running(self):
+        '''
+        Gets whether the background thread is reading from the instrument.
+        
+        :type: `bool`
+        '''
+        return self._thread is not None and self._thread.is_alive()
+            
+    ## METHODS ##
+    
+    def start(self):
+        '''
+        Starts the data transfer, and the thread reading it.
+        '''
+        if self._thread is not None:
+            raise RuntimeError('Streams can only be started once.')
+        self._lia.start_data_transfer()
+        self.t0 = time.time() + _STRD_DELAY
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        
+    def stop(self):
+        '''
+        Stops the data transfer, and checks whether the lock-in had to abort
+        it. Chunks already queued can still be read after stopping.
+        '''
+        if self._thread is None or self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._lia.pause()
+        self._lia.data_transfer = False
+        self._lia._file.flush_input()
+        # Bit 5 of the error status is set if the FAST transfer was aborted.
+        self.aborted = bool(int(self._lia.query('ERRS? 5')))
+        
+    def get(self):
+        '''
+        Waits for the next chunk of samples.
+        
+        :return: The next chunk, or `None` once the stream has ended and all
+            queued chunks have been read.
+        :rtype: ``Chunk``
+        '''
+        while True:
+            try:
+                return self._queue.get(timeout=_STREAM_POLL_INTERVAL)
+            except Queue.Empty:
+                pass
+            if self._thread is None or not self._thread.is_alive():
+                break
+        # The thread may have queued a last chunk just before ending.
+        try:
+            return self._queue.get_nowait()
+        except Queue.Empty:
+            pass
+        if self._error is not None:
+            raise self._error
+        return None
+        
+    def _run(self):
+        try:
+            # Hold the connection for the whole stream, as any other exchange
+            # would be mixed in with the samples.
+            with self._lia.exclusive():
+                self._read_chunks()
+        except Exception as e:
+            self._error = e
+            
+    def _read_chunks(self):
+        while not self._stop.is_set():
+            n_samples = self._chunk_size
+            if self._max_samples is not None:
+                n_samples = min(n_samples,
+                                self._max_samples - self.n_samples)
+                if n_samples <= 0:
+                    break
+            raw = np.empty((n_samples, 2), dtype=_FAST_DTYPE)
+            n_samples = self._fill(raw)
+            if n_samples == 0:
+                break
+            raw = raw[:n_samples]
+            idx = self.n_samples + np.arange(n_samples)
+            self._put(self.Chunk(
+                index=self.n_samples,
+                t=self.t0 + idx / self._rate,
+                x=raw[:, 0] * self._scale,
+                y=raw[:, 1] * self._scale
+            ))
+            self.n_samples += n_samples
+            
+    def _fill(self, raw):
+        '''
+        Reads into ``raw`` until it is full or the stream is stopped, and
+        returns the number of complete samples read.
+        '''
+        view = byte_view(raw)
+        # Read a short interval's worth of samples at a time, so that stopping
+        # does not wait for a whole chunk to arrive.
+        read_size = raw[0].nbytes * max(
+            1, int(self._rate * _STREAM_POLL_INTERVAL)
+        )
+        n_read = 0
+        while n_read < len(view) and not self._stop.is_set():
+            data = self._lia._file.read_raw(min(len(view) - n_read, read_size))
+            if not data:
+                break
+            view[n_read:n_read + len(data)] = data
+            n_read += len(data)
+        return n_read // raw[0].nbytes
+        
+    def _put(self, chunk):
+        if not self._block:
+            while True:
+                try:
+                    self._queue.put_nowait(chunk)
+                    return
+                except Queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.overruns += 1
+                    except Queue.Empty:
+                        pass
+        # Waiting here leaves the connection unread, and so the instrument
+        # waits in turn.
+        while not self._stop.is_set():
+            try:
+                self._queue.put(chunk, timeout=_STREAM_POLL_INTERVAL)
+                return
+            except Queue.Full:
+                pass
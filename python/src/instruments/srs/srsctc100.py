@@ -30,13 +30,22 @@ from __future__ import division
 
 from flufl.enum import Enum
 
+import numpy as np
 import quantities as pq
 
 from contextlib import contextmanager
 
+from instruments.abstract_instruments.batch import QueryBatch
 from instruments.generic_scpi import SCPIInstrument
 from instruments.util_fns import assume_units, ProxyList
 import sys
+
+## CONSTANTS ###################################################################
+
+# Number of log points requested before reading any of their responses when
+# downloading a log.
+_LOG_CHUNK = 256
+
 ## ENUMS #######################################################################
 
 
@@ -52,6 +61,11 @@ class SRSCTC100(SCPIInstrument):
     def __init__(self, filelike):
         super(SRSCTC100, self).__init__(filelike)
         self._do_errcheck = True
+        
+        # Channel names and units, queried as needed and then kept until
+        # invalidated by refresh_channels().
+        self._channel_names_cache = None
+        self._channel_units_cache = None
     
     
     ## DICTIONARIES ##
@@ -103,6 +117,8 @@ class SRSCTC100(SCPIInstrument):
             
         def _set(self, prop_name, newval):
             self._ctc.sendcmd('{}.{} = "{}"'.format(self._rem_name, prop_name, newval))
+            if prop_name in ('name', 'units'):
+                self._ctc.refresh_channels()
         
         ## DISPLAY AND PROGRAMMING ##
         # These properties control how the channel is identified in scripts
@@ -178,6 +194,16 @@ class SRSCTC100(SCPIInstrument):
         ## LOGGING ##
     
         def get_log_point(self, which='next', units=None):
+            """
+            Gets a single point from the log of this channel.
+
+            :param which: Which point to get; ``'first'``, ``'next'``, or
+                the index of a point.
+            :param units: Units of the channel, or `None` to query them.
+
+            :return: The time and value of the point.
+            :rtype: `tuple` of `~quantities.Quantity`
+            """
             if units is None:
                 units = self.units
                 
@@ -187,31 +213,54 @@ class SRSCTC100(SCPIInstrument):
                     'getLog.xy {}, {}'.format(self._chan_name, which)
                 ).split(',')
             ]
-            return pq.Quantity(point[0], 'ms'), pq.Quantity(point[1], units)
+            return pq.Quantity(float(point[0]), 'ms'), \
+                pq.Quantity(float(point[1]), units)
             
-        def get_log(self):
+        def get_log(self, start=0, chunk_size=_LOG_CHUNK):
+            """
+            Downloads the log of this channel, starting from a given point.
+            Points are requested in chunks, with all requests in a chunk
+            written before any response is read.
+
+            Periodic downloads can transfer only new points by passing the
+            number of points already downloaded as ``start``.
+
+            :param int start: Index of the first point to download.
+            :param int chunk_size: Number of points to request at once.
+
+            :return: The times and values of the points.
+            :rtype: `tuple` of `~quantities.Quantity`
+            """
             # Remember the current units.
             units = self.units
         
             # Find out how many points there are.
             n_points = int(self._ctc.query('getLog.xy? {}'.format(self._chan_name)))
+            n_new = max(n_points - start, 0)
             
-            # Make an empty quantity that size for the times and for the channel
-            # values.
-            ts = pq.Quantity(np.empty((n_points,)), 'ms')
-            temps = pq.Quantity(np.empty((n_points,)), units)
+            # Parse the responses straight into a single array, and only
+            # attach units once all points are in.
+            data = np.empty((n_new, 2))
             
-            # Reset the position to the first point, then save it.
+            which = 'first' if start == 0 else start
             with self._ctc._error_checking_disabled():
-                ts[0], temps[0] = get_log_point('first', units)
-                for idx in xrange(1, n_points):
-                    ts[idx], temps[idx] = get_log_point('next', units)
+                for idx in xrange(0, n_new, chunk_size):
+                    count = min(chunk_size, n_new - idx)
+                    batch = self._ctc.batch()
+                    for _ in xrange(count):
+                        batch.query('getLog.xy {}, {}'.format(
+                            self._chan_name, which
+                        ))
+                        which = 'next'
+                    data[idx:idx + count] = np.fromstring(
+                        ",".join(batch.execute()), sep=","
+                    ).reshape((count, 2))
             
             # Do an actual error check now.
             if self._ctc._do_errcheck:
                 self._ctc._errcheck()
                 
-            return ts, temps
+            return pq.Quantity(data[:, 0], 'ms'), pq.Quantity(data[:, 1], units)
                 
             
    
@@ -236,11 +285,12 @@ class SRSCTC100(SCPIInstrument):
         # As a consequence, users of this instrument MUST use spaces
         # matching the pretty name and not the remote-programming name.
         # CG could not think of a good way around this.
-        names = [
-            name.strip()
-            for name in self.query('getOutput.names?').split(',')
-        ]
-        return names
+        if self._channel_names_cache is None:
+            self._channel_names_cache = [
+                name.strip()
+                for name in self.query('getOutput.names?').split(',')
+            ]
+        return self._channel_names_cache
     
     def _channel_units(self):
         """
@@ -249,14 +299,16 @@ class SRSCTC100(SCPIInstrument):
         are presented the same way by the instrument, and so both are reported
         using `pq.dimensionless`.
         """
-        unit_strings = [
-            unit_str.strip()
-            for unit_str in self.query('getOutput.units?').split(',')
-        ]
-        return dict(
-            (chan_name, self._UNIT_NAMES[unit_str])
-            for chan_name, unit_str in zip(self._channel_names(), unit_strings)
-        )
+        if self._channel_units_cache is None:
+            unit_strings = [
+                unit_str.strip()
+                for unit_str in self.query('getOutput.units?').split(',')
+            ]
+            self._channel_units_cache = dict(
+                (chan_name, self._UNIT_NAMES[unit_str])
+                for chan_name, unit_str in zip(self._channel_names(), unit_strings)
+            )
+        return self._channel_units_cache
         
     def _errcheck(self):
         errs = super(SRSCTC100, self).query('geterror?').strip()
@@ -277,8 +329,8 @@ class SRSCTC100(SCPIInstrument):
     ## PROPERTIES ##
     @property
     def channel(self):
-        # Note that since the names can change, we need to query channel names
-        # each time. This is inefficient, but alas.
+        # Channel names are cached, so that names changed from the front
+        # panel are only picked up after calling refresh_channels().
         return ProxyList(self, self.Channel, self._channel_names())
         
     @property
@@ -290,8 +342,31 @@ class SRSCTC100(SCPIInstrument):
             raise ValueError("Number of display figures must be an integer from 0 to 6, inclusive.")
         self.sendcmd('system.display.figures = {}'.format(newval))
         
+    ## METHODS ##
+    
+    def refresh_channels(self):
+        """
+        Discards the cached names and units of the channels, so that they
+        are queried again when next needed. This is done automatically when
+        a channel is renamed or its units are changed through this class,
+        but must be called explicitly after changes made from the front
+        panel.
+        """
+        self._channel_names_cache = None
+        self._channel_units_cache = None
+    
     ## OVERRIDEN METHODS ##
     
+    def batch(self):
+        """
+        Returns a batch that collects queries to this instrument. As the
+        CTC-100 does not accept several commands in one message, the queries
+        are written back-to-back before any of the responses are read.
+        
+        :rtype: `~instruments.abstract_instruments.batch.QueryBatch`
+        """
+        return QueryBatch(self)
+    
     # We override sendcmd() and query() to do error checking after each command.
     def sendcmd(self, cmd):
         super(SRSCTC100, self).sendcmd(cmd)
@@ -307,5 +382,5 @@ class SRSCTC100(SCPIInstrument):
     ## LOGGING COMMANDS ##
     
     def clear_log(self):
-        self._ctc.sendcmd('System.Log.Clear yes')
+        self.sendcmd('System.Log.Clear yes')
     
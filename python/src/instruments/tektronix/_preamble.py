@@ -0,0 +1,107 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# _preamble.py: Caching of waveform preambles for Tektronix oscilloscopes.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+## CLASSES #####################################################################
+
+class PreambleCacheMixin(object):
+    '''
+    Mixin for Tektronix oscilloscopes that fetches the waveform preamble
+    (``WFMP``) values needed to scale a waveform in a single round trip, and
+    optionally caches them by data source between reads.
+    
+    Caching is off by default, since the preamble also changes when the
+    oscilloscope is adjusted from its front panel. Once enabled with
+    `cache_preamble`, the cache is cleared whenever the driver changes the
+    scale, record length, data width or encoding, and when the instrument
+    is reset. Changes made in any other way require a call to
+    `invalidate_preamble`.
+    '''
+    
+    ## PROPERTIES ##
+    
+    @property
+    def cache_preamble(self):
+        '''
+        Gets/sets whether waveform preambles are cached between reads of
+        the same data source.
+        
+        :type: `bool`
+        '''
+        return getattr(self, '_cache_preamble', False)
+    @cache_preamble.setter
+    def cache_preamble(self, newval):
+        self._cache_preamble = bool(newval)
+        self.invalidate_preamble()
+        
+    ## METHODS ##
+    
+    def invalidate_preamble(self):
+        '''
+        Discards all cached waveform preambles, such that they are queried
+        again on the next read of each data source.
+        '''
+        self._preamble_cache = {}
+        
+    def reset(self):
+        super(PreambleCacheMixin, self).reset()
+        self.invalidate_preamble()
+        
+    def _waveform_preamble(self, source_name, fields):
+        '''
+        Returns the preamble values of a data source, querying them in a
+        single batch unless they are cached.
+        
+        :param str source_name: Name of the data source, used as the cache
+            key.
+        :param fields: Pairs ``(key, query)`` giving the preamble values to
+            be fetched, and the query returning each of them.
+        :return: Dictionary mapping each key to its value as a `float`.
+        :rtype: `dict`
+        '''
+        cache = getattr(self, '_preamble_cache', {})
+        if self.cache_preamble and source_name in cache:
+            return cache[source_name]
+            
+        with self.batch() as batch:
+            futures = [(key, batch.query(cmd, float)) for key, cmd in fields]
+        preamble = dict((key, future.result()) for key, future in futures)
+        
+        if self.cache_preamble:
+            cache[source_name] = preamble
+            self._preamble_cache = cache
+        return preamble
+        
+    def _set_encoding(self, encoding):
+        '''
+        Sets the data encoding for waveform transfers, invalidating cached
+        preambles if the encoding differs from that last set.
+        
+        :param str encoding: Encoding to be passed to ``DAT:ENC``.
+        '''
+        if encoding != getattr(self, '_encoding', None):
+            # Only the preambles depend on the encoding, so any other state
+            # cleared by invalidate_preamble is kept.
+            self._preamble_cache = {}
+            self._encoding = encoding
+        self.sendcmd('DAT:ENC {}'.format(encoding))
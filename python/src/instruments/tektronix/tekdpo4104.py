@@ -41,13 +41,30 @@ from instruments.abstract_instruments import (
     OscilloscopeChannel,
     OscilloscopeDataSource,
     Oscilloscope,
+    Waveform,
 )
 from instruments.generic_scpi import SCPIInstrument
+from instruments.tektronix._preamble import PreambleCacheMixin
 from instruments.util_fns import assume_units, ProxyList
 
 import struct
 import numpy as np
 
+## CONSTANTS ###################################################################
+
+# Preamble values used to scale waveforms. These refer to whichever data source
+# is currently selected.
+_DPO4104_PREAMBLE_FIELDS = [
+    ('yoffs', 'WFMP:YOF?'),
+    ('ymult', 'WFMP:YMU?'),
+    ('yzero', 'WFMP:YZE?'),
+    ('xzero', 'WFMP:XZE?'),
+    ('xincr', 'WFMP:XIN?'),
+]
+
+# Value of DAT:STOP used to transfer the whole record.
+_DPO4104_FULL_RECORD = 10**7
+
 ## FUNCTIONS ###################################################################
 
 def _parent_property(prop_name, doc=""):
@@ -110,6 +127,32 @@ class _TekDPO4104DataSource(OscilloscopeDataSource):
             return NotImplemented
         else:
             return other.name == self.name
+            
+    @contextmanager
+    def _full_record(self):
+        '''
+        Context manager that sets the data range to cover the whole record
+        within its block. The preamble values used for scaling do not depend
+        on where the range stops, so cached preambles are kept.
+        
+        While preambles are cached, the range last read from the oscilloscope
+        is remembered too, and is only queried again once the cache is
+        invalidated.
+        '''
+        dat_stop = None
+        if self._tek.cache_preamble:
+            dat_stop = getattr(self._tek, '_dat_stop', None)
+        if dat_stop is None:
+            dat_stop = int(self._tek.query('DAT:STOP?'))
+            self._tek._dat_stop = dat_stop
+        changed = dat_stop != _DPO4104_FULL_RECORD
+        if changed:
+            self._tek.sendcmd('DAT:STOP {}'.format(_DPO4104_FULL_RECORD))
+        try:
+            yield
+        finally:
+            if changed:
+                self._tek.sendcmd('DAT:STOP {}'.format(dat_stop))
                
     def read_waveform(self, bin_format=True):
         '''
@@ -118,53 +161,93 @@ class _TekDPO4104DataSource(OscilloscopeDataSource):
         oscilloscope, it unpacks the data and scales it accordingly.
         Supports both ASCII and binary waveform transfer.
         
-        Function returns a tuple (x,y), where both x and y are numpy arrays.
+        Function returns a `~instruments.abstract_instruments.Waveform`,
+        which can be unpacked into a tuple (x,y) of numpy arrays.
 
         :param bool bin_format: If `True`, data is transfered
             in a binary format. Otherwise, data is transferred in ASCII.
+        
+        :rtype: `~instruments.abstract_instruments.Waveform`
         '''
 
         # Set the acquisition channel
-        with self:
-
-            # TODO: move this out somewhere more appropriate.
-            old_dat_stop = self._tek.query('DAT:STOP?')
-            self._tek.sendcmd('DAT:STOP {}'.format(10**7))
+        with self, self._full_record():
             
             if not bin_format:
-                self._tek.sendcmd('DAT:ENC ASCI') # Set data encoding format 
-                                                  # to ASCII
+                self._tek._set_encoding('ASCI') # Set data encoding format to
+                                                # ASCII
                 sleep(0.02) # Work around issue with 2.48 firmware.
                 raw = self._tek.query('CURVE?')
                 raw = raw.split(",") # Break up comma delimited string
                 raw = map(float, raw) # Convert each list element to int
                 raw = np.array(raw) # Convert into numpy array
             else:
-                self._tek.sendcmd('DAT:ENC RIB') # Set encoding to signed, 
-                                                 # big-endian
+                self._tek._set_encoding('RIB') # Set encoding to signed,
+                                               # big-endian
                 sleep(0.02) # Work around issue with 2.48 firmware.
                 data_width = self._tek.data_width
-                self._tek.sendcmd('CURVE?')
-                raw = self._tek.binblockread(data_width) # Read in the binary 
-                                                         # block, data width of
-                                                         # 2 bytes.
+                with self._tek.exclusive():
+                    self._tek.sendcmd('CURVE?')
+                    # Read in the binary block, data width of 2 bytes.
+                    raw = self._tek.binblockread(data_width)
 
-            yoffs = self._tek.y_offset # Retrieve Y offset
-            ymult = self._tek.query('WFMP:YMU?') # Retrieve Y multiplier
-            yzero = self._tek.query('WFMP:YZE?') # Retrieve Y zero
+            # Retrieve the scaling of the waveform in one round trip, unless
+            # it has been cached.
+            preamble = self._tek._waveform_preamble(self.name,
+                                                    _DPO4104_PREAMBLE_FIELDS)
             
-            y = ((raw - yoffs) * float(ymult)) + float(yzero)
+            return Waveform(raw,
+                yoffs=preamble['yoffs'], ymult=preamble['ymult'],
+                yzero=preamble['yzero'], xincr=preamble['xincr'],
+                xzero=preamble['xzero']
+            )
             
-            xzero = self._tek.query('WFMP:XZE?')  # Retrieve X zero
-            xincr = self._tek.query('WFMP:XIN?')  # Retrieve X incr
-            ptcnt = self._tek.query('WFMP:NR_P?') # Retrieve number of 
-                                                  # data points
+    def stream_waveform(self, dest, scaled=True):
+        '''
+        Streams the waveform from the oscilloscope to ``dest`` in binary
+        chunks, without holding the whole record in memory. Unless
+        ``scaled`` is `False`, each chunk is scaled as it arrives.
+        
+        Function returns a tuple ``(n_points, xzero, xincr)``, from which the
+        x values of the data points can be found as
+        ``xzero + xincr * np.arange(n_points)``.
+        
+        :param dest: Destination for the y values of the waveform, such as a
+            `numpy.memmap` or file.
+        :type dest: `str` giving a file name, `file`, or `numpy.ndarray`
+        :param bool scaled: If `True`, the y values are scaled in the same
+            way as by `read_waveform`. Otherwise, the raw data is stored.
             
-            x = np.arange(float(ptcnt)) * float(xincr) + float(xzero)
-
-            self._tek.sendcmd('DAT:STOP {}'.format(old_dat_stop))
+        :rtype: `tuple` of (`int`, `float`, `float`)
+        
+        .. seealso::
+            `~instruments.Instrument.binblockread_to` for how the data is
+            stored into ``dest``.
+        '''
+        with self, self._full_record():
+            self._tek._set_encoding('RIB')
+            sleep(0.02) # Work around issue with 2.48 firmware.
+            data_width = self._tek.data_width
             
-            return x, y
+            # The scaling has to be known before the transfer starts, so that
+            # it can be applied to each chunk as it arrives.
+            preamble = self._tek._waveform_preamble(self.name,
+                                                    _DPO4104_PREAMBLE_FIELDS)
+            if scaled:
+                def transform(raw):
+                    return (
+                        (raw - preamble['yoffs']) * preamble['ymult']
+                    ) + preamble['yzero']
+            else:
+                transform = None
+                
+            with self._tek.exclusive():
+                self._tek.sendcmd('CURVE?')
+                n_points = self._tek.binblockread_to(
+                    dest, data_width, transform=transform
+                )
+            
+            return n_points, preamble['xzero'], preamble['xincr']
             
     y_offset = _parent_property('y_offset')
     
@@ -202,7 +285,7 @@ class _TekDPO4104Channel(_TekDPO4104DataSource, OscilloscopeChannel):
 
         self._tek.sendcmd("CH{}:COUPL {}".format(self._idx, newval.value))
 
-class TekDPO4104(SCPIInstrument, Oscilloscope):
+class TekDPO4104(PreambleCacheMixin, SCPIInstrument, Oscilloscope):
     '''
     The Tektronix DPO4104 is a multi-channel oscilloscope with analog 
     bandwidths ranging from 100MHz to 1GHz.
@@ -294,6 +377,7 @@ class TekDPO4104(SCPIInstrument, Oscilloscope):
     @aquisition_length.setter
     def aquisition_length(self, newval):
         self.sendcmd("HOR:RECO {}".format(newval))
+        self.invalidate_preamble()
 
     @property
     def aquisition_running(self):
@@ -331,6 +415,7 @@ class TekDPO4104(SCPIInstrument, Oscilloscope):
             raise ValueError("Only one or two byte-width is supported.")
         
         self.sendcmd("DATA:WIDTH {}".format(newval))
+        self.invalidate_preamble()
     
     # TODO: convert to read in unitful quantities.
     @property
@@ -343,10 +428,19 @@ class TekDPO4104(SCPIInstrument, Oscilloscope):
     @y_offset.setter
     def y_offset(self, newval):
         self.sendcmd("WFMP:YOF {}".format(newval))
+        self.invalidate_preamble()
     
 
     ## METHODS ##
     
+    def invalidate_preamble(self):
+        '''
+        Discards all cached waveform preambles, along with the data range
+        last read from the oscilloscope.
+        '''
+        super(TekDPO4104, self).invalidate_preamble()
+        self._dat_stop = None
+        
     def force_trigger(self):
         """
         Forces a trigger event to occur on the attached oscilloscope.
@@ -31,10 +31,12 @@ from __future__ import division
 import abc
 import time
 
+import numpy as np
+
 from flufl.enum import Enum
 
 from instruments.abstract_instruments import (
-    Oscilloscope, OscilloscopeChannel, OscilloscopeDataSource
+    Oscilloscope, OscilloscopeChannel, OscilloscopeDataSource, Waveform
 )
 from instruments.generic_scpi import SCPIInstrument
 from instruments.util_fns import *
@@ -133,7 +135,21 @@ class TekDPO70000Series(SCPIInstrument, Oscilloscope):
             Takes the int16 data and figures out how to make it unitful.
             '''
             
+        def _affine_scaling(self):
+            # The scaling is affine, so find its gain and offset once from the
+            # raw values 0 and 1, rather than querying the scale and position
+            # for every use. The gain and offset are plain magnitudes, in the
+            # returned units of the waveform.
+            scaled = pq.Quantity(self._scale_raw_data(np.array([0, 1])))
+            offset, one = scaled.magnitude
+            return one - offset, offset, scaled.units
+            
         def read_waveform(self):
+            '''
+            Reads the waveform from this data source in binary.
+            
+            :rtype: `~instruments.abstract_instruments.Waveform`
+            '''
             # We want to get the data back in binary, as it's just too much
             # otherwise.
             with self:
@@ -144,16 +160,70 @@ class TekDPO70000Series(SCPIInstrument, Oscilloscope):
                     self._parent.outgoing_byte_order,
                     n_bytes
                 )
-                self._parent.sendcmd("CURV?")
-                raw = self._parent.binblockread(n_bytes, fmt=dtype)
-                # Clear the queue by trying to read.
-                # FIXME: this is a hack-y way of doing so.
-                if hasattr(self._parent._file, 'flush_input'):
-                    self._parent._file.flush_input()
-                else:
-                    self._parent._file.readline()
+                with self._parent.batch() as batch:
+                    xincr = batch.query("WFMO:XIN?", float)
+                    xzero = batch.query("WFMO:XZE?", float)
+                with self._parent.exclusive():
+                    self._parent.sendcmd("CURV?")
+                    raw = self._parent.binblockread(n_bytes, fmt=dtype)
+                    # Clear the queue by trying to read.
+                    # FIXME: this is a hack-y way of doing so.
+                    if hasattr(self._parent._file, 'flush_input'):
+                        self._parent._file.flush_input()
+                    else:
+                        self._parent._file.readline()
+                
+                gain, offset, units = self._affine_scaling()
+                return Waveform(raw, ymult=gain, yzero=offset,
+                    xincr=xincr.result(), xzero=xzero.result(), y_units=units)
                 
-                return self._scale_raw_data(raw)
+        def stream_waveform(self, dest, scaled=True):
+            '''
+            Streams the waveform from the oscilloscope to ``dest`` in binary
+            chunks, without holding the whole record in memory. Unless
+            ``scaled`` is `False`, each chunk is scaled as it arrives, in the
+            same way as by `read_waveform`.
+            
+            :param dest: Destination for the waveform, such as a
+                `numpy.memmap` or file.
+            :type dest: `str` giving a file name, `file`, or `numpy.ndarray`
+            :param bool scaled: If `False`, the raw data is stored instead
+                of the scaled waveform.
+            :return: Number of points in the waveform.
+            :rtype: `int`
+            
+            .. seealso::
+                `~instruments.Instrument.binblockread_to` for how the data is
+                stored into ``dest``.
+            '''
+            with self:
+                self._parent.select_fastest_encoding()
+                n_bytes = self._parent.outgoing_n_bytes
+                dtype = self._parent._dtype(
+                    self._parent.outgoing_binary_format,
+                    self._parent.outgoing_byte_order,
+                    n_bytes
+                )
+                if scaled:
+                    # The stored values are plain magnitudes, in the units of
+                    # the waveform.
+                    gain, offset, _ = self._affine_scaling()
+                    def transform(raw):
+                        return raw * gain + offset
+                else:
+                    transform = None
+                    
+                with self._parent.exclusive():
+                    self._parent.sendcmd("CURV?")
+                    n_points = self._parent.binblockread_to(
+                        dest, n_bytes, fmt=dtype, transform=transform
+                    )
+                    if hasattr(self._parent._file, 'flush_input'):
+                        self._parent._file.flush_input()
+                    else:
+                        self._parent._file.readline()
+                    
+                return n_points
                 
         def __enter__(self):
             self._old_dsrc = self._parent.data_source
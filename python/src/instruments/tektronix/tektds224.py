@@ -38,8 +38,10 @@ from instruments.abstract_instruments import (
     OscilloscopeChannel,
     OscilloscopeDataSource,
     Oscilloscope,
+    Waveform,
 )
 from instruments.generic_scpi import SCPIInstrument
+from instruments.tektronix._preamble import PreambleCacheMixin
 from instruments.util_fns import assume_units, ProxyList
 
 ## CLASSES #####################################################################
@@ -97,44 +99,47 @@ class _TekTDS224DataSource(OscilloscopeDataSource):
         binary, and 7 seconds for ASCII over Galvant Industries' GPIBUSB 
         adapter.
         
-        Function returns a tuple (x,y), where both x and y are numpy arrays.
+        Function returns a `~instruments.abstract_instruments.Waveform`,
+        which can be unpacked into a tuple (x,y) of numpy arrays.
         
         :param bool bin_format: If `True`, data is transfered
             in a binary format. Otherwise, data is transferred in ASCII.
         
-        :rtype: two item `tuple` of `numpy.ndarray`
+        :rtype: `~instruments.abstract_instruments.Waveform`
         '''
         with self:
             
             if not bin_format:
-                self._tek.sendcmd('DAT:ENC ASCI') # Set the data encoding format to ASCII
+                self._tek._set_encoding('ASCI') # Set the data encoding format to ASCII
                 raw = self._tek.query('CURVE?')
                 raw = raw.split(',') # Break up comma delimited string
                 raw = map(float, raw) # Convert each list element to int
-                raw = array(raw) # Convert into numpy array
+                raw = np.array(raw) # Convert into numpy array
             else:
-                self._tek.sendcmd('DAT:ENC RIB') # Set encoding to signed, big-endian
+                self._tek._set_encoding('RIB') # Set encoding to signed, big-endian
                 data_width = self._tek.data_width
-                self._tek.sendcmd('CURVE?')
-                raw = self._tek.binblockread(data_width) # Read in the binary block, 
-                                                    # data width of 2 bytes
+                with self._tek.exclusive():
+                    self._tek.sendcmd('CURVE?')
+                    # Read in the binary block, data width of 2 bytes
+                    raw = self._tek.binblockread(data_width)
 
-                self._tek._file.flush_input() # Flush input buffer
+                    self._tek._file.flush_input() # Flush input buffer
             
-            yoffs = self._tek.query('WFMP:{}:YOF?'.format(self.name)) # Retrieve Y offset
-            ymult = self._tek.query('WFMP:{}:YMU?'.format(self.name)) # Retrieve Y multiply
-            yzero = self._tek.query('WFMP:{}:YZE?'.format(self.name)) # Retrieve Y zero
+            # Retrieve the scaling of the waveform in one round trip, unless
+            # it has been cached.
+            preamble = self._tek._waveform_preamble(self.name, [
+                ('yoffs', 'WFMP:{}:YOF?'.format(self.name)),
+                ('ymult', 'WFMP:{}:YMU?'.format(self.name)),
+                ('yzero', 'WFMP:{}:YZE?'.format(self.name)),
+                ('xzero', 'WFMP:XZE?'),
+                ('xincr', 'WFMP:XIN?'),
+            ])
             
-            y = ((raw - float(yoffs)) * float(ymult)) + float(yzero)
-            
-            xzero = self._tek.query('WFMP:XZE?') # Retrieve X zero
-            xincr = self._tek.query('WFMP:XIN?') # Retrieve X incr
-            ptcnt = self._tek.query('WFMP:{}:NR_P?'.format(self.name)) # Retrieve number 
-                                                                  # of data points
-            
-            x = np.arange(float(ptcnt)) * float(xincr) + float(xzero)
-            
-            return (x,y)
+            return Waveform(raw,
+                yoffs=preamble['yoffs'], ymult=preamble['ymult'],
+                yzero=preamble['yzero'], xincr=preamble['xincr'],
+                xzero=preamble['xzero']
+            )
             
 class _TekTDS224Channel(_TekTDS224DataSource, OscilloscopeChannel):
     '''
@@ -169,7 +174,7 @@ class _TekTDS224Channel(_TekTDS224DataSource, OscilloscopeChannel):
 
         self._tek.sendcmd("CH{}:COUPL {}".format(self._idx, newval.value))
         
-class TekTDS224(SCPIInstrument, Oscilloscope):
+class TekTDS224(PreambleCacheMixin, SCPIInstrument, Oscilloscope):
 
     ## ENUMS ##
     
@@ -251,6 +256,7 @@ class TekTDS224(SCPIInstrument, Oscilloscope):
             raise ValueError("Only one or two byte-width is supported.")
         
         self.sendcmd("DATA:WIDTH {}".format(newval))
+        self.invalidate_preamble()
 
     @property
     def force_trigger(self):
@@ -45,8 +45,10 @@ from instruments.abstract_instruments import (
     OscilloscopeChannel,
     OscilloscopeDataSource,
     Oscilloscope,
+    Waveform,
 )
 from instruments.generic_scpi import SCPIInstrument
+from instruments.tektronix._preamble import PreambleCacheMixin
 from instruments.util_fns import ProxyList
 
 ## HELPERS #####################################################################
@@ -285,50 +287,47 @@ class _TekTDS5xxDataSource(OscilloscopeDataSource):
         binary, and 7 seconds for ASCII over Galvant Industries' GPIBUSB 
         adapter.
         
-        Function returns a tuple (x,y), where both x and y are numpy arrays.
+        Function returns a `~instruments.abstract_instruments.Waveform`,
+        which can be unpacked into a tuple (x,y) of numpy arrays.
         
         :param bool bin_format: If `True`, data is transfered
             in a binary format. Otherwise, data is transferred in ASCII.
         
-        :rtype: two item `tuple` of `numpy.ndarray`
+        :rtype: `~instruments.abstract_instruments.Waveform`
         """
         with self:
             
             if not bin_format:
                 # Set the data encoding format to ASCII
-                self._tek.sendcmd('DAT:ENC ASCI')
+                self._tek._set_encoding('ASCI')
                 raw = self._tek.query('CURVE?')
                 raw = raw.split(',') # Break up comma delimited string
                 raw = map(float, raw) # Convert each list element to int
                 raw = np.array(raw) # Convert into numpy array
             else:
                 # Set encoding to signed, big-endian
-                self._tek.sendcmd('DAT:ENC RIB')
+                self._tek._set_encoding('RIB')
                 data_width = self._tek.data_width
-                self._tek.sendcmd('CURVE?')
-                # Read in the binary block, data width of 2 bytes
-                raw = self._tek.binblockread(data_width)
+                with self._tek.exclusive():
+                    self._tek.sendcmd('CURVE?')
+                    # Read in the binary block, data width of 2 bytes
+                    raw = self._tek.binblockread(data_width)
 
-                self._tek._file.flush_input() # Flush input buffer
+                    self._tek._file.flush_input() # Flush input buffer
             
-            # Retrieve Y offset
-            yoffs = self._tek.query('WFMP:{}:YOF?'.format(self.name))
-            # Retrieve Y multiply
-            ymult = self._tek.query('WFMP:{}:YMU?'.format(self.name))
-            # Retrieve Y zero
-            yzero = self._tek.query('WFMP:{}:YZE?'.format(self.name))
+            # Retrieve the scaling of the waveform in one round trip, unless
+            # it has been cached.
+            preamble = self._tek._waveform_preamble(self.name, [
+                ('yoffs', 'WFMP:{}:YOF?'.format(self.name)),
+                ('ymult', 'WFMP:{}:YMU?'.format(self.name)),
+                ('yzero', 'WFMP:{}:YZE?'.format(self.name)),
+                ('xincr', 'WFMP:{}:XIN?'.format(self.name)),
+            ])
             
-            y = ((raw - float(yoffs)) * float(ymult)) + float(yzero)
-            
-            # Retrieve X incr
-            xincr = self._tek.query('WFMP:{}:XIN?'.format(self.name))
-            # Retrieve number of data points
-            ptcnt = self._tek.query('WFMP:{}:NR_P?'.format(self.name))  
-            
-            x = np.arange(float(ptcnt)) * float(xincr)
-            
-            
-            return (x, y)
+            return Waveform(raw,
+                yoffs=preamble['yoffs'], ymult=preamble['ymult'],
+                yzero=preamble['yzero'], xincr=preamble['xincr']
+            )
             
 class _TekTDS5xxChannel(_TekTDS5xxDataSource, OscilloscopeChannel):
     """
@@ -422,13 +421,14 @@ class _TekTDS5xxChannel(_TekTDS5xxDataSource, OscilloscopeChannel):
     @scale.setter
     def scale(self, newval):
         self._tek.sendcmd("CH{0}:SCA {1:.3E}".format(self._idx, newval))
+        self._tek.invalidate_preamble()
         resp = float(self._tek.query("CH{}:SCA?".format(self._idx)))
         if newval != resp:
             raise ValueError("Tried to set CH{0} Scale to {1} but got {2}"
                 " instead".format(self._idx, newval, resp))
         
         
-class TekTDS5xx(SCPIInstrument, Oscilloscope):
+class TekTDS5xx(PreambleCacheMixin, SCPIInstrument, Oscilloscope):
     """
     Support for the TDS5xx series of oscilloscopes
      Implemented from:
@@ -652,6 +652,7 @@ class TekTDS5xx(SCPIInstrument, Oscilloscope):
             raise ValueError("Only one or two byte-width is supported.")
         
         self.sendcmd("DATA:WIDTH {}".format(newval))
+        self.invalidate_preamble()
 
     @property
     def force_trigger(self):
@@ -669,6 +670,7 @@ class TekTDS5xx(SCPIInstrument, Oscilloscope):
     @horizontal_scale.setter
     def horizontal_scale(self, newval):
         self.sendcmd("HOR:MAI:SCA {0:.3E}".format(newval))
+        self.invalidate_preamble()
         resp = float(self.query('HOR:MAI:SCA?'))
         if newval != resp:
             raise ValueError("Tried to set Horizontal Scale to {} but got {}"
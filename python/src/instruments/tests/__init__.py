@@ -26,11 +26,64 @@
 
 import contextlib
 import cStringIO as StringIO
+import socket
 
+import serial
 from nose.tools import nottest, eq_
 
+## CLASSES ####################################################################
+
+class MockSerial(serial.Serial):
+    """
+    Unopened `serial.Serial` whose input buffer is a string supplied by the
+    test, so that `SerialWrapper` can be exercised without a port. Records
+    what is written to it, the timeouts it is given after being created, and
+    the number of reads made from it.
+    """
+    def __init__(self, data):
+        # The base class sets the timeout while being initialized.
+        self.timeouts = []
+        super(MockSerial, self).__init__()
+        self.timeouts = []
+        self._data = data
+        self.n_reads = 0
+        self.written = StringIO.StringIO()
+    
+    @property
+    def timeout(self):
+        return self._timeout
+    @timeout.setter
+    def timeout(self, newval):
+        self.timeouts.append(newval)
+        self._timeout = newval
+    
+    def inWaiting(self):
+        return len(self._data)
+        
+    def read(self, size=1):
+        self.n_reads += 1
+        result, self._data = self._data[:size], self._data[size:]
+        return result
+        
+    def write(self, data):
+        self.written.write(data)
+
 ## FUNCTIONS ##################################################################
 
+def tcp_pair():
+    """
+    Returns a pair of connected TCP sockets on the loopback interface, the
+    first of which is used by the host and the second by the "instrument."
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    host = socket.create_connection(listener.getsockname())
+    ins, _ = listener.accept()
+    listener.close()
+    return host, ins
+    
+
 @contextlib.contextmanager
 def expected_protocol(ins_class, host_to_ins, ins_to_host):
     """
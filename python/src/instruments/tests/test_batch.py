@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# test_batch.py: Tests batching of queries.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+## IMPORTS ####################################################################
+
+from cStringIO import StringIO
+
+from nose.tools import raises, eq_
+
+import instruments as ik
+from instruments.abstract_instruments.gi_gpib import GPIBWrapper
+from instruments.abstract_instruments.loopback_wrapper import LoopbackWrapper
+from instruments.tests import expected_protocol
+
+## TEST CASES #################################################################
+
+def test_scpi_batch_joined():
+    with expected_protocol(
+        ik.generic_scpi.SCPIInstrument,
+        "VOLT?;:CURR?;:OUTP?\n",
+        "1.5;0.25;ON\n"
+    ) as inst:
+        with inst.batch() as batch:
+            volts = batch.query("VOLT?", float)
+            amps = batch.query("CURR?", float)
+            output = batch.query("OUTP?")
+            assert not volts.done()
+        eq_(volts.result(), 1.5)
+        eq_(amps.result(), 0.25)
+        eq_(output.result(), "ON")
+
+@raises(RuntimeError)
+def test_batch_result_before_execute():
+    with expected_protocol(ik.generic_scpi.SCPIInstrument, "", "") as inst:
+        batch = inst.batch()
+        batch.query("VOLT?").result()
+
+@raises(IOError)
+def test_scpi_batch_response_count():
+    with expected_protocol(
+        ik.generic_scpi.SCPIInstrument,
+        "VOLT?;:CURR?\n",
+        "1.5\n"
+    ) as inst:
+        with inst.batch() as batch:
+            batch.query("VOLT?")
+            batch.query("CURR?")
+
+def test_batch_gpib_sequential():
+    # Reads through the GI GPIB adapter must be prompted with +read, so the
+    # queries cannot be pipelined.
+    stdout = StringIO()
+    wrapper = GPIBWrapper(LoopbackWrapper(StringIO("1\r2\r"), stdout), 1)
+    wrapper.pacing = 0
+    inst = ik.Instrument(wrapper)
+    with inst.batch() as batch:
+        first = batch.query("getLog.xy A, first")
+        second = batch.query("getLog.xy A, next")
+    eq_(first.result(), "1")
+    eq_(second.result(), "2")
+    eq_(stdout.getvalue(),
+        "+a:1\r+eoi:1\r+strip:0\rgetLog.xy A, first\r+read\r"
+        "getLog.xy A, next\r+read\r"
+    )
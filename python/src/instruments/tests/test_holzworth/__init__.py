@@ -0,0 +1,54 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# __init__.py: Tests for Holzworth-brand instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+## IMPORTS ####################################################################
+
+import instruments as ik
+from instruments.tests import expected_protocol
+
+import quantities as pq
+
+## TESTS ######################################################################
+
+def test_holzworthhs9000_bounds_cache():
+    with expected_protocol(
+        ik.holzworth.HolzworthHS9000,
+        ":ATTACH?\n"
+        ":CH1:FREQ:MIN?\n:CH1:FREQ:MAX?\n"
+        ":CH1:FREQ:1.0 GHz\n"
+        ":CH1:FREQ:2.0 GHz\n"
+        ":CH1:FREQ:3.0 GHz\n"
+        ":CH1:*RST\n"
+        ":CH1:FREQ:MIN?\n:CH1:FREQ:MAX?\n"
+        ":CH1:FREQ:4.0 GHz\n",
+        ":CH1:CH2\n"
+        "100 MHz\n6 GHz\n"
+        "100 MHz\n6 GHz\n"
+    ) as hs:
+        channel = hs.channel[0]
+        channel.freq = 1 * pq.GHz
+        channel.sweep(freq=[2, 3] * pq.GHz)
+        channel.reset()
+        channel.freq = 4 * pq.GHz
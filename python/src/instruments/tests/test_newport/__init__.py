@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# __init__.py: Tests for Newport-brand instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+## IMPORTS ####################################################################
+
+from nose.tools import raises, eq_
+
+import quantities as pq
+
+import instruments as ik
+from instruments.abstract_instruments.serialwrapper import SerialWrapper
+from instruments.tests import expected_protocol, MockSerial
+
+## TESTS ######################################################################
+
+def test_newportesp301_immediate_error_check():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1VA2.0\rTB?\r",
+        "0, 451, NO ERROR DETECTED\r"
+    ) as esp:
+        esp._newport_cmd("VA", target=1, params=[2.0])
+
+def test_newportesp301_deferred_error_check():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1VA2.0\r2AC10\r3DC10\rTB?\rTB?\r",
+        "207, 1200, PARAMETER OUT OF RANGE\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        try:
+            with esp.deferred_error_check():
+                esp._newport_cmd("VA", target=1, params=[2.0])
+                esp._newport_cmd("AC", target=2, params=[10])
+                esp._newport_cmd("DC", target=3, params=[10])
+        except ik.newport.NewportError as e:
+            eq_(e.axis, 2)
+            eq_(e.errcode, 7)
+            eq_(e.command, "2AC10")
+            eq_(e.other_errors, [])
+        else:
+            assert False, "Expected a NewportError."
+        eq_(esp.error_check, ik.newport.NewportESP301ErrorCheck.immediate)
+
+def test_newportesp301_periodic_error_check():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1VA2.0\r1AC10\rTB?\r",
+        "0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        esp.error_check = 'periodic'
+        esp.error_check_interval = 3600
+        esp._newport_cmd("VA", target=1, params=[2.0])
+        esp.error_check_interval = 0
+        esp._newport_cmd("AC", target=1, params=[10])
+
+def test_newportesp301_axis_get_status():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "1SN? ; 1TP? ; 1DP? ; 1DV? ; 1MD?\rTB?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2,1.5,2.0,0.25,1\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        status = esp.axis[0].get_status()
+        eq_(status['units'], pq.mm)
+        eq_(status['position'], 1.5 * pq.mm)
+        eq_(status['desired_position'], 2 * pq.mm)
+        eq_(status['desired_velocity'], 0.25 * pq.mm / pq.s)
+        eq_(status['is_motion_done'], True)
+
+def test_newportesp301_get_status_split():
+    # Fifteen queries are too long for a single line, so they are split into
+    # two, each answered by a line of its own.
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "2SN?\rTB?\r"
+        "3SN?\rTB?\r"
+        "1SN? ; 1TP? ; 1DP? ; 1DV? ; 1MD? ; 2SN? ; 2TP? ; 2DP? ; 2DV? ; "
+        "2MD? ; 3SN?\rTB?\r"
+        "3TP? ; 3DP? ; 3DV? ; 3MD?\rTB?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2,1.5,2.0,0.25,1,2,0.5,0.5,0,1,2\r0, 0, NO ERROR DETECTED\r"
+        "3.0,4.0,0.5,0\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        axes = [esp.axis[idx] for idx in xrange(3)]
+        status = esp.get_status(axes)
+        eq_([axis_status['position'] for axis_status in status],
+            [1.5 * pq.mm, 0.5 * pq.mm, 3 * pq.mm])
+        eq_([axis_status['is_motion_done'] for axis_status in status],
+            [True, True, False])
+        eq_(status[2]['desired_velocity'], 0.5 * pq.mm / pq.s)
+
+def test_newportesp301_move_axes():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "2SN?\rTB?\r"
+        "1TP? ; 1VA? ; 1PA1.0 ; 2TP? ; 2VA? ; 2PA2.0\rTB?\r"
+        "1MD? ; 1TP? ; 2MD? ; 2TP?\r"
+        "1MD? ; 1TP?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "0,1,0,2\r0, 0, NO ERROR DETECTED\r"
+        "0,0.99,1,2.0\r"
+        "1,1.0\r"
+    ) as esp:
+        esp.move_axes({esp.axis[0]: 1 * pq.mm, esp.axis[1]: 2 * pq.mm})
+
+def test_newportesp301_move_axes_wait_for_stop():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "1PR0.5 ; 1WS ; 1MD?\rTB?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        esp.move_axes({0: 500 * pq.um}, absolute=False, wait_mode='stop')
+
+def test_newportesp301_axis_reused():
+    # Axes are only created, querying their setup, on first access.
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "1PR0.5 ; 1WS ; 1MD?\rTB?\r"
+        "1PR0.5 ; 1WS ; 1MD?\rTB?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        assert esp.axis[0] is esp.axis[0]
+        esp.move_axes({0: 500 * pq.um}, absolute=False, wait_mode='stop')
+        esp.move_axes({0: 500 * pq.um}, absolute=False, wait_mode='stop')
+
+def test_newportesp301_move_axes_serial_timeout():
+    conn = MockSerial(
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+    )
+    esp = ik.newport.NewportESP301(SerialWrapper(conn))
+    esp.timeout = 3
+    axis = esp.axis[0]
+    esp.move_axes({axis: 500 * pq.um}, absolute=False, wait_mode='stop')
+    esp.move_axes({axis: 500 * pq.um}, absolute=False, wait_mode='stop',
+        max_wait=250 * pq.ms)
+    # Without max_wait, the reply is waited for without limit, and fractional
+    # timeouts are not truncated.
+    eq_(conn.timeouts, [3, None, 3, 0.25, 3])
+    eq_(conn.written.getvalue(),
+        "1SN?\rTB?\r"
+        "1PR0.5 ; 1WS ; 1MD?\rTB?\r"
+        "1PR0.5 ; 1WS ; 1MD?\rTB?\r"
+    )
+
+def test_newportesp301_scan():
+    with expected_protocol(
+        ik.newport.NewportESP301,
+        "1SN?\rTB?\r"
+        "2SN?\rTB?\r"
+        "1XX\rTB?\r1EP\r"
+        "1PA0.0 ; 2PA0.0 ; 1WS ; 2WS ; SB1H ; WT1 ; SB0H\r"
+        "QP\rTB?\r"
+        "2XX\rTB?\r2EP\r"
+        "2PA0.5 ; 2WS ; SB1H ; WT1 ; SB0H ; 1PA1.0 ; 1WS ; SB1H ; WT1 ; SB0H\r"
+        "QP\rTB?\r"
+        "3XX\rTB?\r3EP\r"
+        "2PA0.0 ; 2WS ; SB1H ; WT1 ; SB0H\r"
+        "QP\rTB?\r"
+        "1EX ; 2EX ; 3EX ; 2MD?\rTB?\r"
+        "1SN? ; 1TP? ; 1DP? ; 1DV? ; 1MD? ; "
+        "2SN? ; 2TP? ; 2DP? ; 2DV? ; 2MD?\rTB?\r",
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "2\r0, 0, NO ERROR DETECTED\r"
+        "0, 0, NO ERROR DETECTED\r0, 0, NO ERROR DETECTED\r"
+        "0, 0, NO ERROR DETECTED\r0, 0, NO ERROR DETECTED\r"
+        "0, 0, NO ERROR DETECTED\r0, 0, NO ERROR DETECTED\r"
+        "1\r0, 0, NO ERROR DETECTED\r"
+        "2,1.0,1.0,0,1,2,0.0,0.0,0,1\r0, 0, NO ERROR DETECTED\r"
+    ) as esp:
+        axes = [esp.axis[0], esp.axis[1]]
+        scan = esp.define_scan(axes,
+            ik.newport.NewportESP301Scan.grid([0, 1], [0, 0.5]),
+            trigger=0x1, max_commands=10
+        )
+        eq_([program_id for program_id, _ in scan.programs], [1, 2, 3])
+        eq_(scan.programs[2][1], ["2PA0.0", "2WS", "SB1H", "WT1", "SB0H"])
+        status = scan.run()
+        eq_(status[0]['position'], 1 * pq.mm)
+        eq_(status[1]['position'], 0 * pq.mm)
@@ -25,9 +25,16 @@
 ## IMPORTS ####################################################################
 
 import instruments as ik
+from instruments.abstract_instruments.gi_gpib import GPIBWrapper
+from instruments.abstract_instruments.loopback_wrapper import LoopbackWrapper
 from instruments.tests import expected_protocol, make_name_test, unit_eq
 
+from nose.tools import eq_, raises
+
 import cStringIO as StringIO
+import struct
+
+import numpy as np
 import quantities as pq
 
 ## TESTS ######################################################################
@@ -56,3 +63,135 @@ def test_srsdg645_trigger_source():
         assert abs((t - pq.Quantity(42, 's')).magnitude) < 1e5
         ddg.channel['B'].delay = (ddg.channel['A'], pq.Quantity(1, "minute"))
 
+
+def test_srs830_read_data_buffer_ieee():
+    with expected_protocol(
+        ik.srs.SRS830,
+        "TRCB?1,4,3\n",
+        np.array([1.5, -2, 0.25], dtype='<f4').tostring()
+    ) as lia:
+        data = lia.read_data_buffer('ch1', start=4, count=3, fmt='ieee')
+        assert np.allclose(data, [1.5, -2, 0.25])
+        
+def test_srs830_read_data_buffer_compact():
+    # Points are encoded as mantissa * 2**(exponent - 124).
+    with expected_protocol(
+        ik.srs.SRS830,
+        "SPTS?\nTRCL?2,0,2\n",
+        "2\n" + struct.pack('<hBBhBB', 3, 124, 0, -5, 122, 0)
+    ) as lia:
+        data = lia.read_data_buffer(
+            ik.srs.SRS830.Mode.ch2, fmt=ik.srs.SRS830.BufferFormat.compact
+        )
+        assert np.allclose(data, [3, -1.25])
+        
+def test_srs830_read_data_buffer_gi_gpib():
+    # The adapter ends the binary response with a CR, which must not be taken
+    # as the response to the next query.
+    stdout = StringIO.StringIO()
+    wrapper = GPIBWrapper(LoopbackWrapper(StringIO.StringIO(
+        np.array([1.5, -2], dtype='<f4').tostring() + "\r" + "5\r"
+    ), stdout), 8)
+    wrapper.pacing = 0
+    lia = ik.srs.SRS830(wrapper)
+    data = lia.read_data_buffer('ch1', count=2, fmt='ieee')
+    assert np.allclose(data, [1.5, -2])
+    eq_(lia.num_data_points, 5)
+    eq_(stdout.getvalue(),
+        "+a:8\r+eoi:1\r+strip:0\rOUTX 1\rTRCB?1,0,2\rSPTS?\r")
+        
+def test_srs830_stream_data():
+    samples = np.array([[30000, -15000], [0, 3000], [-30000, 6000]],
+                       dtype='<i2')
+    with expected_protocol(
+        ik.srs.SRS830,
+        "SRAT?\nFAST 2\nSTRD\nPAUS\nFAST 0\nERRS? 5\n",
+        "13\n" + samples.tostring() + "0\n"
+    ) as lia:
+        with lia.stream_data(chunk_size=2, max_samples=3) as stream:
+            chunks = list(stream)
+        eq_([chunk.index for chunk in chunks], [0, 2])
+        x = np.concatenate([chunk.x for chunk in chunks])
+        y = np.concatenate([chunk.y for chunk in chunks])
+        t = np.concatenate([chunk.t for chunk in chunks])
+        assert np.allclose(x, [1, 0, -1])
+        assert np.allclose(y, [-0.5, 0.1, 0.2])
+        assert np.allclose(np.diff(t), 1 / 512.0)
+        
+@raises(TypeError)
+def test_srs830_stream_data_gi_gpib():
+    stdout = StringIO.StringIO()
+    wrapper = GPIBWrapper(LoopbackWrapper(StringIO.StringIO(), stdout), 8)
+    wrapper.pacing = 0
+    ik.srs.SRS830(wrapper).stream_data()
+        
+def test_srs830_take_measurement_incremental():
+    def block(*values):
+        return np.array(values, dtype='<f4').tostring()
+    with expected_protocol(
+        ik.srs.SRS830,
+        "REST\nSRAT 13\nSEND 0\nFAST 0\nSTRD\n"
+        "SPTS?\nTRCB?1,0,2\nTRCB?2,0,2\n"
+        "SPTS?\nPAUS\nTRCB?1,2,1\nTRCB?2,2,1\n",
+        "2\n" + block(1, 2) + block(-1, -2) +
+        "4\n" + block(3) + block(-3)
+    ) as lia:
+        data = lia.take_measurement(512, 3)
+        assert np.allclose(data, [[1, 2, 3], [-1, -2, -3]])
+
+def test_srs830_take_measurement_incremental_stalled():
+    with expected_protocol(
+        ik.srs.SRS830,
+        "REST\nSRAT 13\nSEND 0\nFAST 0\nSTRD\n" + "SPTS?\n" * 5 + "PAUS\n",
+        "0\n" * 5
+    ) as lia:
+        try:
+            lia.take_measurement(512, 3)
+        except IOError:
+            pass
+        else:
+            assert False, "Stalled measurement did not raise IOError."
+
+def test_srsctc100_get_log():
+    with expected_protocol(
+        ik.srs.SRSCTC100,
+        "getOutput.names?\ngeterror?\n"
+        "getOutput.units?\ngeterror?\n"
+        "getLog.xy? In 1\ngeterror?\n"
+        "getLog.xy In 1, 1\ngetLog.xy In 1, next\n"
+        "getLog.xy In 1, next\n"
+        "geterror?\n",
+        "In 1,Out 1\n0,No error\n"
+        "\xb0C,W\n0,No error\n"
+        "4\n0,No error\n"
+        "1000, 4.2\n2000, 4.3\n"
+        "3000, 4.4\n"
+        "0,No error\n"
+    ) as ctc:
+        ts, temps = ctc.channel['In 1'].get_log(start=1, chunk_size=2)
+        np.testing.assert_allclose(ts.rescale('ms').magnitude, [1000, 2000, 3000])
+        np.testing.assert_allclose(temps.magnitude, [4.2, 4.3, 4.4])
+        eq_(temps.units, pq.celsius)
+
+def test_srsctc100_channel_cache():
+    with expected_protocol(
+        ik.srs.SRSCTC100,
+        "getOutput.names?\ngeterror?\n"
+        "In1.value?\ngeterror?\n"
+        "getOutput.units?\ngeterror?\n"
+        "In1.value?\ngeterror?\n"
+        'In1.name = "Sample"\ngeterror?\n'
+        "getOutput.names?\ngeterror?\n",
+        "In 1,Out 1\n0,No error\n"
+        "4.2\n0,No error\n"
+        "\xb0C,W\n0,No error\n"
+        "4.3\n0,No error\n"
+        "0,No error\n"
+        "Sample,Out 1\n0,No error\n"
+    ) as ctc:
+        channel = ctc.channel['In 1']
+        unit_eq(channel.value, pq.Quantity(4.2, pq.celsius))
+        # Once the topology is known, a value costs a single query.
+        unit_eq(ctc.channel['In 1'].value, pq.Quantity(4.3, pq.celsius))
+        channel.name = "Sample"
+        eq_(ctc.channel['Sample'].name, "Sample")
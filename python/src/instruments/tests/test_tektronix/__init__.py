@@ -0,0 +1,159 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# __init__.py: Tests for Tektronix-brand instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+## IMPORTS ####################################################################
+
+from nose.tools import eq_
+
+import instruments as ik
+from instruments.tests import expected_protocol
+
+import numpy as np
+
+## TESTS ######################################################################
+
+def test_tektds5xx_preamble_cache():
+    with expected_protocol(
+        ik.tektronix.TekTDS5xx,
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:ENC ASCI\n"
+        "CURVE?\n"
+        "WFMP:CH1:YOF?;:WFMP:CH1:YMU?;:WFMP:CH1:YZE?;"
+        ":WFMP:CH1:XIN?\n"
+        "DAT:SOU CH1\n"
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:ENC ASCI\n"
+        "CURVE?\n"
+        "DAT:SOU CH1\n"
+        "DATA:WIDTH 2\n"
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:ENC ASCI\n"
+        "CURVE?\n"
+        "WFMP:CH1:YOF?;:WFMP:CH1:YMU?;:WFMP:CH1:YZE?;"
+        ":WFMP:CH1:XIN?\n"
+        "DAT:SOU CH1\n",
+        "CH1\n"
+        "1,2,3\n"
+        "1;0.5;0;1e-3\n"
+        "CH1\n"
+        "3,2,1\n"
+        "CH1\n"
+        "5,5,5\n"
+        "0;1;0;1e-3\n"
+    ) as tek:
+        tek.cache_preamble = True
+        x, y = tek.channel[0].read_waveform(bin_format=False)
+        assert np.allclose(x, [0, 1e-3, 2e-3])
+        assert np.allclose(y, [0, 0.5, 1])
+        
+        x, y = tek.channel[0].read_waveform(bin_format=False)
+        assert np.allclose(y, [1, 0.5, 0])
+        
+        tek.data_width = 2
+        x, y = tek.channel[0].read_waveform(bin_format=False)
+        assert np.allclose(y, [5, 5, 5])
+
+def test_tekdpo4104_stream_waveform_preamble_cache():
+    preamble = (
+        "WFMP:YOF?;:WFMP:YMU?;:WFMP:YZE?;"
+        ":WFMP:XZE?;:WFMP:XIN?\n"
+    )
+    block = "#13" + np.array([0, 1, 2], dtype='>i1').tostring()
+    with expected_protocol(
+        ik.tektronix.TekDPO4104,
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:STOP?\n"
+        "DAT:ENC ASCI\n"
+        "CURVE?\n" + preamble +
+        "DAT:SOU CH1\n"
+        # Changing the encoding invalidates the preamble read in ASCII, but
+        # the data range is remembered.
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:ENC RIB\n"
+        "DATA:WIDTH?\n" + preamble +
+        "CURVE?\n"
+        "DAT:SOU CH1\n"
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:ENC RIB\n"
+        "DATA:WIDTH?\n"
+        "CURVE?\n"
+        "DAT:SOU CH1\n"
+        # After invalidating, the range is read again, and is set to the
+        # full record and back around each transfer.
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:STOP?\n"
+        "DAT:STOP 10000000\n"
+        "DAT:ENC RIB\n"
+        "DATA:WIDTH?\n" + preamble +
+        "CURVE?\n"
+        "DAT:STOP 1000\n"
+        "DAT:SOU CH1\n"
+        "DAT:SOU?\n"
+        "DAT:SOU CH1\n"
+        "DAT:STOP 10000000\n"
+        "DAT:ENC RIB\n"
+        "DATA:WIDTH?\n"
+        "CURVE?\n"
+        "DAT:STOP 1000\n"
+        "DAT:SOU CH1\n",
+        "CH1\n"
+        "10000000\n"
+        "1,2,3\n"
+        "0;1;0;0;1e-3\n"
+        "CH1\n"
+        "1\n"
+        "0;0.5;0;0;1e-3\n" + block +
+        "CH1\n"
+        "1\n" + block +
+        "CH1\n"
+        "1000\n"
+        "1\n"
+        "0;2;0;0;1e-3\n" + block +
+        "CH1\n"
+        "1\n" + block
+    ) as tek:
+        tek.cache_preamble = True
+        x, y = tek.channel[0].read_waveform(bin_format=False)
+        assert np.allclose(y, [1, 2, 3])
+        
+        dest = np.empty(3)
+        eq_(tek.channel[0].stream_waveform(dest), (3, 0, 1e-3))
+        assert np.allclose(dest, [0, 0.5, 1])
+        tek.channel[0].stream_waveform(dest)
+        assert np.allclose(dest, [0, 0.5, 1])
+        
+        # The data range is changed from the front panel.
+        tek.invalidate_preamble()
+        tek.channel[0].stream_waveform(dest)
+        assert np.allclose(dest, [0, 2, 4])
+        tek.channel[0].stream_waveform(dest)
+        assert np.allclose(dest, [0, 2, 4])
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# __init__.py: Tests for ThorLabs-brand instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+## IMPORTS ####################################################################
+
+import struct
+
+from nose.tools import raises, eq_
+
+from instruments.tests import expected_protocol
+from instruments.thorlabs._abstract import ThorLabsInstrument
+from instruments.thorlabs import _packets
+from instruments.thorlabs._packets import ThorLabsPacket
+from instruments.thorlabs._dispatch import APTDispatcher
+
+## TESTS ######################################################################
+
+def test_thorlabs_querypacket_framed():
+    # A short packet with parameters, then one carrying four bytes of data,
+    # with trailing bytes belonging to the next packet.
+    with expected_protocol(
+        ThorLabsInstrument,
+        struct.pack('<HBBBB', 0x0211, 1, 0, 0x50, 0x01),
+        struct.pack('<HBBBB', 0x0212, 1, 1, 0x01, 0x50) +
+        struct.pack('<HHBB', 0x0412, 4, 0x81, 0x50) + 'abcd' + 'extra'
+    ) as apt:
+        pkt = apt.querypacket(
+            ThorLabsPacket(0x0211, param1=1, param2=0), expect=0x0212
+        )
+        eq_(pkt._param2, 1)
+        pkt = apt.readpacket()
+        eq_(pkt._message_id, 0x0412)
+        eq_(pkt._data, 'abcd')
+        eq_(apt._file.read(5), 'extra')
+
+@raises(IOError)
+def test_thorlabs_readpacket_truncated():
+    with expected_protocol(
+        ThorLabsInstrument,
+        "",
+        struct.pack('<HHBB', 0x0412, 4, 0x81, 0x50) + 'ab'
+    ) as apt:
+        apt.readpacket()
+
+def test_apt_dispatcher_routing():
+    dispatcher = APTDispatcher(None)
+    move_done = dispatcher.expect(0x0464, source=0x50,
+        match=lambda pkt: pkt._data[:2] == '\x02\x00'
+    )
+    any_pkt = dispatcher.expect()
+    updates = []
+    dispatcher.subscribe(0x0481, updates.append)
+    
+    status = ThorLabsPacket(0x0481, data='\x01\x00' + '\x00' * 12, source=0x50)
+    dispatcher.dispatch(status)
+    eq_(updates, [status])
+    assert any_pkt.result(0) is status
+    
+    other_chan = ThorLabsPacket(0x0464, data='\x01\x00', source=0x50)
+    dispatcher.dispatch(other_chan)
+    assert not move_done.done()
+    done = ThorLabsPacket(0x0464, data='\x02\x00', source=0x50)
+    dispatcher.dispatch(done)
+    assert move_done.result(0) is done
+
+def test_apt_dispatcher_thread():
+    status = ThorLabsPacket(0x0481, data='\x01\x00' + '\x00' * 12, source=0x50)
+    done = ThorLabsPacket(0x0464, data='\x01\x00' + '\x00' * 12, source=0x50)
+    with expected_protocol(
+        ThorLabsInstrument,
+        "",
+        status.pack() + done.pack()
+    ) as apt:
+        apt._dispatcher = APTDispatcher(apt)
+        future = apt._dispatcher.expect(0x0464)
+        updates = []
+        apt._dispatcher.subscribe(0x0481, updates.append)
+        apt.start_dispatcher()
+        try:
+            eq_(future.result(1)._message_id, 0x0464)
+        finally:
+            apt.stop_dispatcher()
+        eq_([pkt._message_id for pkt in updates], [0x0481])
+
+def test_thorlabs_decode_stream():
+    buf = ''.join(
+        ThorLabsPacket(0x0481, source=0x50,
+            data=struct.pack('<HlLL', chan, -10 * chan, 0, 0x10)
+        ).pack() +
+        ThorLabsPacket(0x0211, param1=chan, param2=1).pack()
+        for chan in (1, 2, 3)
+    )
+    # A partial packet at the end is left for the next read.
+    offsets, message_ids, n_bytes = _packets.scan_stream(buf + buf[:8])
+    eq_(n_bytes, len(buf))
+    eq_(list(message_ids), [0x0481, 0x0211] * 3)
+    
+    updates = _packets.decode_stream(buf, 0x0481)
+    eq_(list(updates['chan']), [1, 2, 3])
+    eq_(list(updates['position']), [-10, -20, -30])
+    eq_(list(updates['status_bits']), [0x10] * 3)
+    eq_(list(updates['dest']), [0x50] * 3)
+    
+    pkts = list(_packets.iter_packets(buf))
+    eq_(pkts[2].unpack_data(), (2, -20, 0, 0x10))
+    eq_(pkts[3]._param1, 2)
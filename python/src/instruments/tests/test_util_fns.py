@@ -24,18 +24,26 @@
 
 ## IMPORTS ####################################################################
 
+import socket
+
+import numpy as np
 import quantities as pq
 from cStringIO import StringIO
 
 from nose.tools import raises, eq_
 
 from instruments.util_fns import (
-    ProxyList,
-    assume_units, bool_property, enum_property, int_property
+    ProxyList, ShadowCache,
+    assume_units, bool_property, convert_magnitude, enum_property,
+    int_property, unitful_property
 )
 
 from flufl.enum import Enum
 
+import instruments as ik
+from instruments.abstract_instruments.loopback_wrapper import LoopbackWrapper
+from instruments.tests import expected_protocol
+
 ## CLASSES ####################################################################
 
 class MockInstrument(object):
@@ -97,6 +105,23 @@ def test_assume_units_correct():
 def test_assume_units_failures():
     assume_units(1, 'm').rescale('s')
     
+def test_convert_magnitude():
+    # Plain numbers and arrays are passed through untouched.
+    eq_(convert_magnitude(2.5, pq.mm), 2.5)
+    array = np.arange(3.0)
+    assert convert_magnitude(array, pq.mm) is array
+    
+    eq_(convert_magnitude(pq.Quantity(1, 'm'), pq.mm), 1000)
+    eq_(convert_magnitude(pq.Quantity(2, 'm'), 'mm'), 2000)
+    np.testing.assert_allclose(
+        convert_magnitude(pq.Quantity([1, 2], 'mm/s'), pq.m / pq.s),
+        [0.001, 0.002]
+    )
+    
+@raises(ValueError)
+def test_convert_magnitude_failures():
+    convert_magnitude(pq.Quantity(1, 'm'), pq.s)
+    
 def test_bool_property():
     class BoolMock(MockInstrument):
         mock1 = bool_property('MOCK1', 'ON', 'OFF')
@@ -133,6 +158,152 @@ def test_enum_property():
     
     eq_(mock.value, 'MOCK:A?\nMOCK:B?\nMOCK:A bb\nMOCK:B aa\nMOCK:B bb\n')
 
+def test_shadow_cache():
+    class ShadowMock(MockInstrument):
+        a = unitful_property('MOCK:A', pq.Hz)
+        b = int_property('MOCK:B', volatile=True)
+        
+    mock = ShadowMock({'MOCK:A?': '1000', 'MOCK:B?': '2'})
+    mock._shadow_cache = ShadowCache()
+    
+    # Only the first read of a cached property is sent.
+    eq_(mock.a, pq.Quantity(1000, 'Hz'))
+    eq_(mock.a, pq.Quantity(1000, 'Hz'))
+    # Writes of the cached value are skipped, whatever its units.
+    mock.a = pq.Quantity(1, 'kHz')
+    mock.a = 2000
+    eq_(mock.a, pq.Quantity(2000, 'Hz'))
+    # Volatile properties are always sent.
+    eq_(mock.b, 2)
+    eq_(mock.b, 2)
+    mock._shadow_cache.invalidate()
+    eq_(mock.a, pq.Quantity(1000, 'Hz'))
+    
+    eq_(mock.value,
+        'MOCK:A?\nMOCK:A 2.000000e+03\nMOCK:B?\nMOCK:B?\nMOCK:A?\n')
+    
+    # Modifying a value in place must not change the cached value.
+    freq = mock.a
+    freq *= 2
+    eq_(mock.a, pq.Quantity(1000, 'Hz'))
+    freq = pq.Quantity(3000, 'Hz')
+    mock.a = freq
+    freq *= 2
+    eq_(mock.a, pq.Quantity(3000, 'Hz'))
+
+def test_shadow_cache_invalidation():
+    class ShadowMock(ik.generic_scpi.SCPIInstrument):
+        freq = unitful_property('FREQ', pq.Hz)
+        
+    with expected_protocol(
+        ShadowMock,
+        "FREQ 1.234568e+03\n"
+        "*RST;*OPC?\n"
+        "FREQ?\n"
+        "SYST:PRES;*RCL 1\n"
+        "FREQ?\n",
+        "1\n"
+        "1000\n"
+        "2000\n"
+    ) as inst:
+        inst.enable_shadow_cache()
+        # The value is cached as sent, after rounding by the format.
+        inst.freq = pq.Quantity(1234.5678, 'Hz')
+        eq_(inst.freq, pq.Quantity(1234.568, 'Hz'))
+        # Resets and recalls invalidate the cache wherever they appear.
+        inst.query("*RST;*OPC?")
+        eq_(inst.freq, pq.Quantity(1000, 'Hz'))
+        inst.sendcmd("SYST:PRES;*RCL 1")
+        eq_(inst.freq, pq.Quantity(2000, 'Hz'))
+
+def test_snapshot_restore():
+    class SnapshotMock(ik.generic_scpi.SCPIInstrument):
+        freq = unitful_property('FREQ', pq.Hz)
+        output = bool_property('OUTP', 'ON', 'OFF')
+        temp = unitful_property('TEMP', pq.K, readonly=True)
+        
+    info = SnapshotMock.properties()
+    eq_(info['freq'], ik.util_fns.PropertyInfo('FREQ', pq.Quantity, pq.Hz, False))
+    eq_(info['temp'].readonly, True)
+    
+    with expected_protocol(
+        SnapshotMock,
+        "FREQ?;:OUTP?\n"
+        "FREQ?;:OUTP?\n"
+        "OUTP ON\n",
+        "1000;ON\n"
+        "1000;OFF\n"
+    ) as inst:
+        snapshot = inst.snapshot()
+        eq_(snapshot, {'freq': pq.Quantity(1000, 'Hz'), 'output': True})
+        inst.restore(snapshot)
+
+def test_snapshot_multilevel_headers():
+    class SnapshotMock(ik.generic_scpi.SCPIInstrument):
+        count = int_property('TRIG:COUN')
+        freq = unitful_property('SENS:FREQ', pq.Hz)
+        zero_check = bool_property('SYST:ZCH', 'ON', 'OFF')
+        
+    with expected_protocol(
+        SnapshotMock,
+        "TRIG:COUN?;:SENS:FREQ?;:SYST:ZCH?\n",
+        "5;1000;ON\n"
+    ) as inst:
+        eq_(inst.snapshot(), {
+            'count': 5, 'freq': pq.Quantity(1000, 'Hz'), 'zero_check': True
+        })
+        
+    # The count query is not supported, so the batch comes back one reply
+    # short and the properties are read one at a time.
+    with expected_protocol(
+        SnapshotMock,
+        "TRIG:COUN?;:SENS:FREQ?;:SYST:ZCH?\n"
+        "TRIG:COUN?\n"
+        "SENS:FREQ?\n"
+        "SYST:ZCH?\n",
+        "1000;ON\n"
+        "\n"
+        "1000\n"
+        "ON\n"
+    ) as inst:
+        eq_(inst.snapshot(), {
+            'freq': pq.Quantity(1000, 'Hz'), 'zero_check': True
+        })
+
+def test_snapshot_pipelined_fallback():
+    class SnapshotMock(ik.Instrument):
+        a = int_property('A')
+        b = int_property('B')
+        c = int_property('C')
+        
+    class ScriptedWrapper(LoopbackWrapper):
+        # Returns the scripted responses in turn, timing out in place of
+        # those that are None, as for responses that arrive late.
+        def __init__(self, responses):
+            super(ScriptedWrapper, self).__init__(StringIO(), StringIO())
+            self.responses = list(responses)
+        def read(self, size):
+            response = self.responses.pop(0)
+            if response is None:
+                raise socket.timeout('timed out')
+            return response
+            
+    # Unparseable responses, read in full, leave the batch in step, so the
+    # properties are read again one at a time.
+    inst = SnapshotMock(ScriptedWrapper(['1', 'x', '3', '1', '2', '3']))
+    eq_(inst.snapshot(), {'a': 1, 'b': 2, 'c': 3})
+    
+    # The response to B is late, so that responses can no longer be matched
+    # to queries, and the snapshot is abandoned rather than returning them.
+    inst = SnapshotMock(ScriptedWrapper(['1', None, '2', '3', '1', '2', '3']))
+    try:
+        inst.snapshot()
+    except IOError:
+        pass
+    else:
+        assert False, "Snapshot did not fail after losing a response."
+    eq_(inst._file._stdout.getvalue(), 'A?\nB?\nC?\n')
+
 # TODO: test other property factories!
 
 @raises(ValueError)
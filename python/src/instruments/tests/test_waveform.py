@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# test_waveform.py: Tests lazily scaled oscilloscope waveforms.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+## IMPORTS ####################################################################
+from nose.tools import raises, eq_
+
+import numpy as np
+import quantities as pq
+
+from instruments.abstract_instruments import Waveform
+
+## TEST CASES #################################################################
+
+def test_waveform_scaling():
+    wf = Waveform(np.array([0, 2, 4], dtype=np.int16),
+        yoffs=2, ymult=0.5, yzero=1, xincr=1e-3, xzero=-1e-3
+    )
+    eq_(wf.n_points, 3)
+    assert np.allclose(wf.y, [0, 1, 2])
+    assert np.allclose(wf.x, [-1e-3, 0, 1e-3])
+    eq_(wf.get_y(np.float32).dtype, np.float32)
+    x, y = wf
+    assert np.allclose(y, wf.y)
+
+def test_waveform_slice_is_view():
+    raw = np.arange(10, dtype=np.int8)
+    wf = Waveform(raw, xincr=0.5, xzero=1)
+    part = wf[2:8:2]
+    assert part.raw.base is raw
+    assert np.allclose(part.x, [2, 3, 4])
+    assert np.allclose(part.y, [2, 4, 6])
+
+def test_waveform_units():
+    wf = Waveform(np.array([1, 2]), ymult=2, y_units=pq.volt)
+    eq_(wf.y.units, pq.volt)
+    assert np.allclose(wf.y.magnitude, [2, 4])
+
+def test_waveform_tuple_index():
+    wf = Waveform(np.arange(3), ymult=2, xincr=0.5)
+    assert np.allclose(wf[0], [0, 0.5, 1])
+    assert np.allclose(wf[1], [0, 2, 4])
+    assert np.allclose(wf[-1], wf[1])
+
+@raises(IndexError)
+def test_waveform_index_out_of_range():
+    Waveform(np.arange(3))[2]
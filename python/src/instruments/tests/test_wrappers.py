@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# test_wrappers.py: Tests for the file-like communication wrappers.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+
+## IMPORTS ####################################################################
+
+import os
+import tempfile
+import threading
+import time
+from cStringIO import StringIO
+
+import numpy as np
+from nose.tools import eq_
+
+from instruments.abstract_instruments import Instrument
+from instruments.abstract_instruments.socketwrapper import SocketWrapper
+from instruments.abstract_instruments.serialwrapper import SerialWrapper
+from instruments.abstract_instruments.loopback_wrapper import LoopbackWrapper
+from instruments.abstract_instruments.gi_gpib import GPIBWrapper
+from instruments.tests import MockSerial, tcp_pair
+
+## TEST CASES #################################################################
+
+def test_socketwrapper_read_terminated():
+    host, ins = tcp_pair()
+    try:
+        wrapper = SocketWrapper(host)
+        ins.sendall("1.234\n5.678\npartial")
+        eq_(wrapper.read(-1), "1.234\n")
+        eq_(wrapper.read(-1), "5.678\n")
+        ins.sendall(" line\n")
+        eq_(wrapper.read(-1), "partial line\n")
+    finally:
+        host.close()
+        ins.close()
+
+def test_socketwrapper_read_exact():
+    host, ins = tcp_pair()
+    try:
+        wrapper = SocketWrapper(host)
+        # Use a tiny chunk size so that the payload has to be assembled from
+        # several short receives.
+        wrapper._chunk_size = 3
+        ins.sendall("#210abcdefghij\n")
+        eq_(wrapper.read(1), "#")
+        eq_(wrapper.read(int(wrapper.read(1))), "10")
+        eq_(wrapper.read(10), "abcdefghij")
+        eq_(wrapper.read(-1), "\n")
+    finally:
+        host.close()
+        ins.close()
+
+def test_serialwrapper_read_ahead():
+    conn = MockSerial("+1.0E-3\r+2.0E-3\r" + "x" * 8 + "\r")
+    wrapper = SerialWrapper(conn)
+    wrapper.terminator = "\r"
+    eq_(wrapper.read(-1), "+1.0E-3")
+    eq_(wrapper.read(-1), "+2.0E-3")
+    eq_(wrapper.read(4), "xxxx")
+    eq_(wrapper.read(-1), "xxxx")
+    # Everything waiting should have been drained by the first read.
+    eq_(conn.n_reads, 1)
+
+def test_gpibwrapper_adapter_state():
+    stdout = StringIO()
+    adapter = LoopbackWrapper(StringIO(), stdout)
+    dmm = GPIBWrapper(adapter, 1)
+    scope = GPIBWrapper(adapter, 2)
+    scope.terminator = 13
+
+    dmm.sendcmd("READ?")
+    dmm.sendcmd("READ?")
+    scope.sendcmd("CURV?")
+    dmm.sendcmd("READ?")
+
+    eq_(stdout.getvalue(),
+        "+a:1\r+eoi:1\r+strip:0\rREAD?\r"
+        "READ?\r"
+        "+a:2\r+eoi:0\r+eos:13\rCURV?\r"
+        "+a:1\r+eoi:1\rREAD?\r"
+    )
+
+def test_gpibwrapper_timeout_paced():
+    stdout = StringIO()
+    wrapper = GPIBWrapper(LoopbackWrapper(StringIO(), stdout), 1)
+    wrapper.pacing = 0.2
+    wrapper.sendcmd("READ?")
+    
+    # Setting the timeout is a configuration command, so the next command
+    # must wait out the pacing interval.
+    wrapper.timeout = 3
+    start = time.time()
+    wrapper.sendcmd("READ?")
+    assert time.time() - start >= 0.15
+    eq_(stdout.getvalue().split("\r")[-3:], ["+t:3", "READ?", ""])
+
+def test_gpibbus_serializes_threads():
+    stdout = StringIO()
+    adapter = LoopbackWrapper(StringIO(), stdout)
+    wrappers = [GPIBWrapper(adapter, address) for address in xrange(1, 6)]
+    for wrapper in wrappers:
+        wrapper.pacing = 0
+
+    def poll(wrapper, address):
+        for _ in xrange(50):
+            wrapper.sendcmd("MEAS{}?".format(address))
+
+    threads = [
+        threading.Thread(target=poll, args=(wrapper, address))
+        for address, wrapper in enumerate(wrappers, 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every command must have been sent while the adapter was set to the
+    # address of the instrument that sent it.
+    address = None
+    n_cmds = 0
+    for line in stdout.getvalue().split("\r")[:-1]:
+        if line.startswith("+a:"):
+            address = int(line[3:])
+        elif line.startswith("MEAS"):
+            eq_(int(line[4:-1]), address)
+            n_cmds += 1
+    eq_(n_cmds, 250)
+
+    stats = wrappers[0].bus.statistics()
+    eq_(sorted(stats.keys()), range(1, 6))
+    for address_stats in stats.itervalues():
+        eq_(address_stats['count'], 50)
+        eq_(address_stats['queue_depth'], 0)
+
+def test_gpibbus_exclusive_binblockread():
+    stdout = StringIO()
+    reading = threading.Event()
+
+    class SlowAdapter(LoopbackWrapper):
+        # Records each read, and stalls the first one until the other thread
+        # has had the chance to queue for the bus.
+        def read(self, size):
+            self._stdout.write("<read>")
+            if not reading.is_set():
+                reading.set()
+                time.sleep(0.1)
+            return super(SlowAdapter, self).read(size)
+
+    adapter = SlowAdapter(StringIO("#14" + "\x00\x01\x00\x02"), stdout)
+    scope = Instrument(GPIBWrapper(adapter, 1))
+    dmm = GPIBWrapper(adapter, 2)
+    for wrapper in (scope._file, dmm):
+        wrapper.pacing = 0
+    # Hand the bus to the other address whenever it is waiting, so that it
+    # could only be kept from cutting in by the exclusive block.
+    scope._file.bus.max_burst = 1
+    results = []
+
+    def read_block():
+        with scope.exclusive():
+            scope.sendcmd("CURV?")
+            results.append(scope.binblockread(2))
+
+    def poll():
+        reading.wait()
+        dmm.sendcmd("READ?")
+
+    threads = [
+        threading.Thread(target=read_block),
+        threading.Thread(target=poll),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert np.all(results[0] == [1, 2])
+    eq_(stdout.getvalue(),
+        "+a:1\r+eoi:1\r+strip:0\rCURV?\r" + "<read>" * 4 +
+        "+a:2\rREAD?\r"
+    )
+
+def test_binblockread_into_buffer():
+    host, ins = tcp_pair()
+    try:
+        inst = Instrument(SocketWrapper(host))
+        data = np.arange(-5, 5, dtype='>i4')
+        ins.sendall("#240" + data.tostring() + "\n")
+        out = np.zeros(16, dtype='>i4')
+        result = inst.binblockread(4, out=out)
+        assert np.all(result == data)
+        assert np.all(out[:10] == data)
+        assert np.all(out[10:] == 0)
+        eq_(inst._file.read(-1), "\n")
+        
+        data = np.linspace(0, 1, 7).astype('<f8')
+        ins.sendall("#0" + data.tostring() + "\n")
+        buf = bytearray(data.nbytes)
+        result = inst.binblockread(8, fmt='<f8', out=buf)
+        assert np.all(result == data)
+        eq_(bytes(buf), data.tostring())
+        
+        ins.sendall("#14" + np.array([1, -2], dtype='>i2').tostring() + "\n")
+        assert np.all(inst.binblockread(2) == [1, -2])
+    finally:
+        host.close()
+        ins.close()
+
+def test_binblockread_indefinite_terminator():
+    data = np.array([1, -2, 3], dtype='>i2')
+    host, ins = tcp_pair()
+    try:
+        wrappers = [
+            SocketWrapper(host),
+            SerialWrapper(MockSerial(
+                ("#0" + data.tostring() + "\r") * 2 + "OK\r"
+            )),
+        ]
+        ins.sendall(("#0" + data.tostring() + "\r") * 2 + "OK\r")
+        for wrapper in wrappers:
+            inst = Instrument(wrapper)
+            inst.terminator = "\r"
+            assert np.all(inst.binblockread(2) == data)
+            out = np.zeros(3, dtype='>i2')
+            assert np.all(inst.binblockread(2, out=out) == data)
+            # Both forms must consume the terminator, and nothing past it.
+            eq_(inst._read_terminated(), "OK")
+    finally:
+        host.close()
+        ins.close()
+
+def test_binblockread_to_file_and_array():
+    host, ins = tcp_pair()
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        inst = Instrument(SocketWrapper(host))
+        data = np.arange(1000, dtype='>i2')
+        block = "#42000" + data.tostring() + "\n"
+        
+        ins.sendall(block)
+        eq_(inst.binblockread_to(
+            filename, 2, transform=lambda raw: raw * 0.5, chunk_size=256
+        ), 1000)
+        eq_(inst._file.read(-1), "\n")
+        assert np.all(np.fromfile(filename) == data * 0.5)
+        
+        ins.sendall(block)
+        out = np.memmap(filename, dtype='>i2', mode='w+', shape=(1000,))
+        eq_(inst.binblockread_to(out, 2, chunk_size=256), 1000)
+        assert np.all(out == data)
+        del out
+    finally:
+        host.close()
+        ins.close()
+        os.remove(filename)
+
+def test_binblockread_to_writer_error():
+    host, ins = tcp_pair()
+    try:
+        inst = Instrument(SocketWrapper(host))
+        data = np.arange(1000, dtype='>i2')
+        ins.sendall("#42000" + data.tostring() + "\n")
+        
+        def transform(raw):
+            raise ValueError("Could not store chunk.")
+        try:
+            inst.binblockread_to(np.empty(1000), 2, transform=transform,
+                chunk_size=256)
+        except ValueError:
+            pass
+        else:
+            assert False, "Writer error was not raised."
+            
+        # The rest of the block must have been discarded.
+        ins.sendall("OK\n")
+        eq_(inst.query("*OPC?"), "OK\n")
+    finally:
+        host.close()
+        ins.close()
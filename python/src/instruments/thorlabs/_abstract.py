@@ -24,7 +24,10 @@
 
 ## IMPORTS #####################################################################
 
+import threading
+
 from instruments.thorlabs import _packets
+from instruments.thorlabs._dispatch import APTDispatcher
 from instruments.abstract_instruments.instrument import Instrument
 
 ## CLASSES #####################################################################
@@ -34,9 +37,79 @@ class ThorLabsInstrument(Instrument):
     def __init__(self, filelike):
         super(ThorLabsInstrument, self).__init__(filelike)
         self.terminator = ''
+        self._dispatcher = None
+        self._write_lock = threading.Lock()
+        
+    ## PROPERTIES ##
+    
+    @property
+    def dispatcher(self):
+        """
+        Gets the dispatcher routing packets received from this instrument,
+        or `None` if packets are not being read in the background.
+        
+        :type: `~instruments.thorlabs._dispatch.APTDispatcher`
+        """
+        if self._dispatcher is not None and self._dispatcher.running:
+            return self._dispatcher
+        return None
+        
+    ## METHODS ##
+    
+    def start_dispatcher(self):
+        """
+        Starts reading packets from this instrument on a background thread,
+        such that unsolicited packets can arrive at any time. While the
+        dispatcher runs, `~ThorLabsInstrument.querypacket` waits for the
+        expected packet to be routed to it, rather than reading the next
+        packet itself.
+        
+        :return: The running dispatcher.
+        :rtype: `~instruments.thorlabs._dispatch.APTDispatcher`
+        """
+        if self._dispatcher is None:
+            self._dispatcher = APTDispatcher(self)
+        self._dispatcher.start()
+        return self._dispatcher
+        
+    def stop_dispatcher(self):
+        """
+        Stops reading packets in the background.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
     
     def sendpacket(self, packet):
-        self.sendcmd(packet.pack())
+        # Packets may also be sent from the dispatcher thread, so make sure
+        # they are not interleaved.
+        with self._write_lock:
+            self.sendcmd(packet.pack())
+        
+    def readpacket(self):
+        """
+        Reads a single packet from the connected APT instrument. Since APT
+        packets are not terminated, the 6-byte header is read first, and
+        then exactly as many data bytes as the header declares, such that
+        the read finishes as soon as the packet has arrived.
+        
+        :return: The packet read, or `None` if no packet arrived before the
+            connection timed out.
+        :rtype: `~instruments.thorlabs._packets.ThorLabsPacket`
+        """
+        header = self._file.read(_packets.HEADER_SIZE)
+        if not header:
+            return None
+        if len(header) < _packets.HEADER_SIZE:
+            raise IOError("APT packet header ended after {} of {} "
+                          "bytes.".format(len(header), _packets.HEADER_SIZE))
+        
+        data_length = _packets.data_length(header)
+        data = self._file.read(data_length) if data_length else ''
+        if len(data) < data_length:
+            raise IOError("APT packet data ended after {} of {} bytes.".format(
+                len(data), data_length
+            ))
+        return _packets.ThorLabsPacket.unpack(header + data)
         
     def querypacket(self, packet, expect=None):
         """
@@ -44,15 +117,23 @@ class ThorLabsInstrument(Instrument):
         in response. Optionally, checks whether the received packet type is
         matches that the caller expects.
         """
-        resp = self.query(packet.pack())
-        if not resp:
+        if self.dispatcher is not None:
+            # Responses are matched to the expected message ID, so that
+            # unsolicited packets arriving first are not mistaken for them.
+            future = self.querypacket_async(packet, expect)
+            pkt = future.result(self.timeout or None)
+            if pkt is None:
+                self._dispatcher.cancel(future)
+        else:
+            self.sendpacket(packet)
+            pkt = self.readpacket()
+        if pkt is None:
             if expect is None:
                 return None
             else:
                 raise IOError("Expected packet {}, got nothing instead.".format(
                     expect
                 ))
-        pkt = _packets.ThorLabsPacket.unpack(resp)
         if expect is not None and pkt._message_id != expect:
             # TODO: make specialized subclass that can record the offending
             #       packet.
@@ -60,4 +141,25 @@ class ThorLabsInstrument(Instrument):
                 pkt._message_id, expect
             ))
         return pkt
+        
+    def querypacket_async(self, packet, expect=None, match=None):
+        """
+        Sends a packet to the connected APT instrument, and returns
+        immediately with a future for the response, which is read by the
+        dispatcher. The dispatcher is started if it is not already running.
+        
+        :param packet: Packet to send.
+        :type packet: `~instruments.thorlabs._packets.ThorLabsPacket`
+        :param int expect: Message ID of the expected response, or `None` to
+            accept the next packet that is not otherwise expected.
+        :param callable match: If not `None`, a function which is passed each
+            received packet with the expected message ID, and returns whether
+            it is the response.
+        :rtype: `~instruments.thorlabs._dispatch.PacketFuture`
+        """
+        dispatcher = self.start_dispatcher()
+        # Register before sending, so that a quick response is not missed.
+        future = dispatcher.expect(expect, source=packet._dest, match=match)
+        self.sendpacket(packet)
+        return future
       
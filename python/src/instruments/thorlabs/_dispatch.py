@@ -0,0 +1,250 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##
+# _dispatch.py: Dispatches packets received from ThorLabs APT instruments.
+##
+# © 2013 Steven Casagrande (scasagrande@galvant.ca).
+#
+# This file is a part of the InstrumentKit project.
+# Licensed under the AGPL version 3.
+##
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+##
+
+## IMPORTS #####################################################################
+
+import threading
+
+## LOGGING #####################################################################
+
+import logging
+from instruments.util_fns import NullHandler
+
+logger = logging.getLogger(__name__)
+logger.addHandler(NullHandler())
+
+## CLASSES #####################################################################
+
+class PacketFuture(object):
+    """
+    Packet expected from an APT instrument, which may not have arrived yet.
+    Futures are returned by `ThorLabsInstrument.querypacket_async`.
+    
+    :param int message_id: Message ID of the expected packet, or `None` to
+        accept the next packet that is not expected by any other future.
+    :param int source: If not `None`, the address the packet must come from.
+    :param callable match: If not `None`, a function which is passed each
+        candidate packet, and returns whether it is the one expected.
+    """
+    def __init__(self, message_id=None, source=None, match=None):
+        self.message_id = message_id
+        self.source = source
+        self._match = match
+        self._event = threading.Event()
+        self._packet = None
+        self._error = None
+        
+    def matches(self, packet):
+        """
+        Returns whether ``packet`` is the packet expected by this future.
+        
+        :rtype: `bool`
+        """
+        if self.message_id is not None and \
+                packet._message_id != self.message_id:
+            return False
+        if self.source is not None and packet._source != self.source:
+            return False
+        return self._match is None or bool(self._match(packet))
+        
+    def done(self):
+        """
+        Returns `True` if the expected packet has arrived.
+        
+        :rtype: `bool`
+        """
+        return self._event.is_set()
+        
+    def result(self, timeout=None):
+        """
+        Waits for the expected packet to arrive, and returns it.
+        
+        :param float timeout: Time to wait for, in seconds, or `None` to
+            wait indefinitely.
+        :return: The packet, or `None` if it did not arrive in time.
+        :rtype: `~instruments.thorlabs._packets.ThorLabsPacket`
+        """
+        self._event.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._packet
+        
+    def _set_result(self, packet):
+        self._packet = packet
+        self._event.set()
+        
+    def _set_error(self, error):
+        self._error = error
+        self._event.set()
+        
+class APTDispatcher(object):
+    """
+    Reads packets from an APT instrument on a background thread, and routes
+    each to the future expecting it and to any subscribed callbacks. This
+    allows for unsolicited packets, such as status updates or notifications
+    that a move has completed, to arrive at any time.
+    
+    Each packet completes at most one future, giving precedence to those
+    expecting a specific message ID, in the order in which they were
+    registered. Every packet is also passed to each matching subscriber,
+    from the background thread.
+    
+    :param apt: Instrument to read packets from.
+    :type apt: `ThorLabsInstrument`
+    """
+    def __init__(self, apt):
+        self._apt = apt
+        self._lock = threading.Lock()
+        self._futures = []
+        self._subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.error = None
+        
+    ## PROPERTIES ##
+    
+    @property
+    def running(self):
+        """
+        Gets whether packets are being read by the background thread.
+        
+        :type: `bool`
+        """
+        return self._thread is not None and self._thread.is_alive()
+        
+    ## METHODS ##
+    
+    def start(self):
+        """
+        Starts reading packets on a background thread.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        
+    def stop(self):
+        """
+        Stops reading packets, once the current read has finished. Futures
+        that have not yet completed fail with a `RuntimeError`.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._fail(RuntimeError("The APT dispatcher was stopped."))
+        
+    def expect(self, message_id=None, source=None, match=None):
+        """
+        Registers a future for a packet that is expected to arrive. To avoid
+        missing the packet, this must be called before sending the request
+        that it responds to.
+        
+        The arguments are as for `PacketFuture`.
+        
+        :rtype: `PacketFuture`
+        """
+        future = PacketFuture(message_id, source, match)
+        with self._lock:
+            self._futures.append(future)
+        return future
+        
+    def cancel(self, future):
+        """
+        Stops waiting for the packet expected by ``future``, such as after
+        it has timed out.
+        """
+        with self._lock:
+            if future in self._futures:
+                self._futures.remove(future)
+        
+    def subscribe(self, message_id, callback, source=None):
+        """
+        Subscribes ``callback`` to each packet received with the given
+        message ID, or to every packet if ``message_id`` is `None`.
+        
+        :return: Subscription to pass to `~APTDispatcher.unsubscribe`.
+        """
+        subscription = (message_id, source, callback)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+        
+    def unsubscribe(self, subscription):
+        """
+        Cancels a subscription made by `~APTDispatcher.subscribe`.
+        """
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+            
+    def dispatch(self, packet):
+        """
+        Routes a packet to its future and subscribers.
+        
+        :param packet: Packet received from the instrument.
+        :type packet: `~instruments.thorlabs._packets.ThorLabsPacket`
+        """
+        with self._lock:
+            candidates = [f for f in self._futures if f.matches(packet)]
+            specific = [f for f in candidates if f.message_id is not None]
+            future = (specific or candidates or [None])[0]
+            if future is not None:
+                self._futures.remove(future)
+            callbacks = [
+                callback
+                for message_id, source, callback in self._subscribers
+                if (message_id is None or message_id == packet._message_id)
+                and (source is None or source == packet._source)
+            ]
+            
+        if future is not None:
+            future._set_result(packet)
+        elif not callbacks:
+            logger.debug("Discarding unexpected APT packet with message "
+                         "ID 0x{:x}.".format(packet._message_id))
+        for callback in callbacks:
+            try:
+                callback(packet)
+            except Exception:
+                logger.exception("Error in APT packet subscriber.")
+                
+    def _fail(self, error):
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future._set_error(error)
+        
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                packet = self._apt.readpacket()
+                if packet is not None:
+                    self.dispatch(packet)
+        except Exception as e:
+            logger.error("Stopped reading APT packets: {}".format(e))
+            self.error = e
+            self._fail(e)
@@ -26,14 +26,200 @@
 
 import struct
 
+import numpy as np
+
+from instruments.thorlabs._cmds import ThorLabsCommands
+
 ## STRUCTS #####################################################################
 
 message_header_nopacket = struct.Struct('<HBBBB')
 message_header_wpacket  = struct.Struct('<HHBB')
+chan_ident              = struct.Struct('<H')
+
+## CONSTANTS ###################################################################
+
+HEADER_SIZE = 6
+
+# Layouts of the data carried by packets of each message ID, as lists of
+# (field name, struct format) pairs. Packets may carry extra data beyond the
+# fields listed here, which is ignored.
+_STATUS_LAYOUT = [
+    ('chan', 'H'), ('position', 'l'), ('enc_count', 'l'), ('status_bits', 'L')
+]
+PAYLOAD_LAYOUTS = {
+    ThorLabsCommands.MOT_GET_POSCOUNTER: [('chan', 'H'), ('position', 'l')],
+    ThorLabsCommands.MOT_GET_ENCCOUNTER: [('chan', 'H'), ('enc_count', 'l')],
+    ThorLabsCommands.MOT_GET_STATUSUPDATE: _STATUS_LAYOUT,
+    ThorLabsCommands.MOT_MOVE_COMPLETED: _STATUS_LAYOUT,
+    ThorLabsCommands.MOT_MOVE_STOPPED: _STATUS_LAYOUT,
+    ThorLabsCommands.MOT_GET_DCSTATUSUPDATE: [
+        ('chan', 'H'), ('position', 'l'), ('velocity', 'H'),
+        ('reserved', 'H'), ('status_bits', 'L')
+    ],
+    ThorLabsCommands.MOT_GET_VELPARAMS: [
+        ('chan', 'H'), ('min_velocity', 'l'), ('acceleration', 'l'),
+        ('max_velocity', 'l')
+    ],
+    ThorLabsCommands.MOT_GET_JOGPARAMS: [
+        ('chan', 'H'), ('jog_mode', 'H'), ('step_size', 'l'),
+        ('min_velocity', 'l'), ('acceleration', 'l'), ('max_velocity', 'l'),
+        ('stop_mode', 'H')
+    ],
+    ThorLabsCommands.MOT_GET_HOMEPARAMS: [
+        ('chan', 'H'), ('home_dir', 'H'), ('limit_switch', 'H'),
+        ('home_velocity', 'l'), ('offset_distance', 'l')
+    ],
+    ThorLabsCommands.PZ_GET_OUTPUTPOS: [('chan', 'H'), ('position', 'H')],
+    ThorLabsCommands.PZ_GET_MAXTRAVEL: [('chan', 'H'), ('max_travel', 'H')],
+    ThorLabsCommands.PZ_GET_PZSTATUSUPDATE: [
+        ('chan', 'H'), ('voltage', 'h'), ('position', 'H'),
+        ('status_bits', 'L')
+    ],
+    ThorLabsCommands.PZ_GET_TPZ_DISPSETTINGS: [('intensity', 'H')],
+}
+
+# Precompiled structs and equivalent NumPy dtypes for each payload layout,
+# keyed by the integer message ID.
+PAYLOAD_STRUCTS = dict(
+    (int(message_id), struct.Struct('<' + ''.join(fmt for _, fmt in layout)))
+    for message_id, layout in PAYLOAD_LAYOUTS.iteritems()
+)
+PAYLOAD_DTYPES = dict(
+    (int(message_id), np.dtype([
+        # NumPy has no native-size struct codes, so give sizes explicitly.
+        (name, '<' + {'H': 'u2', 'h': 'i2', 'l': 'i4', 'L': 'u4'}[fmt])
+        for name, fmt in layout
+    ]))
+    for message_id, layout in PAYLOAD_LAYOUTS.iteritems()
+)
+
+# Header of each packet as a NumPy dtype. For packets with data, param1 and
+# param2 together hold the length of the data.
+HEADER_DTYPE = np.dtype([
+    ('message_id', '<u2'), ('param1', 'u1'), ('param2', 'u1'),
+    ('dest', 'u1'), ('source', 'u1')
+])
+
+## FUNCTIONS ###################################################################
+
+def has_data(header):
+    """
+    Returns `True` if the packet with the given header carries data, as
+    flagged by 0x80 being set on header byte 4.
+    """
+    return bool(struct.unpack("B", header[4])[0] & 0x80)
+
+def data_length(header):
+    """
+    Returns the number of data bytes following the given packet header.
+    """
+    if has_data(header):
+        return message_header_wpacket.unpack(header)[1]
+    return 0
+    
+def _byte_array(buf):
+    """
+    Returns a `numpy.ndarray` of bytes viewing ``buf`` without copying it.
+    """
+    if isinstance(buf, memoryview):
+        return np.asarray(buf).view(np.uint8)
+    return np.frombuffer(buf, dtype=np.uint8)
+    
+def scan_stream(buf):
+    """
+    Finds the packets held by a buffer of concatenated packets, such as
+    that read from an instrument which is streaming status updates. Only the
+    headers are read; a partial packet at the end of the buffer is left for
+    the next scan.
+    
+    :param buf: Buffer holding the packets.
+    :type buf: `str`, `bytearray` or `memoryview`
+    :return: The offsets of each packet in ``buf``, their message IDs, and
+        the number of bytes making up complete packets.
+    :rtype: `tuple` of two `numpy.ndarray` and an `int`
+    """
+    offsets = []
+    message_ids = []
+    n_bytes = len(buf)
+    offset = 0
+    unpack_from = message_header_wpacket.unpack_from
+    while offset + HEADER_SIZE <= n_bytes:
+        message_id, length, dest, source = unpack_from(buf, offset)
+        size = HEADER_SIZE + (length if dest & 0x80 else 0)
+        if offset + size > n_bytes:
+            break
+        offsets.append(offset)
+        message_ids.append(message_id)
+        offset += size
+    return np.array(offsets, dtype=int), np.array(message_ids, dtype='<u2'), \
+        offset
+    
+def iter_packets(buf):
+    """
+    Iterates over the complete packets held by a buffer of concatenated
+    packets. The data of each packet is a `memoryview` into ``buf``, rather
+    than a copy.
+    
+    :param buf: Buffer holding the packets.
+    :type buf: `str`, `bytearray` or `memoryview`
+    :rtype: iterator of `ThorLabsPacket`
+    """
+    view = memoryview(buf)
+    offsets, _, _ = scan_stream(buf)
+    for offset in offsets:
+        yield ThorLabsPacket.unpack(view[offset:])
+    
+def decode_stream(buf, message_id):
+    """
+    Decodes every packet with the given message ID held by a buffer of
+    concatenated packets into a NumPy structured array, in a single
+    vectorized operation. The array has the fields of `HEADER_DTYPE`,
+    followed by those of the payload layout for ``message_id``, such as
+    ``position`` and ``status_bits`` for status updates.
+    
+    >>> updates = decode_stream(buf, ThorLabsCommands.MOT_GET_STATUSUPDATE)
+    >>> updates['position'][updates['chan'] == 1]
+    
+    :param buf: Buffer holding the packets.
+    :type buf: `str`, `bytearray` or `memoryview`
+    :param int message_id: Message ID of the packets to decode, which must
+        have a known payload layout.
+    :rtype: `numpy.ndarray`
+    """
+    payload_dtype = PAYLOAD_DTYPES.get(int(message_id))
+    if payload_dtype is None:
+        raise ValueError("No payload layout is known for message ID "
+                         "0x{:x}.".format(message_id))
+    dtype = np.dtype(
+        [(name, HEADER_DTYPE.fields[name][0]) for name in HEADER_DTYPE.names] +
+        [(name, payload_dtype.fields[name][0]) for name in payload_dtype.names]
+    )
+    
+    offsets, message_ids, _ = scan_stream(buf)
+    offsets = offsets[message_ids == message_id]
+    data = _byte_array(buf)
+    if len(offsets):
+        flags = data[offsets + 4]
+        lengths = data[offsets + 2] | (data[offsets + 3].astype(int) << 8)
+        if np.any((flags & 0x80) == 0) or \
+                np.any(lengths < payload_dtype.itemsize):
+            raise ValueError("Packets with message ID 0x{:x} are too short "
+                             "for their payload layout.".format(message_id))
+    
+    # Gather the bytes of all matching packets at once, then reinterpret them.
+    idx = offsets[:, np.newaxis] + np.arange(dtype.itemsize)
+    packets = data[idx].view(dtype).reshape(-1)
+    packets['dest'] &= 0x7f
+    return packets
 
 ## CLASSES #####################################################################
 
 class ThorLabsPacket(object):
+    __slots__ = (
+        '_message_id', '_param1', '_param2', '_data', '_has_data', '_dest',
+        '_source'
+    )
+    
     def __init__(self,
             message_id,
             param1=None, param2=None,
@@ -82,18 +268,30 @@ ThorLabs APT packet:
                 self._message_id, self._param1, self._param2, self._dest, self._source
             )
         
+    def unpack_data(self):
+        """
+        Unpacks the data carried by this packet, according to the payload
+        layout for its message ID.
+        
+        :return: The values of each field of the payload layout.
+        :rtype: `tuple`
+        """
+        payload = PAYLOAD_STRUCTS.get(self._message_id)
+        if payload is None:
+            raise ValueError("No payload layout is known for message ID "
+                             "0x{:x}.".format(self._message_id))
+        return payload.unpack_from(self._data)
+        
     @classmethod
     def unpack(cls, bytes):
         if not bytes:
             raise ValueError("Expected a packet, got an empty string instead.")
-        if len(bytes) < 6:
+        if len(bytes) < HEADER_SIZE:
             raise ValueError("Packet must be at least 6 bytes long.")
             
-        header = bytes[:6]
+        header = bytes[:HEADER_SIZE]
         
-        # Check if 0x80 is set on header byte 4. If so, then this packet
-        # has data.
-        if struct.unpack("B", header[4])[0] & 0x80:
+        if has_data(header):
             msg_id, length, dest, source = message_header_wpacket.unpack(header)
             dest = dest ^ 0x80 # Turn off 0x80.
             param1 = None
@@ -217,7 +217,7 @@ class APTPiezoDevice(ThorLabsAPT):
             if resp is None:
                 return NotImplemented
             
-            chan, int_maxtrav = struct.unpack('<HH', resp._data)
+            chan, int_maxtrav = resp.unpack_data()
             return int_maxtrav * pq.Quantity(100, 'nm')
             
     @property
@@ -234,7 +234,7 @@ class APTPiezoDevice(ThorLabsAPT):
                                       source=0x01,
                                       data=None)
         resp = self.querypacket(pkt)
-        return float(struct.unpack('<H', resp._data)[0])/255
+        return float(resp.unpack_data()[0])/255
     
     @led_intensity.setter
     def led_intensity(self, intensity):
@@ -288,7 +288,7 @@ class APTPiezoStage(APTPiezoDevice):
                                           source=0x01,
                                           data=None)
             resp = self._apt.querypacket(pkt, expect=_cmds.ThorLabsCommands.PZ_GET_OUTPUTPOS)
-            chan, pos = struct.unpack('<HH', resp._data)
+            chan, pos = resp.unpack_data()
             return pos
         
         @output_position.setter
@@ -317,6 +317,11 @@ class APTMotorController(ThorLabsAPT):
 
     class MotorChannel(ThorLabsAPT.APTChannel):
     
+        def __init__(self, apt, idx_chan):
+            super(APTMotorController.MotorChannel, self).__init__(apt, idx_chan)
+            self._last_status = None
+            self._status_callbacks = []
+    
         ## INSTANCE VARIABLES ##
         
         #: Sets the scale between the encoder counts and physical units
@@ -397,6 +402,20 @@ class APTMotorController(ThorLabsAPT):
     
         ## MOTOR COMMANDS ##
         
+        def _status_dict(self, status_bits):
+            return dict(
+                (key, (status_bits & bit_mask > 0))
+                for key, bit_mask in self.__STATUS_BIT_MASK.iteritems()
+            )
+            
+        def _owns_packet(self, pkt):
+            # Channel-specific packets identify their channel either by the
+            # first parameter, or by the first two bytes of their data.
+            if pkt._has_data:
+                return _packets.chan_ident.unpack_from(pkt._data)[0] == \
+                    self._idx_chan
+            return pkt._param1 == self._idx_chan
+        
         @property
         def status_bits(self):
             # NOTE: the difference between MOT_REQ_STATUSUPDATE and MOT_REQ_DCSTATUSUPDATE confuses me
@@ -408,15 +427,53 @@ class APTMotorController(ThorLabsAPT):
                                           data=None)
             # The documentation claims there are 14 data bytes, but it seems there are sometimes
             # some extra random ones...
-            resp_data = self._apt.querypacket(pkt)._data[:14]
-            ch_ident, position, enc_count, status_bits = struct.unpack('<HLLL', resp_data)
+            resp = self._apt.querypacket(pkt)
+            ch_ident, position, enc_count, status_bits = _packets.PAYLOAD_STRUCTS[
+                _cmds.ThorLabsCommands.MOT_GET_STATUSUPDATE
+            ].unpack_from(resp._data)
             
-            status_dict = dict(
-                (key, (status_bits & bit_mask > 0))
-                for key, bit_mask in self.__STATUS_BIT_MASK.iteritems()
-            )
+            return self._status_dict(status_bits)
+            
+        @property
+        def last_status(self):
+            """
+            Gets the most recent status update received for this channel,
+            while status updates are enabled by
+            `~APTMotorController.start_status_updates`, as a `dict` with
+            keys ``position`` and ``status_bits``. Unlike
+            `~MotorChannel.position`, this does not wait for the instrument.
             
-            return status_dict
+            :type: `dict`, or `None` if no update has been received.
+            """
+            return self._last_status
+            
+        def subscribe_status(self, callback):
+            """
+            Registers ``callback`` to be called with each status update
+            received for this channel, in the same form as
+            `~MotorChannel.last_status`. Callbacks are called from a
+            background thread.
+            """
+            self._status_callbacks.append(callback)
+            
+        def unsubscribe_status(self, callback):
+            """
+            Stops calling a callback registered by
+            `~MotorChannel.subscribe_status`.
+            """
+            self._status_callbacks.remove(callback)
+            
+        def _update_status(self, pkt):
+            # Both kinds of status update start with the channel and
+            # position, and end with the status bits.
+            fields = pkt.unpack_data()
+            position, status_bits = fields[1], fields[-1]
+            self._last_status = status = {
+                'position': pq.Quantity(position, 'counts') / self.scale_factors[0],
+                'status_bits': self._status_dict(status_bits)
+            }
+            for callback in list(self._status_callbacks):
+                callback(status)
         
         @property
         def position(self):
@@ -427,7 +484,7 @@ class APTMotorController(ThorLabsAPT):
                                           source=0x01,
                                           data=None)
             response = self._apt.querypacket(pkt, expect=_cmds.ThorLabsCommands.MOT_GET_POSCOUNTER)
-            chan, pos = struct.unpack('<Hl', response._data)
+            chan, pos = response.unpack_data()
             return pq.Quantity(pos, 'counts') / self.scale_factors[0]
             
         @property
@@ -439,7 +496,7 @@ class APTMotorController(ThorLabsAPT):
                                           source=0x01,
                                           data=None)
             response = self._apt.querypacket(pkt, expect=_cmds.ThorLabsCommands.MOT_GET_ENCCOUNTER)
-            chan, pos = struct.unpack('<Hl', response._data)
+            chan, pos = response.unpack_data()
             return pq.Quantity(pos, 'counts')
         
         def go_home(self):
@@ -451,7 +508,21 @@ class APTMotorController(ThorLabsAPT):
                                           data=None)
             self._apt.sendpacket(pkt)
             
-        def move(self, pos, absolute=True):
+        def move(self, pos, absolute=True, wait=True):
+            """
+            Moves this channel to the given position, or by the given
+            distance if ``absolute`` is `False`.
+            
+            :param pos: Position or distance to move. Raw numbers are taken as
+                encoder counts.
+            :type pos: `~quantities.Quantity` or `int`
+            :param bool absolute: If `True`, ``pos`` is an absolute position.
+            :param bool wait: If `False`, return without waiting for the move
+                to complete.
+            :return: If not waiting, a future for the move completed packet,
+                whose ``result`` method waits for the move to finish.
+            :rtype: `~instruments.thorlabs._dispatch.PacketFuture`
+            """
             # Handle units as follows:
             # 1. Treat raw numbers as encoder counts.
             # 2. If units are provided (as a Quantity), check if they're encoder
@@ -477,11 +548,65 @@ class APTMotorController(ThorLabsAPT):
                                           dest=self._apt._dest,
                                           source=0x01,
                                           data=struct.pack('<Hl', self._idx_chan, pos_ec))
-                                          
+            
+            if not wait:
+                return self._apt.querypacket_async(
+                    pkt, expect=_cmds.ThorLabsCommands.MOT_MOVE_COMPLETED,
+                    match=self._owns_packet
+                )
             response = self._apt.querypacket(pkt, expect=_cmds.ThorLabsCommands.MOT_MOVE_COMPLETED)
             
     _channel_type = MotorChannel
     
+    _STATUS_UPDATE_IDS = (
+        _cmds.ThorLabsCommands.MOT_GET_STATUSUPDATE,
+        _cmds.ThorLabsCommands.MOT_GET_DCSTATUSUPDATE,
+    )
+    _status_subscriptions = ()
+    
     ## CONTROLLER PROPERTIES AND METHODS ##
     
+    def start_status_updates(self):
+        '''
+        Has the controller send status updates for each of its channels
+        periodically, and starts the dispatcher to receive them. The latest
+        update for each channel is then available from
+        `~MotorChannel.last_status` without polling.
+        '''
+        dispatcher = self.start_dispatcher()
+        if not self._status_subscriptions:
+            self._status_subscriptions = [
+                dispatcher.subscribe(message_id, self._on_status_update,
+                                     source=self._dest)
+                for message_id in self._STATUS_UPDATE_IDS
+            ]
+        self.sendpacket(_packets.ThorLabsPacket(
+            message_id=_cmds.ThorLabsCommands.HW_START_UPDATEMSGS,
+            param1=0x00, param2=0x00, dest=self._dest, source=0x01
+        ))
+        
+    def stop_status_updates(self):
+        '''
+        Has the controller stop sending status updates.
+        '''
+        self.sendpacket(_packets.ThorLabsPacket(
+            message_id=_cmds.ThorLabsCommands.HW_STOP_UPDATEMSGS,
+            param1=0x00, param2=0x00, dest=self._dest, source=0x01
+        ))
+        for subscription in self._status_subscriptions:
+            self._dispatcher.unsubscribe(subscription)
+        self._status_subscriptions = ()
+        
+    def _on_status_update(self, pkt):
+        for channel in self._channel:
+            if channel._owns_packet(pkt):
+                channel._update_status(pkt)
+        if pkt._message_id == _cmds.ThorLabsCommands.MOT_GET_DCSTATUSUPDATE:
+            # DC servo controllers stop sending updates unless they are
+            # acknowledged.
+            self.sendpacket(_packets.ThorLabsPacket(
+                message_id=_cmds.ThorLabsCommands.MOT_ACK_DCSTATUSUPDATE,
+                param1=0x00, param2=0x00, dest=self._dest, source=0x01
+            ))
+    
             
@@ -29,10 +29,24 @@ from __future__ import division
 ## IMPORTS #####################################################################
 
 import sys
+from time import time
+from collections import namedtuple
 
+import numpy as np
 import quantities as pq
 from flufl.enum import Enum, IntEnum
 
+## CONSTANTS ###################################################################
+
+# Factors by which to multiply magnitudes to convert them between units,
+# keyed by the units converted from and to (see _units_key).
+_SCALE_FACTORS = {}
+
+#: Description of a property generated by one of the property factories in
+#: this module: its command, the type of its values, their units (or `None`
+#: if unitless) and whether it is read-only.
+PropertyInfo = namedtuple('PropertyInfo', ['command', 'type', 'units', 'readonly'])
+
 ## FUNCTIONS ###################################################################
 
 def assume_units(value, units):
@@ -53,13 +67,157 @@ def assume_units(value, units):
         value = pq.Quantity(value, units)
     return value
 
+def _units_key(units):
+    """
+    Returns a key identifying the given units, which is much cheaper to
+    compute and hash than their `~quantities.dimensionality.Dimensionality`.
+    """
+    if isinstance(units, pq.UnitQuantity):
+        return units
+    if isinstance(units, pq.Quantity):
+        units = units._dimensionality
+    if isinstance(units, dict):
+        return frozenset(units.iteritems())
+    return units
+
+def scale_factor(from_units, to_units):
+    """
+    Returns the factor by which to multiply magnitudes in ``from_units`` to
+    convert them to ``to_units``. Factors are computed once for each pair of
+    units, and then cached.
+    
+    :param from_units: Units to convert from.
+    :param to_units: Units to convert to.
+    :type from_units: `~quantities.Quantity`, `~quantities.UnitQuantity`
+        or `str`
+    :type to_units: `~quantities.Quantity`, `~quantities.UnitQuantity`
+        or `str`
+    :rtype: `float`
+    
+    :raises ValueError: If the units are not compatible.
+    """
+    key = (_units_key(from_units), _units_key(to_units))
+    try:
+        return _SCALE_FACTORS[key]
+    except KeyError:
+        if isinstance(from_units, pq.Quantity):
+            from_units = from_units.dimensionality
+        factor = pq.Quantity(1.0, from_units).rescale(to_units).magnitude.item()
+        _SCALE_FACTORS[key] = factor
+        return factor
+
+def convert_magnitude(value, units):
+    """
+    Returns the magnitude of ``value`` in the given units. Unlike
+    ``assume_units(value, units).rescale(units).magnitude``, plain numbers
+    and arrays are returned as they are, being assumed to already be in
+    ``units``, and no intermediate `~quantities.Quantity` is created.
+    
+    :param value: A value that may or may not be unitful.
+    :param units: Units to express the magnitude of ``value`` in.
+    
+    :return: The magnitude of ``value`` in ``units``.
+    :rtype: `float` or `numpy.ndarray`
+    
+    :raises ValueError: If ``value`` has units incompatible with ``units``.
+    """
+    if not isinstance(value, pq.Quantity):
+        return value
+    factor = scale_factor(value, units)
+    if value.ndim == 0:
+        return value.item() * factor
+    return value.view(np.ndarray) * factor
+
 def rproperty(fget=None, fset=None, doc=None, readonly=False):
     if readonly:
         return property(fget=fget, fset=None, doc=doc)
     else:
         return property(fget=fget, fset=fset, doc=doc)  
 
-def bool_property(name, inst_true, inst_false, doc=None, readonly=False):
+def shadowed_rproperty(name, fget, fset, normalize, doc=None, readonly=False,
+        volatile=False):
+    """
+    Like `rproperty`, but uses the shadow cache of the instrument, if it has
+    one enabled (see `ShadowCache`), to answer gets with the last value
+    written or read, and to skip sets that would not change the value.
+    
+    The value cached by a set is the one sent to the instrument, not one
+    read back from it. If the instrument rounds the value further, or
+    rejects it, gets return the value sent until the cache is invalidated.
+    
+    :param str name: Key of the property in the shadow cache.
+    :param callable normalize: Function converting values passed to the
+        setter to the form returned by the getter, as sent to the
+        instrument, so that they can be compared to and stored in the
+        cache.
+    :param bool volatile: If `True`, the value of the property can change
+        on its own, such that the shadow cache is never used. Read-only
+        properties are always treated as volatile, as they typically report
+        measurements.
+    """
+    if volatile or readonly:
+        return rproperty(fget=fget, fset=fset, doc=doc, readonly=readonly)
+        
+    def getter(self):
+        cache = getattr(self, '_shadow_cache', None)
+        if cache is None:
+            return fget(self)
+        try:
+            return cache[name]
+        except KeyError:
+            value = fget(self)
+            cache[name] = value
+            return value
+    def setter(self, newval):
+        cache = getattr(self, '_shadow_cache', None)
+        if cache is None:
+            fset(self, newval)
+            return
+        value = normalize(newval)
+        try:
+            if cache[name] == value:
+                return
+        except KeyError:
+            pass
+        fset(self, newval)
+        cache[name] = value
+        
+    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+
+def _registered(prop, name, value_type, parse, units=None):
+    """
+    Wraps a property generated by one of the factories in this module into a
+    `RegisteredProperty`, recording how to query and parse its value.
+    """
+    registered = RegisteredProperty(prop.fget, prop.fset, None, prop.__doc__)
+    registered.info = PropertyInfo(name, value_type, units, prop.fset is None)
+    registered.parse = parse
+    return registered
+
+def property_registry(cls):
+    """
+    Returns the properties of a class generated by the property factories in
+    this module, including those inherited from its bases. The registry is
+    built on first use and then kept by the class.
+    
+    :param type cls: Class whose properties are returned.
+    :return: Mapping from attribute names to properties.
+    :rtype: `dict` of `RegisteredProperty`
+    """
+    if '_property_registry' not in cls.__dict__:
+        registry = {}
+        # Walk the bases first, so that subclasses can override properties.
+        for klass in reversed(cls.__mro__):
+            for attr_name, attr in klass.__dict__.iteritems():
+                if isinstance(attr, RegisteredProperty):
+                    registry[attr_name] = attr
+                else:
+                    registry.pop(attr_name, None)
+        cls._property_registry = registry
+    return cls._property_registry
+
+def bool_property(name, inst_true, inst_false, doc=None, readonly=False,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate boolean properties 
     of the device cleanly.
@@ -75,15 +233,21 @@ def bool_property(name, inst_true, inst_false, doc=None, readonly=False):
     :param str doc: Docstring to be associated with the new property.
     :param bool readonly: If `False`, the returned property does not have a
         setter.
+    :param bool volatile: If `True`, the value can change without being set,
+        such that it is never taken from the shadow cache.
     """
+    def parse(resp):
+        return resp.strip() == inst_true
     def getter(self):
-        return self.query(name + "?").strip() == inst_true
+        return parse(self.query(name + "?"))
     def setter(self, newval):
         self.sendcmd("{} {}".format(name, inst_true if newval else inst_false))
         
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, bool, doc=doc,
+        readonly=readonly, volatile=volatile), name, bool, parse)
     
-def enum_property(name, enum, doc=None, input_decoration=None, output_decoration=None, readonly=False):
+def enum_property(name, enum, doc=None, input_decoration=None, output_decoration=None, readonly=False,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate Enum properties 
     of the device cleanly.
@@ -102,19 +266,25 @@ def enum_property(name, enum, doc=None, input_decoration=None, output_decoration
     :param str doc: Docstring to be associated with the new property.
     :param bool readonly: If `False`, the returned property does not have a
         setter.
+    :param bool volatile: If `True`, the value can change without being set,
+        such that it is never taken from the shadow cache.
     """
     def in_decor_fcn(val):
         return val if input_decoration is None else input_decoration(val)
     def out_decor_fcn(val):
         return val if output_decoration is None else output_decoration(val)
+    def parse(resp):
+        return enum[in_decor_fcn(resp.strip())]
     def getter(self):
-        return enum[in_decor_fcn(self.query("{}?".format(name)).strip())]
+        return parse(self.query("{}?".format(name)))
     def setter(self, newval):
         self.sendcmd("{} {}".format(name, out_decor_fcn(enum[newval].value)))
     
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, enum.__getitem__, doc=doc,
+        readonly=readonly, volatile=volatile), name, enum, parse)
 
-def unitless_property(name, format_code='{:e}', doc=None, readonly=False):
+def unitless_property(name, format_code='{:e}', doc=None, readonly=False,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate properties with unitless 
     numeric values.
@@ -125,6 +295,8 @@ def unitless_property(name, format_code='{:e}', doc=None, readonly=False):
     :param str doc: Docstring to be associated with the new property.
     :param bool readonly: If `False`, the returned property does not have a
         setter.
+    :param bool volatile: If `True`, the value can change without being set,
+        such that it is never taken from the shadow cache.
     """
     def getter(self):
         raw = self.query("{}?".format(name))
@@ -132,10 +304,15 @@ def unitless_property(name, format_code='{:e}', doc=None, readonly=False):
     def setter(self, newval):
         strval = format_code.format(newval)
         self.sendcmd("{} {}".format(name, strval))
+    def normalize(newval):
+        # Cache the value as sent, after any rounding by the format.
+        return float(format_code.format(newval))
 
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, normalize, doc=doc,
+        readonly=readonly, volatile=volatile), name, float, float)
 
-def int_property(name, format_code='{:d}', doc=None, readonly=False, valid_set=None):
+def int_property(name, format_code='{:d}', doc=None, readonly=False, valid_set=None,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate properties with unitless 
     numeric values.
@@ -148,6 +325,8 @@ def int_property(name, format_code='{:d}', doc=None, readonly=False, valid_set=N
         setter.
     :param valid_set: Set of valid values for the property, or `None` if all
         `int` values are valid.
+    :param bool volatile: If `True`, the value can change without being set,
+        such that it is never taken from the shadow cache.
     """
     def getter(self):
         raw = self.query("{}?".format(name))
@@ -166,9 +345,11 @@ def int_property(name, format_code='{:d}', doc=None, readonly=False, valid_set=N
             strval = format_code.format(newval)
             self.sendcmd("{} {}".format(name, strval))
 
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, int, doc=doc,
+        readonly=readonly, volatile=volatile), name, int, int)
 
-def unitful_property(name, units, format_code='{:e}', doc=None, readonly=False):
+def unitful_property(name, units, format_code='{:e}', doc=None, readonly=False,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate properties with unitful numeric
     values. This function assumes that the instrument only accepts
@@ -185,33 +366,107 @@ def unitful_property(name, units, format_code='{:e}', doc=None, readonly=False):
     :param str doc: Docstring to be associated with the new property.
     :param bool readonly: If `False`, the returned property does not have a
         setter.
+    :param bool volatile: If `True`, the value can change without being set,
+        such that it is never taken from the shadow cache.
     """
+    def parse(resp):
+        return float(resp) * units
     def getter(self):
-        raw = self.query("{}?".format(name))
-        return float(raw) * units
+        return parse(self.query("{}?".format(name)))
     def setter(self, newval):
         # Rescale to the correct unit before printing. This will also catch bad units.
-        strval = format_code.format(assume_units(newval, units).rescale(units).item())
+        strval = format_code.format(float(convert_magnitude(newval, units)))
         self.sendcmd("{} {}".format(name, strval))
+    def normalize(newval):
+        # Cache the value as sent, after any rounding by the format.
+        return parse(format_code.format(float(convert_magnitude(newval, units))))
 
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, normalize, doc=doc,
+        readonly=readonly, volatile=volatile), name, pq.Quantity, parse, units)
 
-def string_property(name, bookmark_symbol='"', doc=None, readonly=False):
+def string_property(name, bookmark_symbol='"', doc=None, readonly=False,
+        volatile=False):
     """
     Called inside of SCPI classes to instantiate properties with a string value.
     """
     bookmark_length = len(bookmark_symbol)
+    def parse(string):
+        return string[bookmark_length:-bookmark_length] if bookmark_length>0 else string
     def getter(self):
-        string = self.query("{}?".format(name))
-        string = string[bookmark_length:-bookmark_length] if bookmark_length>0 else string
-        return string
+        return parse(self.query("{}?".format(name)))
     def setter(self, newval):
         self.sendcmd("{} {}{}{}".format(name, bookmark_symbol, newval, bookmark_symbol))
 
-    return rproperty(fget=getter, fset=setter, doc=doc, readonly=readonly)
+    return _registered(shadowed_rproperty(name, getter, setter, str, doc=doc,
+        readonly=readonly, volatile=volatile), name, str, parse)
 
 ## CLASSES #####################################################################
 
+class RegisteredProperty(property):
+    """
+    Property generated by one of the property factories in this module,
+    which can be discovered through `property_registry`.
+    
+    .. attribute:: info
+    
+        `PropertyInfo` describing the property.
+        
+    .. attribute:: parse
+    
+        Function converting a response to the query of the property into
+        its value.
+    """
+
+class ShadowCache(object):
+    """
+    Cache of the last values written to or read from the properties of an
+    instrument, used by the property factories in this module to avoid
+    needless queries and commands. Instruments opt in by setting their
+    ``_shadow_cache`` attribute, as is done by
+    `~instruments.Instrument.enable_shadow_cache`.
+    
+    Values are keyed by the command of their property, and are forgotten
+    once older than ``ttl``. Arrays, including `~quantities.Quantity`
+    values, are copied both when stored and when returned, so that
+    modifying a value in place does not change the cached value.
+    
+    :param float ttl: Time in seconds for which values are kept, or `None`
+        to keep them until invalidated.
+    """
+    
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._values = {}
+        
+    def __getitem__(self, name):
+        value, timestamp = self._values[name]
+        if self.ttl is not None and time() - timestamp > self.ttl:
+            del self._values[name]
+            raise KeyError(name)
+        return self._copy(value)
+        
+    def __setitem__(self, name, value):
+        self._values[name] = (self._copy(value), time())
+        
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, np.ndarray):
+            return value.copy()
+        return value
+        
+    def __len__(self):
+        return len(self._values)
+        
+    def invalidate(self, name=None):
+        """
+        Forgets the value of the property with the given command, or of all
+        properties if ``name`` is `None`.
+        """
+        if name is None:
+            self._values.clear()
+        else:
+            self._values.pop(name, None)
+
 class ProxyList(object):
     def __init__(self, parent, proxy_cls, valid_set):
         self._parent = parent